@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+聊天介面頁面
+main.py 與 start_integrated_system.py 共用的聊天介面 HTML；
+只在內容與現有檔案不同時才寫入，重複啟動不會改寫檔案或變更修改時間
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CHAT_INTERFACE_PATH = Path(__file__).parent / "chat_interface.html"
+
+CHAT_INTERFACE_HTML = """<!DOCTYPE html>
+<html lang="zh-TW">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>智能面試系統</title>
+    <style>
+        body {
+            font-family: 'Microsoft JhengHei', Arial, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+        }
+        .container {
+            max-width: 800px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 15px;
+            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+            overflow: hidden;
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 20px;
+            text-align: center;
+        }
+        .chat-container {
+            height: 400px;
+            overflow-y: auto;
+            padding: 20px;
+            background: #f8f9fa;
+        }
+        .message {
+            margin-bottom: 15px;
+            padding: 10px 15px;
+            border-radius: 10px;
+            max-width: 80%;
+        }
+        .user-message {
+            background: #007bff;
+            color: white;
+            margin-left: auto;
+        }
+        .bot-message {
+            background: #e9ecef;
+            color: #333;
+        }
+        .input-container {
+            padding: 20px;
+            background: white;
+            border-top: 1px solid #dee2e6;
+        }
+        .input-group {
+            display: flex;
+            gap: 10px;
+        }
+        #messageInput {
+            flex: 1;
+            padding: 12px;
+            border: 2px solid #dee2e6;
+            border-radius: 25px;
+            font-size: 16px;
+            outline: none;
+        }
+        #messageInput:focus {
+            border-color: #667eea;
+        }
+        #sendButton {
+            padding: 12px 25px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            border: none;
+            border-radius: 25px;
+            cursor: pointer;
+            font-size: 16px;
+            transition: transform 0.2s;
+        }
+        #sendButton:hover {
+            transform: translateY(-2px);
+        }
+        .status {
+            text-align: center;
+            padding: 10px;
+            background: #f8f9fa;
+            border-bottom: 1px solid #dee2e6;
+            font-size: 14px;
+            color: #6c757d;
+        }
+        .loading {
+            display: none;
+            text-align: center;
+            padding: 10px;
+            color: #6c757d;
+        }
+        .system-links {
+            text-align: center;
+            padding: 15px;
+            background: #f8f9fa;
+            border-top: 1px solid #dee2e6;
+        }
+        .system-links a {
+            display: inline-block;
+            margin: 0 10px;
+            padding: 8px 16px;
+            background: #667eea;
+            color: white;
+            text-decoration: none;
+            border-radius: 20px;
+            font-size: 14px;
+            transition: background 0.3s;
+        }
+        .system-links a:hover {
+            background: #5a6fd8;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🎯 智能面試系統</h1>
+            <p>支援面試問題、答案分析、標準答案等功能</p>
+        </div>
+        <div class="status" id="status">連接中...</div>
+        <div class="chat-container" id="chatContainer">
+            <div class="message bot-message">
+                你好！我是智能面試助手，可以幫您：<br>
+                1. 獲取面試問題<br>
+                2. 分析您的回答<br>
+                3. 提供標準答案<br><br>
+                請告訴我您需要什麼幫助？
+            </div>
+        </div>
+        <div class="loading" id="loading">正在處理中...</div>
+        <div class="input-container">
+            <div class="input-group">
+                <input type="text" id="messageInput" placeholder="輸入您的問題..." />
+                <button id="sendButton">發送</button>
+            </div>
+        </div>
+        <div class="system-links">
+            <a href="http://localhost:5000" target="_blank">🎭 虛擬面試系統</a>
+            <a href="http://localhost:8080" target="_blank">🌐 HTTP API</a>
+            <a href="http://localhost:3000" target="_blank">🤖 Fast Agent</a>
+        </div>
+    </div>
+
+    <script>
+        const chatContainer = document.getElementById('chatContainer');
+        const messageInput = document.getElementById('messageInput');
+        const sendButton = document.getElementById('sendButton');
+        const status = document.getElementById('status');
+        const loading = document.getElementById('loading');
+
+        function addMessage(message, isUser = false) {
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `message ${isUser ? 'user-message' : 'bot-message'}`;
+            messageDiv.innerHTML = message.replace(/\\n/g, '<br>');
+            chatContainer.appendChild(messageDiv);
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        }
+
+        function setStatus(text) {
+            status.textContent = text;
+        }
+
+        function showLoading(show) {
+            loading.style.display = show ? 'block' : 'none';
+        }
+
+        async function sendMessage() {
+            const message = messageInput.value.trim();
+            if (!message) return;
+            // 同一則訊息改試其他端點時沿用相同識別碼，伺服器可辨識重複送出
+            const requestId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+            addMessage(message, true);
+            messageInput.value = '';
+            showLoading(true);
+
+            try {
+                // 嘗試多個 API 端點
+                const endpoints = [
+                    'http://localhost:5000/api/interview',
+                    'http://localhost:8080/api/chat',
+                    'http://localhost:3000/api/chat'
+                ];
+
+                let response = null;
+                let data = null;
+
+                for (const endpoint of endpoints) {
+                    try {
+                        const res = await fetch(endpoint, {
+                            method: 'POST',
+                            headers: {
+                                'Content-Type': 'application/json',
+                                'Idempotency-Key': requestId,
+                            },
+                            body: JSON.stringify({ message: message, request_id: requestId })
+                        });
+
+                        if (res.ok) {
+                            data = await res.json();
+                            response = res;
+                            setStatus(`使用服務: ${endpoint}`);
+                            break;
+                        }
+                    } catch (error) {
+                        console.log(`端點 ${endpoint} 不可用:`, error);
+                        continue;
+                    }
+                }
+
+                if (data) {
+                    if (data.error) {
+                        addMessage(`錯誤: ${data.error}`);
+                    } else {
+                        addMessage(data.response || data.message || '收到回應');
+                        if (data.tool_used) {
+                            setStatus(`使用工具: ${data.tool_used} (信心度: ${(data.confidence || 0.8) * 100}%)`);
+                        }
+                    }
+                } else {
+                    addMessage('所有服務都無法連接，請檢查系統狀態');
+                    setStatus('連接失敗');
+                }
+            } catch (error) {
+                addMessage(`連接錯誤: ${error.message}`);
+                setStatus('連接失敗');
+            } finally {
+                showLoading(false);
+            }
+        }
+
+        sendButton.addEventListener('click', sendMessage);
+        messageInput.addEventListener('keypress', (e) => {
+            if (e.key === 'Enter') {
+                sendMessage();
+            }
+        });
+
+        // 檢查連接狀態
+        async function checkConnection() {
+            const endpoints = [
+                'http://localhost:5000/api/interview',
+                'http://localhost:8080/api/chat',
+                'http://localhost:3000/api/chat'
+            ];
+
+            let connected = false;
+            for (const endpoint of endpoints) {
+                try {
+                    const response = await fetch(endpoint, {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ message: 'ping' })
+                    });
+                    if (response.ok) {
+                        setStatus(`已連接: ${endpoint}`);
+                        connected = true;
+                        break;
+                    }
+                } catch (error) {
+                    continue;
+                }
+            }
+            
+            if (!connected) {
+                setStatus('未連接');
+            }
+        }
+
+        // 定期檢查連接狀態
+        setInterval(checkConnection, 5000);
+        checkConnection();
+    </script>
+</body>
+</html>"""
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def create_chat_interface(path: Path = CHAT_INTERFACE_PATH) -> bool:
+    """創建聊天介面 HTML 檔案；內容未變更時不寫入，回傳是否有寫入"""
+    content = CHAT_INTERFACE_HTML.encode("utf-8")
+    try:
+        if path.exists() and _digest(path.read_bytes()) == _digest(content):
+            logger.info("✅ 聊天介面 HTML 檔案已是最新")
+            return False
+        # 先寫入暫存檔再替換，避免瀏覽器讀到寫到一半的檔案
+        tmp_path = path.with_suffix(".html.tmp")
+        tmp_path.write_bytes(content)
+        tmp_path.replace(path)
+        logger.info("✅ 聊天介面 HTML 檔案已創建")
+        return True
+    except Exception as e:
+        logger.error(f"❌ 創建聊天介面失敗: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    create_chat_interface()
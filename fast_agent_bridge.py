@@ -5,161 +5,124 @@ Fast Agent 橋接模組
 """
 
 import asyncio
-import json
 import os
 import sys
+from collections import deque
 from pathlib import Path
 
 # 添加父目錄到路徑
 sys.path.append(str(Path(__file__).parent))
 
 try:
-    from tools.answer_analyzer import answer_analyzer
-    from tools.question_manager import question_manager
+    from tools.interview_services import (
+        categorize_question,
+        grading_service,
+        question_service,
+    )
+    from tools.intro_analyzer import INTRO_DIMENSIONS, intro_analyzer
+    from tools.keyword_matcher import KeywordMatcher
+    from tools.llm_gateway import PRIORITY_BATCH
+    from tools.question_prefetcher import QuestionPrefetcher
+    from tools.session_store import session_store
+    from tools.tool_registry import (
+        RateLimit,
+        Timing,
+        ToolError,
+        ToolNotFoundError,
+        ToolRateLimitError,
+        tool_registry,
+    )
 
     TOOLS_AVAILABLE = True
 except ImportError:
     TOOLS_AVAILABLE = False
     print("⚠️ tools 模組不可用")
 
-# OpenAI 相關導入
-try:
-    import openai
-    from openai import OpenAI
+# 每個用戶依履歷挑選的待出題目（由 virtual_interviewer 在會話開始時設定）
+_user_question_plans = {}
 
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    print("⚠️ OpenAI 模組不可用")
 
+def set_question_plan(user_id: str, questions: list):
+    """設定用戶本次會話的題目清單，取題時優先依序使用"""
+    _user_question_plans[user_id] = deque(questions)
+    # 先前預取的隨機題目不再適用
+    if _question_prefetcher:
+        _question_prefetcher.discard(user_id)
 
-def call_openai_for_analysis(prompt: str, max_tokens: int = 1500):
-    """調用 OpenAI API 進行分析"""
-    try:
-        if not OPENAI_AVAILABLE:
-            raise Exception("OpenAI 模組不可用")
-
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise Exception("OPENAI_API_KEY 未設定")
-
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "您是一個專業的面試官和職涯顧問，擅長分析自我介紹並提供具體的改進建議。請根據要求分析用戶的自我介紹。",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=max_tokens,
-        )
 
-        content = response.choices[0].message.content
-        return content.strip() if content else ""
+def _fetch_question_data(user_id: str = "default_user"):
+    """取得一題完整的題目資料（含類別與難度） - 優先使用會話題目清單"""
+    if not TOOLS_AVAILABLE:
+        raise Exception("工具模組不可用，無法獲取問題")
 
-    except Exception as e:
-        print(f"❌ OpenAI API 調用失敗: {e}")
-        raise e
+    plan = _user_question_plans.get(user_id)
+    if plan:
+        try:
+            return question_service.planned_question(plan.popleft()).to_dict()
+        except IndexError:
+            pass
 
+    return question_service.random_question().to_dict()
 
-def get_question():
-    """獲取隨機面試問題 - 優先使用 MCP 工具"""
-    try:
-        # 優先使用 MCP 工具 - 嘗試多種導入路徑
-        mcp_get_random_question = None
 
-        # 嘗試直接導入
-        try:
-            from server import get_random_question as mcp_get_random_question
+# 每個用戶的下一題預取器：題目送出後即在背景準備下一題
+_question_prefetcher = (
+    QuestionPrefetcher(_fetch_question_data) if TOOLS_AVAILABLE else None
+)
 
-            print("✅ 成功導入 MCP 工具: server.get_random_question")
-        except ImportError:
-            # 嘗試從父目錄導入
-            try:
-                import os
-                import sys
-
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                parent_dir = os.path.dirname(current_dir)
-                if parent_dir not in sys.path:
-                    sys.path.insert(0, parent_dir)
-
-                from server import get_random_question as mcp_get_random_question
-
-                print("✅ 成功從父目錄導入 MCP 工具: server.get_random_question")
-            except ImportError:
-                print("⚠️ 無法導入 MCP 工具，將使用回退方案")
-                mcp_get_random_question = None
-
-        if mcp_get_random_question:
-            result = mcp_get_random_question()
-            if result.get("status") == "success":
-                # 返回完整的數據結構，包含標準答案
-                return {
-                    "success": True,
-                    "result": f"""
-🎯 MCP 工具面試問題
-
-問題：{result['question']}
-類別：{result['category']}
-難度：{result['difficulty']}
-來源：{result['source']}
 
-請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
-                    """,
-                    "question_data": {
-                        "question": result["question"],
-                        "standard_answer": result["standard_answer"],
-                        "category": result["category"],
-                        "difficulty": result["difficulty"],
-                        "source": result["source"],
-                    },
-                }
-            else:
-                print(f"⚠️ MCP 工具獲取問題失敗: {result.get('message', '未知錯誤')}")
-                # 繼續到回退方案
-        else:
-            print("⚠️ MCP 工具不可用，使用回退方案")
+def set_question_ready_listener(listener):
+    """設定下一題預取完成時的通知函式 listener(user_id, 題目資料)；None 表示取消"""
+    if _question_prefetcher:
+        _question_prefetcher.on_ready = listener
 
-    except Exception as e:
-        print(f"⚠️ MCP 工具調用錯誤: {str(e)}")
-        # 繼續到回退方案
 
-    # 回退到原始工具
+def prefetch_question(user_id: str = "default_user"):
+    """在背景預取用戶的下一題（已有待取題目時不重複預取）"""
+    if _question_prefetcher:
+        _question_prefetcher.prefetch(user_id)
+
+
+def get_question(user_id: str = "default_user"):
+    """獲取面試問題 - 優先使用已預取的題目"""
     try:
-        if not TOOLS_AVAILABLE:
-            return {"success": False, "error": "工具模組不可用，無法獲取問題"}
+        if _question_prefetcher:
+            question_data = _question_prefetcher.take(user_id)
+        else:
+            question_data = _fetch_question_data(user_id)
+    except Exception as e:
+        return {"success": False, "error": f"獲取問題失敗：{str(e)}"}
 
-        question_data = question_manager.get_random_question()
-        category = _categorize_question(question_data["question"])
-        difficulty = _assess_difficulty(question_data["question"])
+    _record_history_event("question", user_id, question_data["question"], question_data)
 
-        return {
-            "success": True,
-            "result": f"""
+    if question_data.get("selection") == "profile":
+        result_text = f"""
+🎯 面試問題（依您的履歷挑選）
+
+問題：{question_data['question']}
+類別：{question_data['category']}
+難度：{question_data['difficulty']}
+來源：{question_data['source']}
+
+請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
+            """
+    else:
+        result_text = f"""
 🎯 面試問題
 
-問題：{question_data["question"]}
-類別：{category}
-難度：{difficulty}
+問題：{question_data['question']}
+類別：{question_data['category']}
+難度：{question_data['difficulty']}
+來源：{question_data['source']}
 
 請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
-            """,
-            "question_data": {
-                "question": question_data["question"],
-                "standard_answer": question_data["standard_answer"],
-                "category": category,
-                "difficulty": difficulty,
-                "source": "本地工具",
-            },
-        }
+            """
 
-    except Exception as e:
-        return {"success": False, "error": f"獲取問題失敗：{str(e)}"}
+    return {
+        "success": True,
+        "result": result_text,
+        "question_data": question_data,
+    }
 
 
 # 全局變數來儲存自我介紹內容
@@ -181,11 +144,19 @@ def intro_collector(user_message: str = "", user_id: str = "default_user"):
         # 返回當前已收集的內容
         all_content = " ".join(_user_intro_content[user_id])
 
+        # 只掃描新片段更新六構面涵蓋情況；內容足夠時在背景預先分析，
+        # 用戶說「介紹完了」時多半已有結果可直接使用
+        coverage = {}
+        if TOOLS_AVAILABLE:
+            coverage = intro_analyzer.add_fragment(user_id, user_message)
+            intro_analyzer.speculate(user_id, all_content)
+
         return {
             "success": True,
             "result": f"✅ 已記錄您的自我介紹內容",
             "message": "自我介紹內容已成功記錄",
             "collected_content": all_content,
+            "coverage": coverage,
         }
     except Exception as e:
         return {"success": False, "error": f"記錄自我介紹失敗: {str(e)}"}
@@ -203,6 +174,8 @@ def clear_collected_intro(user_id: str = "default_user"):
     if user_id in _user_intro_content:
         _user_intro_content[user_id] = []
         print(f"🧹 已清除用戶 {user_id} 的自我介紹內容")
+    if TOOLS_AVAILABLE:
+        intro_analyzer.clear(user_id)
     return {
         "success": True,
         "result": f"✅ 已清除用戶 {user_id} 的自我介紹內容",
@@ -224,9 +197,18 @@ def clear_all_user_data(user_id: str = "default_user"):
             )
         else:
             print(f"   ℹ️ 用戶 {user_id} 沒有自我介紹內容")
+        if TOOLS_AVAILABLE:
+            intro_analyzer.clear(user_id)
+            # 新會話起點：之前的對話與評分不再計入本次面試的彙總
+            try:
+                session_store.mark_session_start(user_id)
+            except Exception as e:
+                print(f"   ⚠️ 寫入會話起點失敗: {e}")
 
-        # 清除其他可能的全局狀態（如果有其他模組的狀態需要清除）
-        # 這裡可以添加清除其他模組狀態的邏輯
+        # 丟棄依履歷挑選的題目清單與尚未取用的預取題目
+        _user_question_plans.pop(user_id, None)
+        if _question_prefetcher:
+            _question_prefetcher.discard(user_id)
 
         # 檢查是否還有其他相關的全局變數需要清除
         remaining_users = list(_user_intro_content.keys())
@@ -248,25 +230,19 @@ def clear_all_user_data(user_id: str = "default_user"):
 
 
 def analyze_answer(
-    user_answer: str = "", question: str = "", standard_answer: str = ""
+    user_answer: str = "",
+    question: str = "",
+    standard_answer: str = "",
+    user_id: str = "default_user",
 ):
-    """分析用戶回答 - 優先使用 MCP 工具"""
+    """分析用戶回答（由評分服務評分，結果在此轉為回應文字）"""
 
     # 只在明確的自我介紹情況下才返回自我介紹回應
     # 移除過於寬泛的關鍵字匹配，避免誤判面試回答
-    lower_answer = user_answer.lower()
     if (
-        any(
-            phrase in lower_answer
-            for phrase in [
-                "我叫",
-                "我的名字是",
-                "我的名字叫",
-                "自我介紹一下",
-                "讓我自我介紹",
-            ]
-        )
+        _self_intro_matcher
         and len(user_answer) < 50
+        and _self_intro_matcher.find(user_answer)
     ):  # 只有短句且明確的自我介紹才觸發
         return {
             "success": True,
@@ -282,265 +258,153 @@ def analyze_answer(
         }
 
     try:
-        # 優先使用 MCP 工具 - 嘗試多種導入路徑
-        mcp_analyze_user_answer = None
-
-        # 嘗試直接導入
-        try:
-            from server import analyze_user_answer as mcp_analyze_user_answer
-
-            print("✅ 成功導入 MCP 工具: server.analyze_user_answer")
-        except ImportError:
-            # 嘗試從父目錄導入
-            try:
-                import os
-                import sys
-
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                parent_dir = os.path.dirname(current_dir)
-                if parent_dir not in sys.path:
-                    sys.path.insert(0, parent_dir)
-
-                from server import analyze_user_answer as mcp_analyze_user_answer
-
-                print("✅ 成功從父目錄導入 MCP 工具: server.analyze_user_answer")
-            except ImportError:
-                print("⚠️ 無法導入 MCP 工具，將使用回退方案")
-                mcp_analyze_user_answer = None
-
-        if mcp_analyze_user_answer:
-            result = mcp_analyze_user_answer(
-                user_answer=user_answer,
-                question=question,
-                standard_answer=standard_answer,
-            )
-
-            if result.get("status") == "success":
-                response = f"""
-📊 MCP 工具分析結果
-
-評分：{result.get('score', 'N/A')}/100 ({result.get('grade', 'N/A')})
-相似度：{result.get('similarity', 'N/A')}
-反饋：{result.get('feedback', '無反饋')}
+        if not TOOLS_AVAILABLE:
+            return {"success": False, "error": "工具模組不可用，無法分析回答"}
 
-標準答案：{result.get('standard_answer', standard_answer)}
-                """
+        # 未提供標準答案時由評分服務依題目查詢題庫
+        result = grading_service.grade(user_answer, question, standard_answer)
+        _record_history_event(
+            "answer", user_id, question, user_answer=user_answer, grading=result
+        )
+        return {"success": True, "result": _format_answer_analysis(result)}
 
-                if result.get("differences"):
-                    response += "\n🔍 具體差異：\n"
-                    for diff in result["differences"]:
-                        response += f"  • {diff}\n"
+    except Exception as e:
+        return {"success": False, "error": f"分析失敗：{str(e)}"}
 
-                return {"success": True, "result": response}
-            else:
-                print(f"⚠️ MCP 工具分析失敗: {result.get('message', '未知錯誤')}")
-                # 繼續到回退方案
-        else:
-            print("⚠️ MCP 工具不可用，使用回退方案")
 
-    except Exception as e:
-        print(f"⚠️ MCP 工具調用錯誤: {str(e)}")
-        # 繼續到回退方案
+async def analyze_answer_async(
+    user_answer: str = "",
+    question: str = "",
+    standard_answer: str = "",
+    user_id: str = "default_user",
+):
+    """
+    analyze_answer() 的非同步版本：等待模型評分時不佔用執行緒，
+    寫入會話歷史交給執行緒池（供 ASGI 應用的非同步面試端點使用）
+    """
+    if (
+        _self_intro_matcher
+        and len(user_answer) < 50
+        and _self_intro_matcher.find(user_answer)
+    ):
+        return analyze_answer(user_answer, question, standard_answer, user_id)
 
-    # 回退到原始工具
     try:
-        # 檢查工具可用性
         if not TOOLS_AVAILABLE:
             return {"success": False, "error": "工具模組不可用，無法分析回答"}
 
-        # 如果沒有提供標準答案，嘗試從問題獲取
-        if not standard_answer:
-            question_data = question_manager.get_random_question()
-            standard_answer = question_data.get("standard_answer", "標準答案未提供")
+        result = await grading_service.agrade(user_answer, question, standard_answer)
+        await asyncio.to_thread(
+            _record_history_event,
+            "answer",
+            user_id,
+            question,
+            user_answer=user_answer,
+            grading=result,
+        )
+        return {"success": True, "result": _format_answer_analysis(result)}
+
+    except Exception as e:
+        return {"success": False, "error": f"分析失敗：{str(e)}"}
 
-        # 使用答案分析器分析
-        analysis = answer_analyzer.analyze_answer(user_answer, standard_answer)
 
-        response = f"""
+def _format_answer_analysis(result):
+    """將評分結果轉為回應文字"""
+    response = f"""
 📊 分析結果
 
-評分：{analysis['score']}/100 ({analysis['grade']})
-相似度：{analysis['similarity']:.1%}
-反饋：{analysis['feedback']}
+評分：{result.score}/100 ({result.grade})
+相似度：{result.similarity:.1%}
+反饋：{result.feedback}
 
-標準答案：{standard_answer}
+標準答案：{result.standard_answer}
         """
 
-        if analysis["differences"]:
-            response += "\n🔍 具體差異：\n"
-            for diff in analysis["differences"]:
-                response += f"  • {diff}\n"
-
-        return {"success": True, "result": response}
-
-    except Exception as e:
-        return {"success": False, "error": f"分析失敗：{str(e)}"}
+    if result.differences:
+        response += "\n🔍 具體差異：\n"
+        for diff in result.differences:
+            response += f"  • {diff}\n"
+    return response
 
 
 def get_standard_answer(question: str = ""):
-    """獲取標準答案 - 優先使用 MCP 工具"""
-    try:
-        # 優先使用 MCP 工具
-        from server import get_standard_answer as mcp_get_standard_answer
-
-        result = mcp_get_standard_answer(question=question)
-        if result.get("status") == "success":
-            response = f"""
-✅ MCP 工具標準答案
+    """獲取標準答案（未指定題目時隨機取一題）"""
+    if not TOOLS_AVAILABLE:
+        return "工具模組不可用，無法獲取標準答案"
 
-問題：{result['question']}
-標準答案：{result['standard_answer']}
-來源：{result['source']}
-            """
-            return response
+    try:
+        if question:
+            result = question_service.lookup(question)
+            if result is None:
+                return f"題庫中查無此題的標準答案：{question}"
         else:
-            return f"MCP 工具獲取標準答案失敗：{result.get('message', '未知錯誤')}"
-    except ImportError:
-        # 回退到原始工具
-        if not TOOLS_AVAILABLE:
-            return "工具模組不可用，無法獲取標準答案"
+            result = question_service.random_question()
 
-        try:
-            question_data = question_manager.get_random_question()
-
-            response = f"""
+        return f"""
 ✅ 標準答案
 
-問題：{question_data['question']}
-標準答案：{question_data['standard_answer']}
-來源：{question_data['source']}
+問題：{result.question}
+標準答案：{result.standard_answer}
+來源：{result.source}
             """
-            return response
-        except Exception as e:
-            return f"獲取標準答案失敗：{str(e)}"
     except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
+        return f"獲取標準答案失敗：{str(e)}"
 
 
 def start_interview():
-    """開始互動式面試 - 優先使用 MCP 工具"""
-    try:
-        # 優先使用 MCP 工具
-        from server import conduct_interview as mcp_conduct_interview
-
-        result = mcp_conduct_interview()
-        if result.get("status") == "success":
-            response = f"""
-🤖 MCP 工具智能面試系統！
-
-============================================================
-🎯 面試系統
-============================================================
-{result.get('message', '面試已開始')}
-
-請回答問題，然後使用 analyze_answer 功能來分析您的回答。
-            """
-            return response
-        else:
-            return f"MCP 工具面試失敗：{result.get('message', '未知錯誤')}"
-    except ImportError:
-        # 回退到原始工具
-        if not TOOLS_AVAILABLE:
-            return "工具模組不可用，無法開始面試"
-
-        try:
-            question_data = question_manager.get_random_question()
-            category = _categorize_question(question_data["question"])
-            difficulty = _assess_difficulty(question_data["question"])
+    """開始互動式面試"""
+    if not TOOLS_AVAILABLE:
+        return "工具模組不可用，無法開始面試"
 
-            response = f"""
+    try:
+        result = question_service.random_question()
+        return f"""
 🤖 歡迎使用智能面試系統！
 
 ============================================================
 🎯 面試問題
 ============================================================
-問題：{question_data['question']}
-類別：{category}
-難度：{difficulty}
-來源：{question_data['source']}
+問題：{result.question}
+類別：{result.category}
+難度：{result.difficulty}
+來源：{result.source}
 
 請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
             """
-            return response
-        except Exception as e:
-            return f"開始面試失敗：{str(e)}"
     except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
+        return f"開始面試失敗：{str(e)}"
 
 
 def analyze_intro(user_message: str = "", user_id: str = "default_user"):
-    """分析用戶自我介紹 - 使用 LLM 進行智能分析"""
+    """分析用戶自我介紹 - 使用 LLM 進行智能分析（同一內容只分析一次）"""
     try:
         print(f"📊 分析自我介紹內容: {user_message} (用戶: {user_id})")
 
-        # 優先使用 LLM 分析
-        try:
-            return _llm_analyze_intro(user_message)
-        except Exception as llm_error:
-            print(f"⚠️ LLM 分析失敗，回退到關鍵字分析: {llm_error}")
-            return _fallback_keyword_analysis(user_message)
+        if not TOOLS_AVAILABLE:
+            raise Exception("工具模組不可用")
+
+        # 模型不可用時分析器會自動回退到關鍵字分析
+        analysis = intro_analyzer.analyze(user_id, user_message)
+        llm_used = analysis["method"] == "llm"
+        return {
+            "success": True,
+            "result": _format_intro_report(user_message, analysis),
+            "message": "LLM 智能分析完成" if llm_used else "關鍵字分析完成 (回退方案)",
+            "analysis_data": analysis,
+        }
 
     except Exception as e:
         return {"success": False, "error": f"分析自我介紹失敗: {str(e)}"}
 
 
-def _llm_analyze_intro(user_message: str):
-    """使用 LLM 進行自我介紹分析"""
-    analysis_prompt = f"""
-請分析以下自我介紹內容，按照6個標準進行專業評估：
-
-**自我介紹內容**：
-{user_message}
-
-**評估標準**：
-1. 開場簡介：是否包含身份、專業定位、經驗年數等基本信息
-2. 學經歷概述：是否包含學歷背景、工作經歷、相關經驗等
-3. 核心技能與強項：是否包含技術技能、程式語言、專業能力等
-4. 代表成果：是否包含具體項目、成就、數據或影響力等
-5. 與職缺的連結：是否表達對職位的理解、匹配度或動機等
-6. 結語與期待：是否包含感謝、期待、合作意願等結語
-
-請以 JSON 格式返回分析結果，確保 JSON 格式正確：
-{{
-    "analysis": [
-        {{"standard": "1. 開場簡介", "status": "✅ 已包含" 或 "❌ 缺少", "content": "簡短說明找到的內容或缺失原因", "score": 1-10}},
-        {{"standard": "2. 學經歷概述", "status": "✅ 已包含" 或 "❌ 缺少", "content": "簡短說明找到的內容或缺失原因", "score": 1-10}},
-        {{"standard": "3. 核心技能與強項", "status": "✅ 已包含" 或 "❌ 缺少", "content": "簡短說明找到的內容或缺失原因", "score": 1-10}},
-        {{"standard": "4. 代表成果", "status": "✅ 已包含" 或 "❌ 缺少", "content": "簡短說明找到的內容或缺失原因", "score": 1-10}},
-        {{"standard": "5. 與職缺的連結", "status": "✅ 已包含" 或 "❌ 缺少", "content": "簡短說明找到的內容或缺失原因", "score": 1-10}},
-        {{"standard": "6. 結語與期待", "status": "✅ 已包含" 或 "❌ 缺少", "content": "簡短說明找到的內容或缺失原因", "score": 1-10}}
-    ],
-    "overall_score": "整體評分 (1-10)",
-    "strengths": ["優點1", "優點2"],
-    "suggestions": ["具體改進建議1", "具體改進建議2"]
-}}
-
-請確保返回有效的 JSON 格式，不要添加任何額外的文字說明。
-"""
-
-    # 調用 LLM
-    llm_response = call_openai_for_analysis(analysis_prompt, max_tokens=1500)
-
-    # 解析 JSON 回應
-    try:
-        # 嘗試提取 JSON 部分
-        json_start = llm_response.find("{")
-        json_end = llm_response.rfind("}") + 1
-        if json_start != -1 and json_end > json_start:
-            json_content = llm_response[json_start:json_end]
-        else:
-            json_content = llm_response
-
-        analysis_data = json.loads(json_content)
-    except json.JSONDecodeError as e:
-        print(f"⚠️ JSON 解析失敗: {e}")
-        print(f"LLM 回應: {llm_response}")
-        # 如果 JSON 解析失敗，回退到關鍵字分析
-        raise Exception(f"LLM 返回格式錯誤: {e}")
-
-    # 生成分析報告
+def _format_intro_report(user_message: str, analysis: dict):
+    """將結構化的自我介紹分析轉為報告文字"""
+    llm_used = analysis["method"] == "llm"
+    title = (
+        "**LLM 智能自我介紹分析報告**" if llm_used else "**關鍵字分析報告** (回退方案)"
+    )
     report = f"""
-📊 **LLM 智能自我介紹分析報告**
+📊 {title}
 
 **您的自我介紹內容**：
 {user_message}
@@ -548,42 +412,28 @@ def _llm_analyze_intro(user_message: str):
 **評估結果**：
 """
 
-    for item in analysis_data["analysis"]:
-        report += f"{item['status']} **{item['standard']}** (評分: {item['score']}/10): {item['content']}\n"
+    for key, label in INTRO_DIMENSIONS:
+        item = analysis["dimensions"][key]
+        status = "✅ 已包含" if item["status"] == "ok" else "❌ 缺少"
+        score = f" (評分: {item['score']}/10)" if item["score"] is not None else ""
+        report += f"{status} **{label}**{score}: {item['content']}\n"
 
-    # 處理整體評分，確保顯示具體數字
-    overall_score = analysis_data.get("overall_score", "0")
-    if isinstance(overall_score, str):
-        # 如果是字符串，嘗試提取數字
-        import re
-
-        score_match = re.search(r"(\d+(?:\.\d+)?)", str(overall_score))
-        if score_match:
-            overall_score = score_match.group(1)
-        else:
-            # 如果無法提取，計算平均分
-            scores = [
-                item.get("score", 0) for item in analysis_data.get("analysis", [])
-            ]
-            if scores:
-                overall_score = round(sum(scores) / len(scores), 1)
-            else:
-                overall_score = "0"
-
-    report += f"""
-**整體評分**：{overall_score}/10
+    if analysis["overall_score"] is not None:
+        report += f"""
+**整體評分**：{analysis['overall_score']}/10
+"""
 
+    if analysis["strengths"]:
+        report += f"""
 **您的優點**：
 """
-
-    for strength in analysis_data.get("strengths", []):
-        report += f"• {strength}\n"
+        for strength in analysis["strengths"]:
+            report += f"• {strength}\n"
 
     report += f"""
 **改進建議**：
 """
-
-    for suggestion in analysis_data.get("suggestions", []):
+    for suggestion in analysis["suggestions"] or ["您的自我介紹已經很完整，繼續保持！"]:
         report += f"• {suggestion}\n"
 
     report += f"""
@@ -595,253 +445,20 @@ def _llm_analyze_intro(user_message: str):
 5. 職缺連結：「我認為這個職位與我的XXX經驗匹配」
 6. 結語期待：「期待能為貴公司貢獻我的專長」
     """
-
-    return {
-        "success": True,
-        "result": report,
-        "message": "LLM 智能分析完成",
-        "analysis_data": analysis_data,
-    }
-
-
-def _fallback_keyword_analysis(user_message: str):
-    """回退的關鍵字分析方法"""
-    try:
-        print("🔄 使用關鍵字分析作為回退方案")
-
-        # 改進的關鍵字分析邏輯
-        standards = {
-            "1. 開場簡介": [
-                "我是",
-                "我叫",
-                "身份",
-                "專業定位",
-                "經驗",
-                "年數",
-                "領域",
-                "工程師",
-                "開發者",
-                "程式設計師",
-                "資深",
-                "初級",
-                "中級",
-            ],
-            "2. 學經歷概述": [
-                "學歷",
-                "畢業",
-                "大學",
-                "碩士",
-                "博士",
-                "工作經歷",
-                "任職",
-                "擔任",
-                "相關經驗",
-                "職位",
-                "公司",
-                "服務",
-                "工作",
-                "經歷",
-                "背景",
-            ],
-            "3. 核心技能與強項": [
-                "技術",
-                "技能",
-                "軟技能",
-                "專長",
-                "優勢",
-                "擅長",
-                "熟悉",
-                "會",
-                "python",
-                "java",
-                "javascript",
-                "react",
-                "vue",
-                "angular",
-                "node",
-                "django",
-                "flask",
-                "spring",
-                "mysql",
-                "postgresql",
-                "mongodb",
-                "docker",
-                "kubernetes",
-                "aws",
-                "azure",
-                "linux",
-                "git",
-                "html",
-                "css",
-                "typescript",
-                "php",
-                "c++",
-                "golang",
-                "rust",
-                "程式語言",
-                "框架",
-                "資料庫",
-                "雲端",
-                "機器學習",
-                "ai",
-                "devops",
-            ],
-            "4. 代表成果": [
-                "專案",
-                "項目",
-                "開發",
-                "建立",
-                "完成",
-                "達成",
-                "提升",
-                "改善",
-                "具體成果",
-                "數據",
-                "影響力",
-                "價值",
-                "成就",
-                "貢獻",
-                "效率",
-                "降低",
-                "增加",
-                "優化",
-                "實作",
-                "建置",
-            ],
-            "5. 與職缺的連結": [
-                "職位",
-                "工作",
-                "公司",
-                "團隊",
-                "匹配",
-                "適合",
-                "目標",
-                "動機",
-                "希望",
-                "想要",
-                "貢獻",
-                "加入",
-                "發展",
-                "成長",
-                "學習",
-            ],
-            "6. 結語與期待": [
-                "期待",
-                "希望",
-                "感謝",
-                "謝謝",
-                "合作",
-                "學習",
-                "成長",
-                "貢獻",
-                "機會",
-                "未來",
-                "發展",
-                "態度",
-                "意願",
-                "請多指教",
-            ],
-        }
-
-        # 改進的匹配邏輯
-        analysis_result = []
-        missing_parts = []
-        suggestions = []
-        lower_message = user_message.lower()
-
-        for standard, keywords in standards.items():
-            found_keywords = []
-            for keyword in keywords:
-                # 更靈活的匹配邏輯
-                if keyword.lower() in lower_message:
-                    found_keywords.append(keyword)
-                # 特別處理技能相關的匹配
-                elif standard == "3. 核心技能與強項" and keyword in [
-                    "會",
-                    "熟悉",
-                    "擅長",
-                ]:
-                    # 檢查是否有技術相關詞彙
-                    tech_keywords = [
-                        "python",
-                        "java",
-                        "javascript",
-                        "react",
-                        "vue",
-                        "angular",
-                        "node",
-                        "django",
-                        "flask",
-                        "spring",
-                        "mysql",
-                        "postgresql",
-                        "mongodb",
-                        "docker",
-                        "kubernetes",
-                        "aws",
-                        "azure",
-                        "linux",
-                        "git",
-                        "html",
-                        "css",
-                        "typescript",
-                        "php",
-                        "c++",
-                        "golang",
-                        "rust",
-                    ]
-                    if any(tech in lower_message for tech in tech_keywords):
-                        found_keywords.append(keyword)
-
-            if found_keywords:
-                unique_keywords = list(set(found_keywords))[:3]
-                analysis_result.append(
-                    f"✅ **{standard}**: 已提及 - {', '.join(unique_keywords)}"
-                )
-            else:
-                missing_parts.append(f"❌ **{standard}**: 缺少相關內容")
-                suggestions.append(f"建議補充{standard}的內容")
-
-        # 生成報告
-        report = f"""
-📊 **關鍵字分析報告** (回退方案)
-
-**您的自我介紹內容**：
-{user_message}
-
-**評估結果**：
-{chr(10).join(analysis_result)}
-
-{chr(10).join(missing_parts) if missing_parts else '🎉 您的自我介紹結構完整！'}
-
-**改進建議**：
-{chr(10).join([f"• {suggestion}" for suggestion in suggestions]) if suggestions else "• 您的自我介紹已經很完整，繼續保持！"}
-
-**參考範例結構**：
-1. 開場簡介：「您好，我是XXX，一位有X年經驗的XXX」
-2. 學經歷：「我畢業於XXX，在XXX公司擔任XXX」  
-3. 技能強項：「我熟悉XXX技術，擅長XXX」
-4. 代表成果：「我曾經XXX，提升了X%效率」
-5. 職缺連結：「我認為這個職位與我的XXX經驗匹配」
-6. 結語期待：「期待能為貴公司貢獻我的專長」
-        """
-
-        return {
-            "success": True,
-            "result": report,
-            "message": "關鍵字分析完成 (回退方案)",
-        }
-    except Exception as e:
-        return {"success": False, "error": f"關鍵字分析失敗: {str(e)}"}
+    return report
 
 
-def generate_final_summary(user_message: str = "", interview_data: dict | None = None):
+def generate_final_summary(
+    user_message: str = "",
+    interview_data: dict | None = None,
+    user_id: str = "default_user",
+):
     """生成最終面試總結和建議"""
     try:
         print(f"📋 生成最終面試總結")
 
         # 收集實際的面試數據
-        actual_data = _collect_actual_interview_data(interview_data)
+        actual_data = _collect_actual_interview_data(interview_data, user_id)
 
         # 基於實際數據生成總結
         return _generate_comprehensive_summary(actual_data)
@@ -850,24 +467,44 @@ def generate_final_summary(user_message: str = "", interview_data: dict | None =
         return {"success": False, "error": f"生成最終總結失敗: {str(e)}"}
 
 
-def _collect_actual_interview_data(interview_data: dict | None = None):
+def _collect_actual_interview_data(
+    interview_data: dict | None = None, user_id: str = "default_user"
+):
     """收集實際的面試數據"""
     try:
         # 收集自我介紹內容
-        intro_content = get_collected_intro("default_user")
+        intro_content = get_collected_intro(user_id)
+
+        # 沿用自我介紹分析階段的結構化結果；內容相同時不會再呼叫模型
+        intro_analysis = None
+        if intro_content and TOOLS_AVAILABLE:
+            intro_analysis = intro_analyzer.analyze(
+                user_id, intro_content, priority=PRIORITY_BATCH
+            )
 
         # 初始化數據結構
         actual_data = {
             "intro_content": intro_content,
-            "intro_analysis": None,
+            "intro_analysis": intro_analysis,
             "questions_and_answers": [],
             "scores": [],
             "total_questions": 0,
             "average_score": 0,
         }
 
-        # 如果有前端傳來的面試數據，使用它
-        if interview_data and "chat_history" in interview_data:
+        # 以伺服器端的會話彙總為準：只讀出題數與分數，不解析對話內容
+        aggregate = None
+        if TOOLS_AVAILABLE:
+            try:
+                aggregate = session_store.session_aggregate(user_id)
+            except Exception as e:
+                print(f"⚠️ 讀取會話彙總失敗: {e}")
+
+        if aggregate and (aggregate["total_questions"] or aggregate["answered"]):
+            actual_data["total_questions"] = aggregate["total_questions"]
+            actual_data["scores"] = aggregate["scores"]
+        # 舊版客戶端仍會上傳完整對話紀錄；伺服器沒有紀錄時才解析
+        elif interview_data and "chat_history" in interview_data:
             chat_history = interview_data["chat_history"]
 
             for chat in chat_history:
@@ -875,12 +512,8 @@ def _collect_actual_interview_data(interview_data: dict | None = None):
                 ai_response = chat.get("ai", "")
                 user_message = chat.get("user", "")
 
-                # 收集自我介紹分析
-                if stage == "intro_analysis" and "自我介紹分析" in ai_response:
-                    actual_data["intro_analysis"] = ai_response
-
                 # 收集問答對話和評分
-                elif stage == "questioning":
+                if stage == "questioning":
                     if "請給我問題" in user_message and "問題：" in ai_response:
                         # 這是一個問題
                         actual_data["questions_and_answers"].append(
@@ -901,14 +534,15 @@ def _collect_actual_interview_data(interview_data: dict | None = None):
                         if score is not None:
                             actual_data["scores"].append(score)
 
+            actual_data["total_questions"] = len(
+                [
+                    qa
+                    for qa in actual_data["questions_and_answers"]
+                    if qa["type"] == "question"
+                ]
+            )
+
         # 計算統計數據
-        actual_data["total_questions"] = len(
-            [
-                qa
-                for qa in actual_data["questions_and_answers"]
-                if qa["type"] == "question"
-            ]
-        )
         if actual_data["scores"]:
             actual_data["average_score"] = sum(actual_data["scores"]) / len(
                 actual_data["scores"]
@@ -966,7 +600,7 @@ def _generate_comprehensive_summary(actual_data: dict):
             summary_parts.append("")
 
         # 面試問答分析部分
-        if actual_data["questions_and_answers"]:
+        if actual_data["total_questions"] or actual_data["scores"]:
             summary_parts.append("💬 **面試問答表現**：")
             summary_parts.append(
                 f"📊 總共回答了 {actual_data['total_questions']} 個問題"
@@ -1009,26 +643,23 @@ def _generate_comprehensive_summary(actual_data: dict):
         return _generate_template_summary()
 
 
-def _extract_intro_summary(intro_analysis: str):
-    """從自我介紹分析中提取關鍵摘要"""
+def _extract_intro_summary(intro_analysis: dict):
+    """從結構化的自我介紹分析中提取關鍵摘要"""
     try:
-        # 提取評分和主要建議
-        lines = intro_analysis.split("\n")
         summary_points = []
-
-        for line in lines:
-            if "評分:" in line or "評分：" in line or "總分" in line:
-                summary_points.append(f"📊 {line.strip()}")
-            elif line.strip().startswith("✅") and len(line.strip()) < 100:
-                summary_points.append(line.strip())
-            elif line.strip().startswith("❌") and len(line.strip()) < 100:
-                summary_points.append(line.strip())
-
-        if summary_points:
-            return "\n".join(summary_points[:3])  # 最多3個要點
-        else:
-            return "✅ 自我介紹內容已收到並分析，展現了您的背景和能力。"
-    except:
+        if intro_analysis["overall_score"] is not None:
+            summary_points.append(f"📊 整體評分：{intro_analysis['overall_score']}/10")
+
+        # 優先列出缺少的構面與建議
+        for key, label in INTRO_DIMENSIONS:
+            item = intro_analysis["dimensions"][key]
+            if item["status"] == "miss":
+                summary_points.append(f"❌ {label}：{item['tip'] or item['content']}")
+
+        if len(summary_points) <= 1:
+            summary_points.append("✅ 六個構面皆已涵蓋，結構完整。")
+        return "\n".join(summary_points[:3])  # 最多3個要點
+    except Exception:
         return "✅ 自我介紹階段已完成。"
 
 
@@ -1253,97 +884,142 @@ def interview_system():
     """
 
 
-# 輔助函數
-def _categorize_question(question: str) -> str:
-    """對問題進行分類"""
-    categories = {
-        "自我介紹": ["介紹", "自己", "背景", "經歷"],
-        "技術能力": ["技術", "技能", "程式", "開發", "程式設計"],
-        "專案經驗": ["專案", "經驗", "實作", "作品"],
-        "問題解決": ["問題", "解決", "困難", "挑戰"],
-        "團隊合作": ["團隊", "合作", "溝通", "協作"],
-        "學習能力": ["學習", "成長", "進步", "新技術"],
-    }
+# 明確的自我介紹句型（僅短句時視為自我介紹而非面試回答）
+_SELF_INTRO_PHRASES = [
+    "我叫",
+    "我的名字是",
+    "我的名字叫",
+    "自我介紹一下",
+    "讓我自我介紹",
+]
+_self_intro_matcher = (
+    KeywordMatcher({"self_intro": _SELF_INTRO_PHRASES}) if TOOLS_AVAILABLE else None
+)
 
-    question_lower = question.lower()
-    for category, keywords in categories.items():
-        if any(keyword in question_lower for keyword in keywords):
-            return category
 
-    return "一般問題"
+# 輔助函數
+def _record_history_event(
+    event_type: str,
+    user_id: str,
+    question: str,
+    question_data: dict | None = None,
+    user_answer: str = "",
+    grading=None,
+):
+    """將出題或作答事件寫入會話事件儲存（失敗不影響主流程）"""
+    if not TOOLS_AVAILABLE:
+        return
+    try:
+        if event_type == "question":
+            session_store.record_question(user_id, question_data or {})
+        else:
+            session_store.record_answer(
+                user_id,
+                question,
+                categorize_question(question),
+                user_answer,
+                grading.to_dict() if grading is not None else {},
+            )
+    except Exception as e:
+        print(f"⚠️ 寫入會話歷史失敗: {e}")
 
 
-def _assess_difficulty(question: str) -> str:
-    """評估問題難度"""
-    question_lower = question.lower()
+def record_chat_turn(
+    user_id: str,
+    user_message: str,
+    ai_response: str,
+    stage: str = "",
+    pushed: bool = False,
+):
+    """將一輪對話寫入伺服器端的會話紀錄（失敗不影響主流程）"""
+    if not TOOLS_AVAILABLE:
+        return
+    try:
+        session_store.record_turn(user_id, user_message, ai_response, stage, pushed)
+    except Exception as e:
+        print(f"⚠️ 寫入對話紀錄失敗: {e}")
 
-    if len(question) < 50:
-        return "簡單"
-    elif len(question) < 100:
-        return "中等"
-    else:
-        return "困難"
+
+def get_chat_history(user_id: str = "default_user", limit: int = 50):
+    """本次面試最近的對話紀錄（由舊到新），供前端重新載入時還原"""
+    if not TOOLS_AVAILABLE:
+        return []
+    try:
+        return session_store.session_turns(user_id, limit)
+    except Exception as e:
+        print(f"⚠️ 讀取對話紀錄失敗: {e}")
+        return []
 
 
 # 橋接函數
+def _register_tools():
+    """
+    登錄 Fast Agent API 可呼叫的函式。
+
+    這些函式同時被面試流程直接呼叫，中介層只套用在經由 API 的呼叫；
+    會使用模型的函式依用戶限流。評分結果由評分服務快取，與 MCP 伺服器共用
+    """
+    tools = (
+        (get_question, [RateLimit(30)]),
+        (analyze_answer, [RateLimit(20)]),
+        (intro_collector, [RateLimit(60)]),
+        (analyze_intro, [RateLimit(10)]),
+        (generate_final_summary, [RateLimit(10)]),
+        (get_standard_answer, []),
+        (start_interview, []),
+        (interview_system, []),
+        (clear_collected_intro, []),
+        (clear_all_user_data, []),
+    )
+    for func, middleware in tools:
+        tool_registry.register(func, middleware=[Timing(), *middleware])
+
+    # MCP 伺服器的工具登錄在同一份登錄表（名稱為 mcp.<工具>），API 也可直接呼叫；
+    # 只導入工具定義模組，不執行 MCP 伺服器的進入點
+    import tools.mcp_tools  # noqa: F401
+
+
+if TOOLS_AVAILABLE:
+    _register_tools()
+
+
+def _normalize_result(result):
+    """將工具結果統一為 {"success": ..., "result": ...} 格式"""
+    if isinstance(result, dict):
+        if "success" in result:
+            return result
+        # MCP 工具以 status 表示成敗
+        if result.get("status") in ("error", "not_found"):
+            return {"success": False, "error": result.get("message", "未知錯誤")}
+    return {"success": True, "result": result}
+
+
 def call_fast_agent_function(function_name, **kwargs):
-    """調用 Fast Agent 功能"""
+    """調用 Fast Agent 功能（依名稱查詢工具登錄表，參數依函式簽章驗證）"""
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用"}
     try:
-        if function_name == "get_question":
-            result = get_question()
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "analyze_answer":
-            result = analyze_answer(**kwargs)
-            return result  # analyze_answer 現在返回統一格式
-        elif function_name == "intro_collector":
-            result = intro_collector(**kwargs)
-            return result  # intro_collector 返回統一格式
-        elif function_name == "analyze_intro":
-            result = analyze_intro(**kwargs)
-            return result  # analyze_intro 返回統一格式
-        elif function_name == "generate_final_summary":
-            result = generate_final_summary(**kwargs)
-            return result  # generate_final_summary 返回統一格式
-        elif function_name == "get_standard_answer":
-            result = get_standard_answer(**kwargs)
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "start_interview":
-            result = start_interview()
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "interview_system":
-            result = interview_system()
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "clear_collected_intro":
-            result = clear_collected_intro(**kwargs)
-            return result
-        elif function_name == "clear_all_user_data":
-            result = clear_all_user_data(**kwargs)
-            return result
-        else:
-            return {
-                "success": False,
-                "error": f"Fast Agent 函數 {function_name} 不存在",
-            }
+        return _normalize_result(tool_registry.call(function_name, kwargs))
+    except ToolNotFoundError:
+        return {
+            "success": False,
+            "error": f"Fast Agent 函數 {function_name} 不存在",
+        }
+    except ToolRateLimitError as e:
+        return {"success": False, "error": str(e), "status_code": 429}
+    except ToolError as e:
+        return {"success": False, "error": str(e)}
     except Exception as e:
         return {"success": False, "error": f"Fast Agent 調用失敗: {str(e)}"}
 
 
+def list_fast_agent_functions():
+    """可呼叫的函式與其參數規格"""
+    if not TOOLS_AVAILABLE:
+        return {}
+    return tool_registry.describe()
+
+
 if __name__ == "__main__":
     # 測試橋接功能
     print("測試 Fast Agent 橋接功能...")
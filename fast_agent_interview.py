@@ -23,9 +23,8 @@ except ImportError:
 # 創建 Fast Agent 應用
 fast = FastAgent("Interview Agent System")
 
-# 導入現有的工具模組
-from tools.answer_analyzer import answer_analyzer
-from tools.question_manager import question_manager
+# 導入現有的工具模組（出題與評分直接呼叫服務層，與 MCP 伺服器共用同一份邏輯）
+from tools.interview_services import grading_service, question_service
 
 
 @fast.agent(
@@ -64,123 +63,60 @@ async def interview_system():
 
 @fast.agent(
     name="get_question",
-    instruction_or_kwarg="獲取隨機面試問題 - 使用 MCP 工具",
+    instruction_or_kwarg="獲取隨機面試問題",
     servers=["interview"],
     model="gpt-4o-mini",
 )
 async def get_question():
-    """獲取隨機面試問題 - 優先使用 MCP 工具"""
+    """獲取隨機面試問題"""
     try:
-        # 優先使用 MCP 工具
-        from server import get_random_question as mcp_get_random_question
-
-        result = mcp_get_random_question()
-        if result.get("status") == "success":
-            response = f"""
-🎯 MCP 工具面試問題
-
-問題：{result['question']}
-類別：{result['category']}
-難度：{result['difficulty']}
-來源：{result['source']}
-
-請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
-            """
-            return response
-        else:
-            return f"MCP 工具獲取問題失敗：{result.get('message', '未知錯誤')}"
-    except ImportError:
-        # 回退到原始工具
-        try:
-            question_data = question_manager.get_random_question()
-            category = _categorize_question(question_data["question"])
-            difficulty = _assess_difficulty(question_data["question"])
-
-            response = f"""
+        result = question_service.random_question()
+        response = f"""
 🎯 面試問題
 
-問題：{question_data['question']}
-類別：{category}
-難度：{difficulty}
-來源：{question_data['source']}
+問題：{result.question}
+類別：{result.category}
+難度：{result.difficulty}
+來源：{result.source}
 
 請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
             """
-            return response
-        except Exception as e:
-            return f"獲取問題失敗：{str(e)}"
+        return response
     except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
+        return f"獲取問題失敗：{str(e)}"
 
 
 @fast.agent(
     name="analyze_answer",
-    instruction_or_kwarg="分析用戶回答並評分 - 使用 MCP 工具",
+    instruction_or_kwarg="分析用戶回答並評分",
     servers=["interview"],
     model="gpt-4o-mini",
 )
 async def analyze_answer(
     user_answer: str = "", question: str = "", standard_answer: str = ""
 ):
-    """分析用戶回答 - 優先使用 MCP 工具"""
+    """分析用戶回答（未提供標準答案時依題目查詢題庫）"""
     try:
-        # 優先使用 MCP 工具
-        from server import analyze_user_answer as mcp_analyze_user_answer
-
-        result = mcp_analyze_user_answer(
-            user_answer=user_answer, question=question, standard_answer=standard_answer
-        )
-
-        if result.get("status") == "success":
-            response = f"""
-📊 MCP 工具分析結果
+        result = grading_service.grade(user_answer, question, standard_answer)
 
-評分：{result.get('score', 'N/A')}/100 ({result.get('grade', 'N/A')})
-相似度：{result.get('similarity', 'N/A')}
-反饋：{result.get('feedback', '無反饋')}
-
-標準答案：{result.get('standard_answer', standard_answer)}
-            """
-
-            if result.get("differences"):
-                response += "\n🔍 具體差異：\n"
-                for diff in result["differences"]:
-                    response += f"  • {diff}\n"
-
-            return response
-        else:
-            return f"MCP 工具分析失敗：{result.get('message', '未知錯誤')}"
-    except ImportError:
-        # 回退到原始工具
-        try:
-            # 如果沒有提供標準答案，嘗試從問題獲取
-            if not standard_answer:
-                question_data = question_manager.get_random_question()
-                standard_answer = question_data.get("standard_answer", "標準答案未提供")
-
-            # 使用答案分析器分析
-            analysis = answer_analyzer.analyze_answer(user_answer, standard_answer)
-
-            response = f"""
+        response = f"""
 📊 分析結果
 
-評分：{analysis['score']}/100 ({analysis['grade']})
-相似度：{analysis['similarity']:.1%}
-反饋：{analysis['feedback']}
+評分：{result.score}/100 ({result.grade})
+相似度：{result.similarity:.1%}
+反饋：{result.feedback}
 
-標準答案：{standard_answer}
+標準答案：{result.standard_answer}
             """
 
-            if analysis["differences"]:
-                response += "\n🔍 具體差異：\n"
-                for diff in analysis["differences"]:
-                    response += f"  • {diff}\n"
+        if result.differences:
+            response += "\n🔍 具體差異：\n"
+            for diff in result.differences:
+                response += f"  • {diff}\n"
 
-            return response
-        except Exception as e:
-            return f"分析失敗：{str(e)}"
+        return response
     except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
+        return f"分析失敗：{str(e)}"
 
 
 @fast.agent(
@@ -190,16 +126,21 @@ async def analyze_answer(
     model="gpt-4o-mini",
 )
 async def get_standard_answer(question: str = ""):
-    """獲取標準答案"""
+    """獲取標準答案（未指定題目時隨機取一題）"""
     try:
-        question_data = question_manager.get_random_question()
+        if question:
+            result = question_service.lookup(question)
+            if result is None:
+                return f"題庫中查無此題的標準答案：{question}"
+        else:
+            result = question_service.random_question()
 
         response = f"""
 ✅ 標準答案
 
-問題：{question_data['question']}
-標準答案：{question_data['standard_answer']}
-來源：{question_data['source']}
+問題：{result.question}
+標準答案：{result.standard_answer}
+來源：{result.source}
         """
         return response
     except Exception as e:
@@ -215,9 +156,7 @@ async def get_standard_answer(question: str = ""):
 async def start_interview():
     """開始互動式面試"""
     try:
-        question_data = question_manager.get_random_question()
-        category = _categorize_question(question_data["question"])
-        difficulty = _assess_difficulty(question_data["question"])
+        result = question_service.random_question()
 
         response = f"""
 🤖 歡迎使用智能面試系統！
@@ -225,10 +164,10 @@ async def start_interview():
 ============================================================
 🎯 面試問題
 ============================================================
-問題：{question_data['question']}
-類別：{category}
-難度：{difficulty}
-來源：{question_data['source']}
+問題：{result.question}
+類別：{result.category}
+難度：{result.difficulty}
+來源：{result.source}
 
 請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
         """
@@ -237,38 +176,6 @@ async def start_interview():
         return f"開始面試失敗：{str(e)}"
 
 
-# 輔助函數
-def _categorize_question(question: str) -> str:
-    """對問題進行分類"""
-    categories = {
-        "自我介紹": ["介紹", "自己", "背景", "經歷"],
-        "技術能力": ["技術", "技能", "程式", "開發", "程式設計"],
-        "專案經驗": ["專案", "經驗", "實作", "作品"],
-        "問題解決": ["問題", "解決", "困難", "挑戰"],
-        "團隊合作": ["團隊", "合作", "溝通", "協作"],
-        "學習能力": ["學習", "成長", "進步", "新技術"],
-    }
-
-    question_lower = question.lower()
-    for category, keywords in categories.items():
-        if any(keyword in question_lower for keyword in keywords):
-            return category
-
-    return "一般問題"
-
-
-def _assess_difficulty(question: str) -> str:
-    """評估問題難度"""
-    question_lower = question.lower()
-
-    if len(question) < 50:
-        return "簡單"
-    elif len(question) < 100:
-        return "中等"
-    else:
-        return "困難"
-
-
 # 主函數 - 使用 Fast Agent MCP
 async def main():
     """主函數 - 使用 Fast Agent MCP"""
@@ -5,6 +5,7 @@ MCP HTTP 橋梁包裝器 - 只負責協議轉換
 
 import json
 import logging
+import os
 import sys
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlparse
@@ -89,9 +90,9 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
         self.end_headers()
 
 
-def main():
-    """主函數"""
-    port = 8080
+def main(port=None):
+    """主函數（埠號預設取自 HTTP_WRAPPER_PORT 環境變數，未設定時為 8080）"""
+    port = port or int(os.environ.get("HTTP_WRAPPER_PORT", "8080"))
     try:
         server = HTTPServer(("localhost", port), MCPHTTPHandler)
         logger.info(f"🚀 啟動 MCP HTTP 橋梁 - http://localhost:{port}")
@@ -9,6 +9,8 @@ from typing import Any, Dict, List
 
 from pymongo import MongoClient
 
+from tools.question_index import question_index
+
 
 class MongoDBQueryTool:
     """MongoDB 查詢工具"""
@@ -101,16 +103,14 @@ class MongoDBQueryTool:
             print(f"❌ 計算錯誤: {e}")
 
     def search_text(self, text: str, limit: int = 5):
-        """文字搜尋"""
-        if not self.current_collection:
-            print("❌ 請先選擇集合 (use collection_name)")
-            return
-
+        """文字搜尋（使用本地題庫索引，支援中文；已選擇集合時只搜尋該集合）"""
         try:
-            # 使用文字索引搜尋
-            documents = list(
-                self.current_collection.find({"$text": {"$search": text}}).limit(limit)
+            source = (
+                self.current_collection.name
+                if self.current_collection is not None
+                else None
             )
+            documents = question_index.search(text, limit, source=source)
 
             print(f"=== 文字搜尋 '{text}' 結果: {len(documents)} 筆資料 ===")
             for i, doc in enumerate(documents, 1):
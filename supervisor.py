@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+服務監督模組
+以子行程平行啟動各組件，依就緒探測判斷啟動完成（不以固定秒數等待），
+子行程異常結束時以指數退避重新啟動，收到中止訊號時平滑關閉所有組件
+"""
+
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+IS_POSIX = os.name == "posix"
+
+Probe = Callable[[], bool]
+
+
+# 就緒探測 -----------------------------------------------------------------
+def http_probe(url: str, timeout: float = 1.0) -> Probe:
+    """回應任何非 5xx 的 HTTP 狀態即視為就緒"""
+
+    def probe() -> bool:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except (OSError, ValueError):
+            return False
+
+    return probe
+
+
+def tcp_probe(host: str, port: int, timeout: float = 0.5) -> Probe:
+    """可建立 TCP 連線即視為就緒"""
+
+    def probe() -> bool:
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    return probe
+
+
+# 啟動分析 -----------------------------------------------------------------
+class StartupProfile:
+    """記錄啟動各階段的開始時間與耗時，輸出 --profile-startup 報告"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._spans: List[Tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end: float) -> None:
+        with self._lock:
+            self._spans.append((name, start - self.origin, end - start))
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def report(self) -> str:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda span: span[1])
+        total = time.perf_counter() - self.origin
+        width = 40
+        lines = [
+            "⏱️ 啟動時間分析",
+            f"{'階段':<28}{'開始(ms)':>10}{'耗時(ms)':>10}",
+        ]
+        for name, offset, elapsed in spans:
+            begin = int(offset / total * width) if total else 0
+            length = max(1, int(elapsed / total * width)) if total else 1
+            bar = " " * begin + "█" * length
+            lines.append(
+                f"{name:<28}{offset * 1000:>10.0f}{elapsed * 1000:>10.0f}  |{bar}"
+            )
+        lines.append(f"{'總計':<28}{'':>10}{total * 1000:>10.0f}")
+        return "\n".join(lines)
+
+
+# 監督 ---------------------------------------------------------------------
+class Component:
+    """
+    一個受監督的子行程。
+
+    restart：always（結束即重啟）、on-failure（非 0 結束碼才重啟）、never
+    interactive：需要終端機輸入的組件留在前景行程群組，不另開工作階段
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: List[str],
+        cwd: Optional[Path] = None,
+        probe: Optional[Probe] = None,
+        restart: str = "on-failure",
+        ready_timeout: float = 60.0,
+        interactive: bool = False,
+        env: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.probe = probe
+        self.restart = restart
+        self.ready_timeout = ready_timeout
+        self.interactive = interactive
+        self.env = env
+
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at: Optional[float] = None
+        self.ready = threading.Event()
+
+    def should_restart(self, returncode: int) -> bool:
+        if self.restart == "always":
+            return True
+        return self.restart == "on-failure" and returncode != 0
+
+
+class Supervisor:
+    """平行啟動、探測就緒、失敗重啟與平滑關閉"""
+
+    BACKOFF_INITIAL = 1.0
+    BACKOFF_MAX = 30.0
+    # 連續運作超過此秒數後，重啟退避重新計算
+    STABLE_UPTIME = 60.0
+    # 送出終止訊號後等待子行程自行結束的秒數，逾時則強制結束
+    GRACE_PERIOD = 10.0
+    # 強制結束後等待行程回收的秒數
+    KILL_TIMEOUT = 5.0
+    PROBE_INTERVAL = 0.2
+
+    def __init__(
+        self, components: Iterable[Component], profile: Optional[StartupProfile] = None
+    ):
+        self.components = list(components)
+        self.profile = profile
+        self._stopping = threading.Event()
+
+    def run(self, prestart: Iterable[Tuple[str, Callable[[], None]]] = ()) -> None:
+        """
+        啟動所有組件並持續監督，直到收到中止訊號或所有組件都已結束。
+
+        prestart 為 (名稱, 函式) 清單，與組件同時在背景執行緒中執行（例如產生頁面、自我檢查）。
+        """
+        self._install_signal_handlers()
+        tasks = [
+            threading.Thread(target=self._run_task, args=task, daemon=True)
+            for task in prestart
+        ]
+        for task in tasks:
+            task.start()
+        for component in self.components:
+            self._spawn(component)
+
+        self._wait_until_ready()
+        for task in tasks:
+            task.join()
+        if self.profile:
+            print(self.profile.report(), flush=True)
+
+        try:
+            while not self._stopping.is_set():
+                if not self._check_children():
+                    logger.info("ℹ️ 所有組件都已結束")
+                    break
+                self._stopping.wait(0.5)
+        finally:
+            self.shutdown()
+
+    def stop(self) -> None:
+        """要求監督迴圈結束（可由其他執行緒或訊號處理器呼叫）"""
+        self._stopping.set()
+
+    def shutdown(self) -> None:
+        """對所有子行程送出終止訊號，等待寬限期後強制結束仍在執行者"""
+        running = [c for c in self.components if self._is_running(c)]
+        for component in reversed(running):
+            logger.info(f"🛑 停止 {component.name}...")
+            self._signal(component)
+
+        deadline = time.monotonic() + self.GRACE_PERIOD
+        for component in running:
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                component.process.wait(timeout=remaining)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"⚠️ {component.name} 未在時限內結束，強制終止")
+                self._signal(component, kill=True)
+                try:
+                    component.process.wait(timeout=self.KILL_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    logger.error(
+                        f"❌ 無法結束 {component.name} (pid {component.process.pid})"
+                    )
+        logger.info("👋 所有組件已停止")
+
+    # 內部 -----------------------------------------------------------------
+    def _run_task(self, name: str, fn: Callable[[], None]) -> None:
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"❌ {name} 失敗: {e}")
+        finally:
+            if self.profile:
+                self.profile.record(name, start, time.perf_counter())
+
+    def _spawn(self, component: Component) -> None:
+        start = time.perf_counter()
+        component.ready.clear()
+        component.restart_at = None
+        env = {**os.environ, **(component.env or {})}
+        component.process = subprocess.Popen(
+            component.command,
+            cwd=str(component.cwd) if component.cwd else None,
+            env=env,
+            # 獨立的工作階段讓終止訊號能送達整個行程群組（包含開發伺服器的重載子行程）
+            start_new_session=IS_POSIX and not component.interactive,
+        )
+        component.started_at = time.monotonic()
+        if self.profile:
+            self.profile.record(f"啟動 {component.name}", start, time.perf_counter())
+        logger.info(f"🚀 已啟動 {component.name} (pid {component.process.pid})")
+
+        threading.Thread(
+            target=self._watch_readiness, args=(component, start), daemon=True
+        ).start()
+
+    def _watch_readiness(self, component: Component, start: float) -> None:
+        process = component.process
+        if component.probe is None:
+            component.ready.set()
+            return
+
+        deadline = time.monotonic() + component.ready_timeout
+        while not self._stopping.is_set() and process.poll() is None:
+            if component.probe():
+                component.ready.set()
+                if self.profile:
+                    self.profile.record(
+                        f"{component.name} 就緒", start, time.perf_counter()
+                    )
+                logger.info(f"✅ {component.name} 已就緒")
+                return
+            if time.monotonic() > deadline:
+                logger.warning(
+                    f"⚠️ {component.name} 在 {component.ready_timeout:.0f} 秒內未就緒"
+                )
+                return
+            time.sleep(self.PROBE_INTERVAL)
+
+    def _wait_until_ready(self) -> None:
+        for component in self.components:
+            timeout = component.ready_timeout - (
+                time.monotonic() - component.started_at
+            )
+            component.ready.wait(max(0.0, timeout))
+        ready = [c.name for c in self.components if c.ready.is_set()]
+        logger.info(f"🎯 已就緒組件: {', '.join(ready) or '無'}")
+
+    def _check_children(self) -> bool:
+        """檢查子行程，必要時排程或執行重啟；回傳是否仍有組件在執行或等待重啟"""
+        alive = False
+        now = time.monotonic()
+        for component in self.components:
+            if component.restart_at is not None:
+                alive = True
+                if now >= component.restart_at:
+                    logger.info(f"🔄 重新啟動 {component.name}...")
+                    self._spawn(component)
+                continue
+            if component.process is None:
+                continue
+
+            returncode = component.process.poll()
+            if returncode is None:
+                alive = True
+                continue
+
+            uptime = now - component.started_at
+            if not component.should_restart(returncode):
+                logger.info(f"ℹ️ {component.name} 已結束 (結束碼 {returncode})")
+                component.process = None
+                continue
+
+            if uptime > self.STABLE_UPTIME:
+                component.failures = 0
+            delay = min(self.BACKOFF_MAX, self.BACKOFF_INITIAL * 2**component.failures)
+            component.failures += 1
+            component.restart_at = now + delay
+            alive = True
+            logger.warning(
+                f"⚠️ {component.name} 異常結束 (結束碼 {returncode})，{delay:.0f} 秒後重新啟動"
+            )
+        return alive
+
+    @staticmethod
+    def _is_running(component: Component) -> bool:
+        return component.process is not None and component.process.poll() is None
+
+    @staticmethod
+    def _signal(component: Component, kill: bool = False) -> None:
+        """送出終止訊號；kill 為真時強制結束（POSIX 上為 SIGKILL）"""
+        process = component.process
+        try:
+            if IS_POSIX and not component.interactive:
+                os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+            elif kill:
+                process.kill()
+            else:
+                process.terminate()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def handle(signum, frame):
+            logger.info("🛑 收到中止訊號，正在關閉所有組件...")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, handle)
+
+
+def build_components(prod: bool = False, http_port: int = 8080) -> List[Component]:
+    """整合系統的標準組件：虛擬面試系統、HTTP 包裝器（監聽 http_port）與 Fast Agent"""
+    port = int(os.environ.get("FLASK_PORT", "5000"))
+    interviewer_command = [sys.executable, "run.py"] + (["--prod"] if prod else [])
+    return [
+        Component(
+            "virtual_interviewer",
+            interviewer_command,
+            cwd=ROOT_DIR / "virtual_interviewer",
+            probe=http_probe(f"http://127.0.0.1:{port}/api/metrics"),
+            restart="always",
+        ),
+        Component(
+            "http_wrapper",
+            [sys.executable, "http_wrapper.py"],
+            cwd=ROOT_DIR,
+            probe=tcp_probe("localhost", http_port),
+            restart="always",
+            env={"HTTP_WRAPPER_PORT": str(http_port)},
+        ),
+        # 互動式會話：用戶正常結束時不重啟，只在異常結束時重啟
+        Component(
+            "fast_agent",
+            [sys.executable, "fast_agent_interview.py"],
+            cwd=ROOT_DIR,
+            restart="on-failure",
+            interactive=True,
+        ),
+    ]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+測試自動出題排程
+驗證排程取代、取消與到期推送之間的競爭，以及閒置設定的清除
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 服務模組位於 virtual_interviewer 目錄
+sys.path.insert(0, str(Path(__file__).parent / "virtual_interviewer"))
+
+from services.auto_advance import AutoAdvanceScheduler
+
+
+def _recorder():
+    fired = []
+    done = threading.Event()
+
+    def callback(user_id, job):
+        fired.append((user_id, job))
+        done.set()
+
+    return fired, done, callback
+
+
+def test_schedule_fires_and_claims_once():
+    """到期時呼叫 callback；同一排程只能 claim 一次"""
+    scheduler = AutoAdvanceScheduler(delay=0.01)
+    fired, done, callback = _recorder()
+
+    job = scheduler.schedule("u1", callback)
+    assert 0 <= scheduler.remaining("u1") <= 0.01
+    assert done.wait(1)
+    assert fired == [("u1", job)]
+    assert scheduler.claim("u1", job)
+    assert not scheduler.claim("u1", job)
+    assert scheduler.remaining("u1") is None
+
+
+def test_cancel_before_due():
+    """到期前取消時不呼叫 callback"""
+    scheduler = AutoAdvanceScheduler(delay=0.02)
+    fired, done, callback = _recorder()
+
+    scheduler.schedule("u1", callback)
+    assert scheduler.cancel("u1")
+    assert not scheduler.cancel("u1")
+    assert not done.wait(0.05)
+    assert fired == []
+
+
+def test_schedule_replaces_previous_job():
+    """新的排程取代舊的：舊排程不會推送，也無法 claim"""
+    scheduler = AutoAdvanceScheduler(delay=0.02)
+    fired, done, callback = _recorder()
+
+    old = scheduler.schedule("u1", callback)
+    new = scheduler.schedule("u1", callback)
+    assert done.wait(1)
+    time.sleep(0.03)
+    assert fired == [("u1", new)]
+    assert not scheduler.claim("u1", old)
+    assert scheduler.claim("u1", new)
+
+
+def test_cancel_after_fire_wins_over_claim():
+    """推送已開始但尚未 claim 時取消（用戶送出新訊息），claim 失敗"""
+    scheduler = AutoAdvanceScheduler(delay=0)
+    started, release = threading.Event(), threading.Event()
+    claimed = []
+
+    def callback(user_id, job):
+        started.set()
+        # 模擬等待會話鎖期間用戶送出新訊息
+        release.wait(1)
+        claimed.append(scheduler.claim(user_id, job))
+
+    scheduler.schedule("u1", callback)
+    assert started.wait(1)
+    assert scheduler.cancel("u1")
+    release.set()
+    for _ in range(100):
+        if claimed:
+            break
+        time.sleep(0.01)
+    assert claimed == [False]
+
+
+def test_concurrent_schedule_and_cancel_claims_at_most_once():
+    """多個執行緒同時排程與取消時，最後只有一個排程能被 claim"""
+    scheduler = AutoAdvanceScheduler(delay=60)
+    jobs = []
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        for _ in range(50):
+            if i % 2:
+                scheduler.cancel("u1")
+            else:
+                jobs.append(scheduler.schedule("u1", lambda *_: None))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [job for job in jobs if scheduler.claim("u1", job)]
+    assert len(claimed) <= 1
+    # 被取代或取消的排程都已停止計時
+    assert all(job.timer.finished.is_set() for job in jobs if job not in claimed)
+    for job in claimed:
+        job.timer.cancel()
+
+
+def test_idle_settings_evicted():
+    """閒置的「自動下一題」設定被清除並回到預設；有待執行排程的用戶保留"""
+    scheduler = AutoAdvanceScheduler(delay=60, idle_ttl=0.05)
+    for i in range(20):
+        scheduler.set_user_enabled(f"user-{i}", False)
+    scheduler.schedule("user-0", lambda *_: None)
+    assert len(scheduler) == 20
+    assert not scheduler.user_enabled("user-1")
+
+    time.sleep(0.06)
+    scheduler.set_user_enabled("active", False)
+    assert len(scheduler) == 2
+    assert scheduler.user_enabled("user-1")
+    assert not scheduler.user_enabled("user-0")
+    scheduler.cancel("user-0")
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試自動出題排程...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+測試會話事件匯流排
+驗證重連補送、閒置用戶的緩衝清除與事件迴圈中的訂閱
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 服務模組位於 virtual_interviewer 目錄
+sys.path.insert(0, str(Path(__file__).parent / "virtual_interviewer"))
+
+from services.event_bus import AsyncSubscription, SessionEventBus
+
+
+def test_resume_replays_missed_events():
+    """重連時補送最後序號之後的事件；epoch 不同時要求重新同步"""
+    bus = SessionEventBus(buffer_size=10)
+    first = bus.publish("u1", "state", {"current_state": "intro"})
+    bus.publish("u2", "state")
+    second = bus.publish("u1", "response")
+    bus.publish("u1", "analysis_delta", replay=False)
+
+    subscription, missed, complete = bus.subscribe("u1", first, bus.epoch)
+    assert complete
+    assert [event["seq"] for event in missed] == [second]
+    subscription.close()
+
+    subscription, missed, complete = bus.subscribe("u1", first, "old-epoch")
+    assert (missed, complete) == ([], False)
+    subscription.close()
+
+
+def test_idle_users_evicted():
+    """沒有連線且閒置至少 idle_ttl 秒的用戶被清除，有連線的用戶保留"""
+    bus = SessionEventBus(idle_ttl=0.05)
+    for i in range(20):
+        bus.publish_state(f"user-{i}", "intro")
+    connected, _, _ = bus.subscribe("connected")
+    bus.publish("connected", "state")
+    seen_seq = bus.publish("other", "state")
+    last_seq = bus.publish("user-0", "response")
+    assert len(bus) == 22
+
+    time.sleep(0.06)
+    bus.publish("active", "state")
+    assert len(bus) == 2
+    assert "user-0" not in bus._buffers and "user-0" not in bus._states
+    assert "connected" in bus._buffers
+
+    # 緩衝已被清除：起點之後的事件可能遺失，要求重新同步
+    subscription, missed, complete = bus.subscribe("user-0", seen_seq, bus.epoch)
+    assert (missed, complete) == ([], False)
+    subscription.close()
+    # 已收到清除前的最後一個事件：沒有遺漏
+    subscription, missed, complete = bus.subscribe("user-0", last_seq, bus.epoch)
+    assert (missed, complete) == ([], True)
+    subscription.close()
+    connected.close()
+
+    # 清除後的狀態重新發佈
+    assert bus.publish_state("user-1", "intro") is not None
+
+
+def test_idle_time_counts_from_disconnect():
+    """閒置時間從最後一條連線中斷起算"""
+    bus = SessionEventBus(idle_ttl=0.05)
+    subscription, _, _ = bus.subscribe("u1")
+    bus.publish("u1", "state")
+    time.sleep(0.06)
+    subscription.close()
+    bus.publish("other", "state")
+    assert "u1" in bus._buffers
+
+
+def test_async_subscription_receives_from_threads():
+    """事件迴圈中的訂閱可收到其他執行緒發佈的事件，逾時回傳 None"""
+    bus = SessionEventBus()
+
+    async def main():
+        subscription, _, _ = bus.subscribe("u1", loop=asyncio.get_running_loop())
+        assert isinstance(subscription, AsyncSubscription)
+        assert await subscription.get(timeout=0.01) is None
+
+        threading.Thread(target=bus.publish, args=("u1", "question")).start()
+        event = await subscription.get(timeout=1)
+        subscription.close()
+        return event
+
+    event = asyncio.run(main())
+    assert event["type"] == "question"
+    assert not bus.has_subscribers("u1")
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試會話事件匯流排...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
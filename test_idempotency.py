@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+測試請求冪等快取
+驗證並行的重複請求只執行一次、失敗或不可快取的結果不快取，以及非同步版本
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 服務模組位於 virtual_interviewer 目錄
+sys.path.insert(0, str(Path(__file__).parent / "virtual_interviewer"))
+
+from services.idempotency import IdempotencyCache, content_key
+
+
+def _expect(error_type, func, *args):
+    try:
+        func(*args)
+    except error_type as e:
+        return e
+    raise AssertionError(f"應拋出 {error_type.__name__}")
+
+
+def _counter(result="ok", delay=0.0):
+    calls = []
+
+    def fn():
+        calls.append(threading.get_ident())
+        time.sleep(delay)
+        return result
+
+    return calls, fn
+
+
+def test_concurrent_duplicates_run_once():
+    """相同請求識別碼的並行請求只執行一次，全部取得同一個結果"""
+    cache = IdempotencyCache()
+    calls, fn = _counter(result={"id": 1}, delay=0.05)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(cache.run("u1", "req-1", fn))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    # 完成後重送直接取得快取
+    assert cache.run("u1", "req-1", fn) is results[0]
+    assert len(calls) == 1
+
+
+def test_keys_are_per_user_and_request():
+    """不同用戶或不同請求識別碼各自執行；沒有識別碼時每次都執行"""
+    cache = IdempotencyCache()
+    calls, fn = _counter()
+    cache.run("u1", "req-1", fn)
+    cache.run("u2", "req-1", fn)
+    cache.run("u1", "req-2", fn)
+    cache.run("u1", None, fn)
+    cache.run("u1", None, fn)
+    assert len(calls) == 5
+
+
+def test_failed_call_not_cached():
+    """執行失敗時等待中的重複請求收到同一個例外，之後的重送重新執行"""
+    cache = IdempotencyCache()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(1)
+        raise ValueError("upstream down")
+
+    def duplicate():
+        try:
+            cache.run("u1", "req-1", lambda: "unused")
+        except ValueError as e:
+            errors.append(e)
+
+    owner = threading.Thread(
+        target=_expect, args=(ValueError, cache.run, "u1", "req-1", failing)
+    )
+    owner.start()
+    assert started.wait(1)
+    waiter = threading.Thread(target=duplicate)
+    waiter.start()
+    time.sleep(0.02)
+    release.set()
+    owner.join()
+    waiter.join()
+
+    assert [str(e) for e in errors] == ["upstream down"]
+    assert cache.get("u1", "req-1") is None
+    calls, fn = _counter(result="recovered")
+    assert cache.run("u1", "req-1", fn) == "recovered"
+    assert len(calls) == 1
+
+
+def test_uncacheable_result_not_cached():
+    """cacheable 為假的結果不快取；ttl 到期後重新執行"""
+    cache = IdempotencyCache()
+    calls, fn = _counter(result=({"error": "x"}, 500))
+
+    def ok(response):
+        return response[1] == 200
+
+    cache.run("u1", "req-1", fn, cacheable=ok)
+    cache.run("u1", "req-1", fn, cacheable=ok)
+    assert len(calls) == 2
+
+    calls, fn = _counter()
+    cache.run("u1", "req-2", fn, ttl=0.01)
+    time.sleep(0.02)
+    cache.run("u1", "req-2", fn, ttl=0.01)
+    assert len(calls) == 2
+
+
+def test_capacity_evicts_oldest():
+    """超過容量時淘汰最舊的回應"""
+    cache = IdempotencyCache(max_entries=2)
+    for i in range(3):
+        cache.put("u1", f"req-{i}", i)
+    assert cache.get("u1", "req-0") is None
+    assert cache.get("u1", "req-2") == 2
+
+
+def test_content_key_is_stable():
+    """內容識別碼與字典鍵的順序無關"""
+    assert content_key("f", {"a": 1, "b": "題"}) == content_key(
+        "f", {"b": "題", "a": 1}
+    )
+    assert content_key("f", {"a": 1}) != content_key("f", {"a": 2})
+
+
+def test_arun_coalesces_and_shares_with_run():
+    """非同步的重複請求只執行一次；取消等待者不影響執行中的請求"""
+    cache = IdempotencyCache()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        owner = asyncio.ensure_future(cache.arun("u1", "req-1", fn))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(cache.arun("u1", "req-1", fn)) for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        results = await asyncio.gather(owner, *waiters[1:])
+        assert waiters[0].cancelled()
+        return results
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert len(calls) == 1
+    # 同步版本取得同一份快取
+    assert cache.run("u1", "req-1", lambda: "again") == "done"
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試請求冪等快取...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
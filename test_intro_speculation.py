@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+測試自我介紹的背景預先分析
+驗證內容變更時取代預先分析、分析時沿用相同內容的預先分析，以及清除時取消
+（以假的 LLM 閘道執行，不需網路，可直接執行或以 pytest 執行）
+"""
+
+import threading
+import time
+
+from tools.intro_analyzer import INTRO_DIMENSIONS, IntroAnalyzer
+from tools.llm_gateway import PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+
+class _FakeGateway:
+    """記錄每次分析的內容與優先順序；設定 release 時等待放行才回傳"""
+
+    def __init__(self, release=None):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = release
+
+    def chat_json(self, messages, priority, **kwargs):
+        content = messages[-1]["content"].split("\n", 1)[1]
+        self.calls.append((content, priority))
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(1)
+        return {
+            "dimensions": {
+                key: {"status": "ok", "content": "", "tip": "", "score": 8}
+                for key, _ in INTRO_DIMENSIONS
+            },
+            "overall_score": 8,
+            "strengths": [content],
+            "suggestions": [],
+        }
+
+
+def _analyzer(gateway, delay):
+    analyzer = IntroAnalyzer(gateway=gateway)
+    analyzer.speculation_enabled = True
+    analyzer.speculation_min_tokens = 1
+    analyzer.speculation_delay = delay
+    return analyzer
+
+
+def _wait_for(condition, timeout=1):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_new_content_replaces_pending_speculation():
+    """延遲結束前內容又增加：取消舊的預先分析，只分析最新內容"""
+    gateway = _FakeGateway()
+    analyzer = _analyzer(gateway, delay=0.05)
+
+    analyzer.speculate("u1", "我是小明")
+    first = analyzer._speculations["u1"]
+    analyzer.speculate("u1", "我是小明，熟悉 Python")
+    assert first.future.cancelled()
+
+    assert _wait_for(lambda: analyzer.cached("u1") is not None)
+    assert gateway.calls == [("我是小明，熟悉 Python", PRIORITY_BATCH)]
+    # 分析相同內容時直接取得預先分析的結果
+    result = analyzer.analyze("u1", "我是小明，熟悉 Python")
+    assert result["strengths"] == ["我是小明，熟悉 Python"]
+    assert len(gateway.calls) == 1
+
+
+def test_same_content_not_rescheduled():
+    """內容未變更時不重新排程；已有相同內容的快取時不預先分析"""
+    gateway = _FakeGateway()
+    analyzer = _analyzer(gateway, delay=60)
+    analyzer.speculate("u1", "我是小明")
+    pending = analyzer._speculations["u1"]
+    analyzer.speculate("u1", " 我是小明 ")
+    assert analyzer._speculations["u1"] is pending
+    analyzer.clear("u1")
+
+    analyzer.analyze("u1", "我是小明")
+    analyzer.speculate("u1", "我是小明")
+    assert "u1" not in analyzer._speculations
+    assert len(gateway.calls) == 1
+
+
+def test_analyze_runs_pending_speculation_immediately():
+    """分析時遇到相同內容、尚未開始的預先分析：不等延遲，以即時優先順序執行一次"""
+    gateway = _FakeGateway()
+    analyzer = _analyzer(gateway, delay=60)
+    analyzer.speculate("u1", "我是小明")
+
+    start = time.monotonic()
+    result = analyzer.analyze("u1", "我是小明")
+    assert time.monotonic() - start < 1
+    assert result["method"] == "llm"
+    assert gateway.calls == [("我是小明", PRIORITY_INTERACTIVE)]
+    assert "u1" not in analyzer._speculations
+    assert analyzer.cached("u1", "我是小明") is result
+
+
+def test_clear_cancels_pending_speculation():
+    """清除時取消尚未開始的預先分析，之後不會呼叫模型"""
+    gateway = _FakeGateway()
+    analyzer = _analyzer(gateway, delay=0.02)
+    analyzer.speculate("u1", "我是小明")
+    speculation = analyzer._speculations["u1"]
+
+    analyzer.clear("u1")
+    assert speculation.future.cancelled()
+    time.sleep(0.05)
+    assert gateway.calls == []
+    assert "u1" not in analyzer._speculations
+
+
+def test_running_speculation_result_discarded_after_change():
+    """已開始的預先分析照常完成，但內容已變更或已清除時結果不寫入快取"""
+    release = threading.Event()
+    gateway = _FakeGateway(release)
+    analyzer = _analyzer(gateway, delay=0)
+
+    analyzer.speculate("u1", "我是小明")
+    running = analyzer._speculations["u1"]
+    assert gateway.started.wait(1)
+    analyzer.speculate("u1", "我是小明，熟悉 Python")
+    # 已開始的呼叫無法中止，不取消其 future
+    assert not running.future.cancelled()
+
+    release.set()
+    assert running.future.result(1)["strengths"] == ["我是小明"]
+    assert _wait_for(lambda: analyzer.cached("u1") is not None)
+    assert analyzer.cached("u1", "我是小明") is None
+    assert analyzer.cached("u1", "我是小明，熟悉 Python") is not None
+
+    # 清除後才完成的預先分析也不寫入快取
+    release.clear()
+    gateway.started.clear()
+    analyzer.speculate("u1", "第二份介紹")
+    running = analyzer._speculations["u1"]
+    assert gateway.started.wait(1)
+    analyzer.clear("u1")
+    release.set()
+    running.future.result(1)
+    assert analyzer.cached("u1") is None
+
+
+def test_short_content_not_speculated():
+    """內容未達最低 token 數時不預先分析"""
+    gateway = _FakeGateway()
+    analyzer = _analyzer(gateway, delay=0)
+    analyzer.speculation_min_tokens = 1000
+    analyzer.speculate("u1", "我是小明")
+    assert analyzer._speculations == {}
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試自我介紹預先分析...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+測試關鍵字比對器
+驗證重疊與互為前後綴的關鍵字、多組共用關鍵字，以及 first_group 的組別順序
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import random
+
+from tools.keyword_matcher import KeywordMatcher
+
+
+def test_overlapping_keywords_all_found():
+    """互相重疊、互為前後綴的關鍵字都會命中，依首次出現順序列出"""
+    matcher = KeywordMatcher({"g": ["he", "she", "his", "hers"]})
+    assert matcher.find("ushers") == {"g": ["she", "he", "hers"]}
+    assert matcher.find("ahishers") == {"g": ["his", "she", "he", "hers"]}
+
+
+def test_nested_chinese_keywords_across_groups():
+    """較長的關鍵字包含較短的關鍵字時，兩組都命中"""
+    matcher = KeywordMatcher(
+        {"restart": ["重新開始"], "start": ["開始", "開始面試"], "exit": ["結束"]}
+    )
+    assert matcher.find("我想重新開始面試") == {
+        "restart": ["重新開始"],
+        "start": ["開始", "開始面試"],
+    }
+    assert matcher.matched_groups("面試結束") == {"exit"}
+
+
+def test_shared_keyword_and_duplicates():
+    """同一關鍵字可屬於多組；重複出現只列一次；不分大小寫"""
+    matcher = KeywordMatcher({"a": ["Python", "api"], "b": ["python"], "c": [""]})
+    assert matcher.find("python, PYTHON and an API") == {
+        "a": ["python", "api"],
+        "b": ["python"],
+    }
+    assert matcher.find("") == {}
+    assert matcher.find(None) == {}
+
+
+def test_first_group_follows_definition_order():
+    """first_group 依組別定義順序、而非文字中的出現位置決定"""
+    matcher = KeywordMatcher({"exit": ["結束"], "start": ["開始"], "other": ["x"]})
+    assert matcher.first_group("先開始然後結束") == "exit"
+    assert matcher.first_group("只有開始") == "start"
+    assert matcher.first_group("都沒有", default="none") == "none"
+
+    reordered = KeywordMatcher({"start": ["開始"], "exit": ["結束"]})
+    assert reordered.first_group("先開始然後結束") == "start"
+
+
+def test_matches_naive_search():
+    """隨機關鍵字與文字下，結果與逐一搜尋子字串相同"""
+    rng = random.Random(42)
+
+    def word(length):
+        return "".join(rng.choice("abc") for _ in range(length))
+
+    for _ in range(200):
+        groups = {
+            f"g{i}": [word(rng.randint(1, 4)) for _ in range(3)] for i in range(3)
+        }
+        text = word(rng.randint(0, 30))
+        matched = KeywordMatcher(groups).find(text)
+        for group, keywords in groups.items():
+            expected = {keyword for keyword in keywords if keyword in text}
+            assert set(matched.get(group, [])) == expected, (groups, text)
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試關鍵字比對器...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+測試 LLM 呼叫閘道
+驗證依優先順序准入、佇列滿與排隊逾時的拒絕、429 的退避重試，
+斷路器的開啟與背景探測，以及備援請求（hedging）勝出時取消主要請求
+（以假的 OpenAI 客戶端執行，不需網路，可直接執行或以 pytest 執行）
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+from tools.llm_gateway import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    CircuitBreaker,
+    LLMGateway,
+    LLMOverloadedError,
+    LLMUnavailableError,
+)
+
+
+def _expect(error_type, func, *args):
+    try:
+        func(*args)
+    except error_type as e:
+        return e
+    raise AssertionError(f"應拋出 {error_type.__name__}")
+
+
+class _Completions:
+    """依序回傳 responses 中的結果；例外實例會被拋出"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def create(self, timeout=None, **request):
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class _FakeClient:
+    def __init__(self, responses):
+        self.completions = _Completions(responses)
+        self.chat = self
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, timeout=None, **request):
+        return _Completions.create(self, timeout, **request)
+
+
+class _AsyncFakeClient:
+    def __init__(self, responses):
+        self.completions = _AsyncCompletions(responses)
+        self.chat = self
+
+
+class _Chunk:
+    def __init__(self, text):
+        delta = type("Delta", (), {"content": text})()
+        self.choices = [type("Choice", (), {"delta": delta})()]
+        self.usage = None
+
+
+class _Stream:
+    """逐字元送出 text 的串流回應，每個片段間隔 delay 秒；記錄是否被關閉"""
+
+    def __init__(self, text, delay=0.0):
+        self.parts = list(text)
+        self.delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        for part in self.parts:
+            time.sleep(self.delay)
+            yield _Chunk(part)
+
+    def close(self):
+        self.closed = True
+
+
+class _AsyncStream(_Stream):
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for part in self.parts:
+            await asyncio.sleep(self.delay)
+            yield _Chunk(part)
+
+    async def close(self):
+        self.closed = True
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def _gateway(responses=(), **kwargs):
+    kwargs.setdefault("requests_per_minute", 10000)
+    kwargs.setdefault("tokens_per_minute", 10**7)
+    gateway = LLMGateway(**kwargs)
+    gateway._client = _FakeClient(responses)
+    return gateway
+
+
+def _drain_requests(gateway):
+    """清空每分鐘請求數的令牌，之後的請求需排隊等待補充"""
+    gateway.requests.tokens = 0
+    gateway.requests.updated = time.monotonic()
+
+
+def test_interactive_admitted_before_batch():
+    """令牌不足時，後到的即時請求先於排隊中的批次請求取得額度"""
+    gateway = _gateway(requests_per_minute=600)  # 每 0.1 秒補充一個
+    _drain_requests(gateway)
+    order = []
+
+    def acquire(priority, name):
+        gateway._acquire(priority, 1, time.monotonic() + 2)
+        order.append(name)
+
+    batch = threading.Thread(target=acquire, args=(PRIORITY_BATCH, "batch"))
+    batch.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(
+        target=acquire, args=(PRIORITY_INTERACTIVE, "interactive")
+    )
+    interactive.start()
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"]
+    assert gateway._waiting == []
+
+
+def test_same_priority_first_come_first_served():
+    """同優先順序的請求依到達順序取得額度"""
+    gateway = _gateway(requests_per_minute=1200)
+    _drain_requests(gateway)
+    order = []
+
+    def acquire(i):
+        gateway._acquire(PRIORITY_BATCH, 1, time.monotonic() + 2)
+        order.append(i)
+
+    threads = []
+    for i in range(3):
+        thread = threading.Thread(target=acquire, args=(i,))
+        thread.start()
+        threads.append(thread)
+        while len(gateway._waiting) < i + 1:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2]
+
+
+def test_queue_full_rejects_and_wait_times_out():
+    """佇列已滿時立即拒絕；排隊超過期限時拋出 LLMOverloadedError"""
+    gateway = _gateway(requests_per_minute=60, max_queue=1)
+    _drain_requests(gateway)
+    errors = []
+
+    def queued():
+        try:
+            gateway._acquire(PRIORITY_INTERACTIVE, 1, time.monotonic() + 0.1)
+        except LLMOverloadedError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=queued)
+    thread.start()
+    while not gateway._waiting:
+        time.sleep(0.001)
+
+    start = time.monotonic()
+    error = _expect(
+        LLMOverloadedError,
+        gateway._acquire,
+        PRIORITY_INTERACTIVE,
+        1,
+        time.monotonic() + 5,
+    )
+    assert "已滿" in str(error)
+    assert time.monotonic() - start < 0.05
+
+    thread.join()
+    assert len(errors) == 1 and "逾時" in errors[0]
+    assert gateway._waiting == []
+
+
+def test_rate_limited_calls_back_off_and_retry():
+    """429 時以指數上限的隨機退避重試，成功後回傳結果且不計入斷路器"""
+    gateway = _gateway([_StatusError(429), _StatusError(429), "completion"])
+    bounds = []
+    uniform = random.uniform
+    random.uniform = lambda low, high: bounds.append(high) or 0.0
+    try:
+        completion = gateway.chat([{"role": "user", "content": "hi"}])
+    finally:
+        random.uniform = uniform
+
+    assert completion == "completion"
+    assert bounds == [1.0, 2.0]
+    assert len(gateway._client.completions.requests) == 3
+    assert gateway.breaker._failures == 0
+
+
+def test_retries_exhausted_or_other_errors_raise():
+    """重試用盡時拋出原本的 429；其他錯誤不重試並計入斷路器"""
+    gateway = _gateway([_StatusError(429)] * 2, max_retries=1)
+    uniform = random.uniform
+    random.uniform = lambda low, high: 0.0
+    try:
+        error = _expect(_StatusError, gateway.chat, [{"content": "hi"}])
+    finally:
+        random.uniform = uniform
+    assert error.status_code == 429
+    assert gateway.breaker._failures == 1
+
+    gateway = _gateway([_StatusError(500), "unused"])
+    _expect(_StatusError, gateway.chat, [{"content": "hi"}])
+    assert len(gateway._client.completions.requests) == 1
+    assert gateway.breaker._failures == 1
+
+
+def test_breaker_opens_and_short_circuits():
+    """連續失敗達門檻即開啟，之後的呼叫不送往上游；中間有成功時重新計數"""
+    gateway = _gateway([_StatusError(500), "ok", _StatusError(500)] * 2)
+    gateway.breaker = CircuitBreaker(
+        gateway._probe, failure_threshold=2, recovery_timeout=60
+    )
+    messages = [{"content": "hi"}]
+    _expect(_StatusError, gateway.chat, messages)
+    assert gateway.chat(messages) == "ok"
+    _expect(_StatusError, gateway.chat, messages)
+    assert not gateway.breaker.is_open
+
+    _expect(_StatusError, gateway.chat, messages)
+    assert gateway.breaker.is_open
+    sent = len(gateway._client.completions.requests)
+    _expect(LLMUnavailableError, gateway.chat, messages)
+    assert len(gateway._client.completions.requests) == sent
+
+
+def test_breaker_probes_until_recovered():
+    """開啟後於背景定期探測，探測成功才關閉並重設失敗次數"""
+    probes = []
+
+    def probe():
+        probes.append(time.monotonic())
+        if len(probes) < 2:
+            raise ConnectionError("still down")
+
+    breaker = CircuitBreaker(probe, failure_threshold=1, recovery_timeout=0.02)
+    breaker.record_failure()
+    assert breaker.is_open
+    deadline = time.monotonic() + 2
+    while breaker.is_open and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert not breaker.is_open
+    assert len(probes) == 2
+    assert breaker._failures == 0
+
+
+def _hedging_gateway(primary, hedge, client=_FakeClient):
+    gateway = _gateway()
+    gateway._client = client([primary, hedge])
+    # 近期耗時的 p95 為 0.01 秒：主要請求超過即送出備援請求
+    gateway._latencies.extend([0.01] * 20)
+    return gateway
+
+
+def test_hedge_wins_and_closes_primary_stream():
+    """主要請求慢於 p95 時送出備援請求；備援先完成時採用其結果並關閉主要串流"""
+    primary = _Stream('{"who": "primary"}', delay=0.05)
+    hedge = _Stream('{"who": "hedge"}')
+    gateway = _hedging_gateway(primary, hedge)
+
+    start = time.monotonic()
+    completion = gateway.chat([{"content": "hi"}], stream=True, hedge=True)
+    assert completion.parser.result() == {"who": "hedge"}
+    assert primary.closed and not hedge.closed
+    assert time.monotonic() - start < 0.5
+
+
+def test_fast_primary_sends_no_hedge():
+    """主要請求在 p95 之前完成時不送出備援請求"""
+    gateway = _hedging_gateway(_Stream('{"who": "primary"}'), "unused")
+    gateway._latencies.clear()
+    gateway._latencies.extend([0.05] * 20)
+    completion = gateway.chat([{"content": "hi"}], stream=True, hedge=True)
+    assert completion.parser.result() == {"who": "primary"}
+    time.sleep(0.06)
+    assert len(gateway._client.completions.requests) == 1
+
+
+def test_async_hedge_cancels_primary():
+    """非同步版本：備援請求勝出後取消主要請求的工作並關閉其串流"""
+    primary = _AsyncStream('{"who": "primary"}', delay=0.05)
+    hedge = _AsyncStream('{"who": "hedge"}')
+    gateway = _hedging_gateway(primary, hedge, client=_AsyncFakeClient)
+
+    async def main():
+        gateway._async_client = gateway._client
+        gateway._async_loop = asyncio.get_running_loop()
+        completion = await gateway.achat([{"content": "hi"}], stream=True, hedge=True)
+        # 被取消的工作在下一輪事件迴圈關閉串流
+        await asyncio.sleep(0.01)
+        return completion
+
+    completion = asyncio.run(main())
+    assert completion.parser.result() == {"who": "hedge"}
+    assert primary.closed and not hedge.closed
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試 LLM 呼叫閘道...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+測試題庫全文檢索
+驗證中文二字詞斷詞、BM25 排序、題目查詢與索引快取的重新載入
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import csv
+import json
+import tempfile
+from pathlib import Path
+
+from tools.question_index import INDEX_VERSION, QuestionIndex, normalize_question
+from tools.text_tokenizer import term_vector, tokenize
+
+DOCS = [
+    {
+        "question": "請介紹您的 Python 專案經驗",
+        "standard_answer": "說明使用 Flask 開發的專案與負責的部分",
+        "source": "backend",
+    },
+    {
+        "question": "如何處理團隊中的溝通衝突？",
+        "standard_answer": "先傾聽雙方意見，再以共同目標協調",
+        "source": "soft_skills",
+    },
+    {
+        "question": "資料庫索引的原理是什麼？",
+        "standard_answer": "以 B-tree 加速查詢，代價是寫入變慢",
+        "source": "backend",
+    },
+]
+
+
+def test_tokenize_cjk_bigrams():
+    """中文切成二字詞，英數字以單字為單位且轉為小寫"""
+    assert tokenize("資料庫") == ["資料", "料庫"]
+    assert tokenize("Python 開發") == ["python", "開發"]
+    # 單一中文字保留原字，c++ / c# 這類技術名詞保留符號
+    assert tokenize("我 用 C++ 與 C#") == ["我", "用", "c++", "與", "c#"]
+    # 標點會切開連續的中文
+    assert tokenize("團隊，合作") == ["團隊", "合作"]
+    assert tokenize("") == []
+
+
+def test_term_vector_counts():
+    """詞頻向量累計重複出現的詞"""
+    assert term_vector("專案專案") == {"專案": 2, "案專": 1}
+
+
+def test_bm25_ranks_matching_document_first():
+    """查詢詞集中在某份文件時，該文件排在最前面"""
+    index = QuestionIndex.build(DOCS)
+
+    results = index.search("團隊溝通")
+    assert results[0]["question"] == DOCS[1]["question"]
+    assert results[0]["score"] > 0
+
+    results = index.search("資料庫索引", k=1)
+    assert len(results) == 1
+    assert results[0]["question"] == DOCS[2]["question"]
+
+
+def test_bm25_question_weighted_over_answer():
+    """題目中的詞權重高於只出現在答案中的詞"""
+    docs = [
+        {"question": "其他問題", "standard_answer": "快取設計", "source": "a"},
+        {"question": "快取設計", "standard_answer": "其他答案", "source": "a"},
+    ]
+    index = QuestionIndex.build(docs)
+    results = index.search("快取")
+    assert [r["question"] for r in results] == ["快取設計", "其他問題"]
+
+
+def test_search_filters_source_and_ignores_unknown_terms():
+    """source 只保留該來源的題目，沒有命中的詞不回傳結果"""
+    index = QuestionIndex.build(DOCS)
+
+    results = index.search("專案 資料庫", source="backend")
+    assert results
+    assert all(r["source"] == "backend" for r in results)
+
+    assert index.search("量子力學") == []
+
+
+def test_normalize_question():
+    """全半形、大小寫、空白與標點不影響比對"""
+    assert normalize_question("Python 是什麼？") == "python是什麼"
+    assert normalize_question("ＰＹＴＨＯＮ　是什麼?") == "python是什麼"
+    assert normalize_question(" a_b-c ") == "abc"
+    assert normalize_question(None) == ""
+
+
+def test_lookup():
+    """查詢原題；重複題目以有標準答案的那一筆為準"""
+    docs = DOCS + [
+        {"question": "重複的題目", "standard_answer": "", "source": "x"},
+        {"question": "重複的題目！", "standard_answer": "有答案", "source": "y"},
+    ]
+    index = QuestionIndex.build(docs)
+
+    doc = index.lookup("如何處理團隊中的溝通衝突?")
+    assert doc is not None
+    assert doc["standard_answer"] == DOCS[1]["standard_answer"]
+
+    assert index.lookup("重複的題目")["standard_answer"] == "有答案"
+    assert index.lookup("不存在的題目") is None
+
+
+def _write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["問題", "答案"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_load_or_build_reloads_persisted_index():
+    """題庫未變動時載入磁碟上的索引，變動後重新建立"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "csv"
+        data_dir.mkdir()
+        index_path = Path(tmp) / "cache" / "index.json"
+        _write_csv(
+            data_dir / "backend.csv",
+            [{"問題": "什麼是 REST API？", "答案": "以資源為中心的 HTTP 介面"}],
+        )
+
+        built = QuestionIndex.load_or_build(data_dir, index_path)
+        assert index_path.exists()
+        with open(index_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        assert cached["version"] == INDEX_VERSION
+
+        reloaded = QuestionIndex.load_or_build(data_dir, index_path)
+        assert reloaded.docs == built.docs
+        assert reloaded.postings == built.postings
+        assert reloaded.lookup("什麼是REST API")["source"] == "backend"
+        assert reloaded.search("資源")[0]["question"] == "什麼是 REST API？"
+
+        # 快取版本不符時忽略快取
+        cached["version"] = INDEX_VERSION + 1
+        cached["docs"] = []
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(cached, f)
+        assert len(QuestionIndex.load_or_build(data_dir, index_path).docs) == 1
+
+        # 題庫檔案變動時重新建立
+        _write_csv(
+            data_dir / "backend.csv",
+            [
+                {"問題": "什麼是 REST API？", "答案": "以資源為中心的 HTTP 介面"},
+                {"問題": "什麼是 GraphQL？", "答案": "由客戶端指定欄位的查詢語言"},
+            ],
+        )
+        rebuilt = QuestionIndex.load_or_build(data_dir, index_path)
+        assert len(rebuilt.docs) == 2
+        assert rebuilt.lookup("什麼是 GraphQL？") is not None
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試題庫全文檢索...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+測試用戶會話鎖
+驗證同一用戶互斥、先到先處理、重入，以及最後一位持有者離開後釋放鎖
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 服務模組位於 virtual_interviewer 目錄
+sys.path.insert(0, str(Path(__file__).parent / "virtual_interviewer"))
+
+from services.session_locks import SessionLocks
+
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_entry_released_after_last_holder():
+    """有請求等待時鎖保留，最後一位持有者離開後移除"""
+    locks = SessionLocks()
+    holding, release = threading.Event(), threading.Event()
+
+    def first():
+        with locks.hold("u1"):
+            holding.set()
+            release.wait(1)
+
+    def second():
+        with locks.hold("u1"):
+            pass
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    threads[0].start()
+    assert holding.wait(1)
+    threads[1].start()
+    time.sleep(0.02)
+    assert len(locks) == 1
+    assert locks._entries["u1"].refs == 2
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(locks) == 0
+
+
+def test_reentrant_hold():
+    """同一執行緒可重入；離開最外層後才釋放"""
+    locks = SessionLocks()
+    with locks.hold("u1"):
+        with locks.hold("u1"):
+            assert len(locks) == 1
+        assert len(locks) == 1
+    assert len(locks) == 0
+
+
+def test_same_user_serialized_in_arrival_order():
+    """同一用戶的請求互斥並依到達順序取得鎖；不同用戶不互相等待"""
+    locks = SessionLocks()
+    order = []
+    holding, release = threading.Event(), threading.Event()
+
+    def blocker():
+        with locks.hold("u1"):
+            holding.set()
+            release.wait(1)
+
+    blocking = threading.Thread(target=blocker)
+    blocking.start()
+    assert holding.wait(1)
+
+    # 依序登記等待者，確保到達順序固定
+    def waiter(i):
+        with locks.hold("u1"):
+            order.append(i)
+
+    threads = []
+    for i in range(5):
+        thread = threading.Thread(target=waiter, args=(i,))
+        thread.start()
+        threads.append(thread)
+        while locks._entries["u1"].refs < i + 2:
+            time.sleep(0.001)
+
+    # 其他用戶不受影響
+    with locks.hold("u2"):
+        assert order == []
+
+    release.set()
+    blocking.join()
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2, 3, 4]
+    assert len(locks) == 0
+
+
+def test_many_threads_mutual_exclusion():
+    """大量並行請求下同一時間只有一個持有者"""
+    locks = SessionLocks()
+    state = {"active": 0, "max": 0, "count": 0}
+
+    def worker(_):
+        for _ in range(20):
+            with locks.hold("u1"):
+                state["active"] += 1
+                state["max"] = max(state["max"], state["active"])
+                state["count"] += 1
+                state["active"] -= 1
+
+    _run_threads(worker, 8)
+    assert state == {"active": 0, "max": 1, "count": 160}
+    assert len(locks) == 0
+
+
+def test_async_and_thread_holders_share_lock():
+    """協程與執行緒共用同一把鎖；協程等待時不佔用事件迴圈"""
+    locks = SessionLocks()
+    holding, release = threading.Event(), threading.Event()
+    order = []
+
+    def thread_holder():
+        with locks.hold("u1"):
+            holding.set()
+            release.wait(1)
+            order.append("thread")
+
+    async def main():
+        thread = threading.Thread(target=thread_holder)
+        thread.start()
+        assert holding.wait(1)
+
+        async def task_holder():
+            async with locks.ahold("u1"):
+                async with locks.ahold("u1"):
+                    order.append("task")
+
+        task = asyncio.ensure_future(task_holder())
+        # 事件迴圈仍可執行其他工作
+        await asyncio.sleep(0.02)
+        assert not task.done()
+        release.set()
+        await task
+        thread.join()
+
+    asyncio.run(main())
+    assert order == ["thread", "task"]
+    assert len(locks) == 0
+
+
+def test_cancelled_async_waiter_leaves_queue():
+    """等待中的協程被取消時退出佇列，鎖交給下一位等待者"""
+    locks = SessionLocks()
+    order = []
+
+    async def holder(name, hold_for):
+        async with locks.ahold("u1"):
+            order.append(name)
+            await asyncio.sleep(hold_for)
+
+    async def main():
+        first = asyncio.ensure_future(holder("first", 0.03))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(holder("cancelled", 0))
+        last = asyncio.ensure_future(holder("last", 0))
+        await asyncio.sleep(0.01)
+        assert locks._entries["u1"].refs == 3
+        cancelled.cancel()
+        await asyncio.gather(first, last)
+        assert cancelled.cancelled()
+
+    asyncio.run(main())
+    assert order == ["first", "last"]
+    assert len(locks) == 0
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試用戶會話鎖...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
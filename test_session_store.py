@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+測試會話事件儲存
+驗證 keyset 分頁游標、游標格式錯誤的處理與本次面試的彙總
+（使用暫存的 SQLite 檔案，可直接執行或以 pytest 執行）
+"""
+
+import os
+import tempfile
+
+from tools.session_store import SessionEventStore, _decode_cursor
+
+
+def _new_store(tmp):
+    return SessionEventStore(os.path.join(tmp, "events.db"))
+
+
+def _answer(store, user_id, question, score, category="技術能力"):
+    return store.record_answer(
+        user_id, question, category, f"回答：{question}", {"score": score}
+    )
+
+
+def test_page_cursor_round_trip():
+    """依游標逐頁讀取，每筆事件恰好出現一次且由新到舊"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _new_store(tmp)
+        ids = [_answer(store, "u1", f"題目{i}", i) for i in range(7)]
+        _answer(store, "u2", "其他用戶的題目", 50)
+
+        seen, cursor, pages = [], "", 0
+        while True:
+            items, cursor = store.page("u1", "answer", cursor=cursor, limit=3)
+            seen.extend(item["id"] for item in items)
+            pages += 1
+            if cursor is None:
+                break
+
+        assert pages == 3
+        assert seen == list(reversed(ids))
+        assert items[-1]["payload"]["user_answer"] == "回答：題目0"
+
+
+def test_page_same_timestamp_uses_id():
+    """同一時間刻寫入的事件以 id 區分，不會重複或遺漏"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _new_store(tmp)
+        ids = [_answer(store, "u1", f"題目{i}", i) for i in range(4)]
+        with store._connect() as conn:
+            conn.execute("UPDATE session_events SET created_at = 1000.0")
+
+        first, cursor = store.page("u1", "answer", limit=2)
+        second, cursor = store.page("u1", "answer", cursor=cursor, limit=2)
+        assert cursor is None
+        assert [item["id"] for item in first + second] == list(reversed(ids))
+
+
+def test_decode_cursor_rejects_malformed_input():
+    """格式錯誤的游標拋出 ValueError"""
+    assert _decode_cursor("1700000000.5:42") == (1700000000.5, 42)
+    for cursor in ("garbage", "1.5:abc", "abc:1", ":", "1.5:"):
+        try:
+            _decode_cursor(cursor)
+        except ValueError:
+            continue
+        raise AssertionError(f"游標 {cursor!r} 應拋出 ValueError")
+
+
+def test_session_aggregate_counts_current_session_only():
+    """彙總只計算最後一次會話起點之後的出題與作答"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _new_store(tmp)
+        assert store.session_aggregate("u1") == {
+            "total_questions": 0,
+            "answered": 0,
+            "scores": [],
+            "average_score": 0,
+        }
+
+        store.record_question("u1", {"question": "舊的題目"})
+        _answer(store, "u1", "舊的題目", 10)
+        store.mark_session_start("u1")
+
+        for question, score in (("題目一", 80), ("題目二", 60)):
+            store.record_question("u1", {"question": question})
+            _answer(store, "u1", question, score)
+        store.record_question("u1", {"question": "尚未作答"})
+        store.record_turn("u1", "你好", "歡迎")
+        _answer(store, "u2", "其他用戶", 0)
+
+        assert store.session_aggregate("u1") == {
+            "total_questions": 3,
+            "answered": 2,
+            "scores": [80, 60],
+            "average_score": 70,
+        }
+        # 歷史查詢不受會話起點限制
+        assert store.recent_scores("u1") == [60, 80, 10]
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試會話事件儲存...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
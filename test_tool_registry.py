@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+測試工具登錄表
+驗證參數驗證、中介層順序、限流回補與淘汰，以及快取過期
+（不需啟動服務，可直接執行或以 pytest 執行）
+"""
+
+import time
+
+from tools.tool_registry import (
+    RateLimit,
+    TTLCache,
+    ToolNotFoundError,
+    ToolRateLimitError,
+    ToolRegistry,
+    ToolSchema,
+    ToolValidationError,
+)
+
+
+def _sample_tool(user_id: str, count: int = 1, ratio: float = 0.5, flag: bool = False):
+    return {"success": True, "user_id": user_id, "count": count}
+
+
+def _expect(error_type, func, *args):
+    try:
+        func(*args)
+    except error_type as e:
+        return e
+    raise AssertionError(f"應拋出 {error_type.__name__}")
+
+
+def test_schema_validate_missing_and_unknown():
+    """缺少必填參數或帶入不支援的參數時拋出 ToolValidationError"""
+    schema = ToolSchema(_sample_tool)
+    schema.validate({"user_id": "u1"})
+
+    error = _expect(ToolValidationError, schema.validate, {"count": 2})
+    assert "user_id" in str(error)
+    error = _expect(ToolValidationError, schema.validate, {"user_id": "u1", "x": 1})
+    assert "x" in str(error)
+
+
+def test_schema_validate_types():
+    """型別不符時拒絕；數值參數不接受 bool，float 參數接受 int"""
+    schema = ToolSchema(_sample_tool)
+    schema.validate({"user_id": "u1", "count": 3, "ratio": 1, "flag": True})
+
+    _expect(ToolValidationError, schema.validate, {"user_id": 1})
+    _expect(ToolValidationError, schema.validate, {"user_id": "u1", "count": "3"})
+    _expect(ToolValidationError, schema.validate, {"user_id": "u1", "count": True})
+    _expect(ToolValidationError, schema.validate, {"user_id": "u1", "ratio": False})
+    _expect(ToolValidationError, schema.validate, {"user_id": "u1", "flag": 1})
+
+
+def test_schema_rejects_var_arguments():
+    """工具不可使用 *args/**kwargs"""
+    _expect(TypeError, ToolSchema, lambda *args: None)
+    _expect(TypeError, ToolSchema, lambda **kwargs: None)
+
+
+def test_middleware_order_and_defaults():
+    """中介層依登錄順序由外而內執行，參數已補上預設值"""
+    calls = []
+
+    def layer(label):
+        def middleware(tool, arguments, call_next):
+            calls.append(f"{label}:before")
+            result = call_next(arguments)
+            calls.append(f"{label}:after")
+            return result
+
+        return middleware
+
+    def record(tool, arguments, call_next):
+        calls.append(dict(arguments))
+        return call_next(arguments)
+
+    registry = ToolRegistry()
+    registry.register(
+        _sample_tool,
+        name="sample",
+        namespace="test",
+        middleware=(layer("outer"), layer("inner"), record),
+    )
+
+    result = registry.call("test.sample", {"user_id": "u1"})
+    assert result["count"] == 1
+    assert calls == [
+        "outer:before",
+        "inner:before",
+        {"user_id": "u1", "count": 1, "ratio": 0.5, "flag": False},
+        "inner:after",
+        "outer:after",
+    ]
+    assert registry.names() == ["test.sample"]
+    _expect(ToolNotFoundError, registry.call, "sample")
+    _expect(ToolValidationError, registry.call, "test.sample", {})
+
+
+def test_rate_limit_refill():
+    """用完額度後拒絕呼叫，經過 per/rate 秒回補一次"""
+    registry = ToolRegistry()
+    limited = registry.register(middleware=(RateLimit(rate=2, per=0.2),))(_sample_tool)
+
+    limited("u1")
+    limited("u1")
+    _expect(ToolRateLimitError, limited, "u1")
+    # 不同 key 各自計算
+    limited("u2")
+
+    time.sleep(0.12)
+    limited("u1")
+    _expect(ToolRateLimitError, limited, "u1")
+
+
+def test_rate_limit_evicts_idle_buckets():
+    """閒置至少 per 秒的桶被清除，清除後仍以滿額開始"""
+    rate_limit = RateLimit(rate=1, per=0.05)
+    registry = ToolRegistry()
+    limited = registry.register(middleware=(rate_limit,))(_sample_tool)
+
+    for i in range(20):
+        limited(f"user-{i}")
+    assert len(rate_limit) == 20
+
+    time.sleep(0.06)
+    limited("active")
+    assert len(rate_limit) == 1
+    limited("user-0")
+    assert len(rate_limit) == 2
+
+
+def test_ttl_cache_expiry():
+    """快取在 ttl 後過期；失敗的結果不快取"""
+    runs = []
+
+    def lookup(key: str):
+        runs.append(key)
+        return {"success": key != "bad", "value": len(runs)}
+
+    cache = TTLCache(ttl=0.05)
+    registry = ToolRegistry()
+    cached = registry.register(middleware=(cache,))(lookup)
+
+    assert cached("a")["value"] == 1
+    assert cached("a")["value"] == 1
+    cached("bad")
+    cached("bad")
+    assert runs == ["a", "bad", "bad"]
+
+    time.sleep(0.06)
+    assert cache.get({"key": "a"}) is None
+    assert cached("a")["value"] == 4
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """超過容量時淘汰最久未使用的項目"""
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.put({"k": 1}, "one")
+    cache.put({"k": 2}, "two")
+    assert cache.get({"k": 1}) == "one"
+    cache.put({"k": 3}, "three")
+    assert cache.get({"k": 2}) is None
+    assert cache.get({"k": 1}) == "one"
+    assert cache.get({"k": 3}) == "three"
+
+
+if __name__ == "__main__":
+    tests = [
+        value for name, value in list(globals().items()) if name.startswith("test_")
+    ]
+    print("🧪 開始測試工具登錄表...")
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 全部 {len(tests)} 項測試通過")
@@ -7,24 +7,84 @@ Tools 模組初始化檔案
 from .answer_analyzer import AnswerAnalyzer, answer_analyzer
 from .database import DatabaseManager, db_manager
 from .interactive_interview import InteractiveInterview
+from .intro_analyzer import IntroAnalyzer, intro_analyzer
 from .interview_session import InterviewSession, interview_session
+from .interview_services import (
+    GradingResult,
+    GradingService,
+    QuestionResult,
+    QuestionService,
+    grading_service,
+    question_service,
+)
+from .keyword_matcher import KeywordMatcher
+from .llm_gateway import (
+    LLMGateway,
+    LLMOverloadedError,
+    LLMUnavailableError,
+    llm_gateway,
+    stream_to,
+)
+from .metrics import Metrics, metrics
+from .question_index import QuestionIndex, question_index
 from .question_manager import QuestionManager, question_manager
+from .question_prefetcher import QuestionPrefetcher
+from .session_store import SessionEventStore, session_store
+from .token_budget import count_tokens, truncate_to_budget
+from .tool_registry import (
+    ToolError,
+    ToolNotFoundError,
+    ToolRateLimitError,
+    ToolRegistry,
+    ToolValidationError,
+    tool_registry,
+)
 from .ui_manager import UIManager, ui_manager
 
 __all__ = [
     # 類別
     "DatabaseManager",
     "QuestionManager",
+    "QuestionIndex",
+    "QuestionPrefetcher",
     "AnswerAnalyzer",
     "InterviewSession",
     "UIManager",
+    "SessionEventStore",
     "InteractiveInterview",
+    "KeywordMatcher",
+    "IntroAnalyzer",
+    "Metrics",
+    "LLMGateway",
+    "LLMOverloadedError",
+    "LLMUnavailableError",
+    "QuestionService",
+    "GradingService",
+    "QuestionResult",
+    "GradingResult",
+    "ToolRegistry",
+    "ToolError",
+    "ToolNotFoundError",
+    "ToolValidationError",
+    "ToolRateLimitError",
     # 實例
     "db_manager",
     "question_manager",
+    "question_index",
     "answer_analyzer",
     "interview_session",
+    "intro_analyzer",
     "ui_manager",
+    "session_store",
+    "metrics",
+    "llm_gateway",
+    "tool_registry",
+    "question_service",
+    "grading_service",
+    # 函式
+    "count_tokens",
+    "truncate_to_budget",
+    "stream_to",
 ]
 
 # 版本資訊
@@ -20,19 +20,78 @@ except ImportError:
     print("請安裝 openai 套件: pip install openai")
     exit(1)
 
+from .llm_gateway import PRIORITY_INTERACTIVE, llm_gateway
+from .structured_output import compile_schema
+from .token_budget import truncate_to_budget
+
 logger = logging.getLogger(__name__)
 
+# 固定不變的系統提示（評分標準與輸出格式）：每次請求都相同，可命中供應商的提示快取；
+# 隨題目變動的內容只放在 user 訊息
+ANALYSIS_SYSTEM_PROMPT = (
+    "您是一個專業的面試評分專家，負責分析求職者的回答。請根據以下標準進行評分：\n"
+    "1. 內容準確性（40%）：回答是否涵蓋了問題的核心要點\n"
+    "2. 表達清晰度（30%）：回答是否清楚易懂\n"
+    "3. 邏輯結構（20%）：回答是否有良好的邏輯結構\n"
+    "4. 完整性（10%）：回答是否完整\n\n"
+    "注意：即使用詞不同，只要意思相同或相近，都應該給予較高的相似度評分。"
+    "過長的內容會以「（中略）」省略中段，請依保留的部分評分。\n\n"
+    "請嚴格按照以下 JSON 格式返回結果，不要添加任何其他文字：\n"
+    "{\n"
+    '  "score": 85,\n'
+    '  "grade": "良好",\n'
+    '  "similarity": 0.85,\n'
+    '  "feedback": "您的回答基本正確，涵蓋了核心要點",\n'
+    '  "differences": ["缺少一些技術細節"],\n'
+    '  "strengths": ["表達清晰", "邏輯合理"],\n'
+    '  "suggestions": ["可以添加更多技術細節"]\n'
+    "}"
+)
+
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# 評分結果的輸出格式（嚴格模式：所有欄位必填、不允許額外欄位）
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer"},
+        "grade": {"type": "string", "enum": ["優秀", "良好", "一般", "需要改進"]},
+        "similarity": {"type": "number"},
+        "feedback": {"type": "string"},
+        "differences": _STRING_LIST,
+        "strengths": _STRING_LIST,
+        "suggestions": _STRING_LIST,
+    },
+    "required": [
+        "score",
+        "grade",
+        "similarity",
+        "feedback",
+        "differences",
+        "strengths",
+        "suggestions",
+    ],
+    "additionalProperties": False,
+}
+
+validate_analysis = compile_schema(ANALYSIS_SCHEMA)
+
 
 class AIAnswerAnalyzer:
     """AI 智能答案分析器"""
 
+    # 提示中各欄位的 token 上限，超過時保留頭尾、省略中段
+    QUESTION_TOKEN_BUDGET = 200
+    STANDARD_ANSWER_TOKEN_BUDGET = 600
+    USER_ANSWER_TOKEN_BUDGET = 800
+
     def __init__(self):
         # 初始化 OpenAI 客戶端
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("請在 .env 檔案中設定 OPENAI_API_KEY")
 
-        self.client = OpenAI(api_key=api_key)
         self.grade_thresholds = {"優秀": 80, "良好": 60, "一般": 40, "需要改進": 0}
 
     def analyze_answer(
@@ -41,62 +100,83 @@ class AIAnswerAnalyzer:
         """使用 AI 分析用戶回答與標準答案的差異"""
 
         try:
-            # 構建 AI 分析提示
-            prompt = self._build_analysis_prompt(user_answer, standard_answer, question)
-
-            # 調用 OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "您是一個專業的面試評分專家，負責分析求職者的回答。請根據以下標準進行評分：\n"
-                        "1. 內容準確性（40%）：回答是否涵蓋了問題的核心要點\n"
-                        "2. 表達清晰度（30%）：回答是否清楚易懂\n"
-                        "3. 邏輯結構（20%）：回答是否有良好的邏輯結構\n"
-                        "4. 完整性（10%）：回答是否完整\n\n"
-                        "請嚴格按照以下 JSON 格式返回結果，不要添加任何其他文字：\n"
-                        "{\n"
-                        '  "score": 85,\n'
-                        '  "grade": "良好",\n'
-                        '  "similarity": 0.85,\n'
-                        '  "feedback": "您的回答基本正確，涵蓋了核心要點",\n'
-                        '  "differences": ["缺少一些技術細節"],\n'
-                        '  "strengths": ["表達清晰", "邏輯合理"],\n'
-                        '  "suggestions": ["可以添加更多技術細節"]\n'
-                        "}",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
-                max_tokens=1000,
+            # 調用 OpenAI API（經由共用閘道；佇列已滿、逾時或斷路器開啟時拋出例外，改用傳統方法）
+            result = llm_gateway.chat_json(
+                **self._analysis_request(user_answer, standard_answer, question)
             )
+            return self._complete_result(result, user_answer, standard_answer, question)
 
-            # 解析 AI 回應
-            ai_response = response.choices[0].message.content
-            analysis_result = self._parse_ai_response(ai_response)
-
-            # 添加額外資訊
-            analysis_result.update(
-                {
-                    "user_answer": user_answer,
-                    "standard_answer": standard_answer,
-                    "question": question,
-                    "analysis_method": "AI",
-                }
-            )
+        except Exception as e:
+            logger.error(f"AI 分析失敗: {e}")
+            # 回退到傳統方法
+            return self._fallback_analysis(user_answer, standard_answer)
 
-            return analysis_result
+    async def aanalyze_answer(
+        self, user_answer: str, standard_answer: str, question: str = ""
+    ) -> Dict[str, Any]:
+        """analyze_answer() 的非同步版本：等待模型回應時不佔用執行緒"""
+
+        try:
+            result = await llm_gateway.achat_json(
+                **self._analysis_request(user_answer, standard_answer, question)
+            )
+            return self._complete_result(result, user_answer, standard_answer, question)
 
         except Exception as e:
             logger.error(f"AI 分析失敗: {e}")
-            # 回退到傳統方法
             return self._fallback_analysis(user_answer, standard_answer)
 
+    def _analysis_request(
+        self, user_answer: str, standard_answer: str, question: str
+    ) -> Dict[str, Any]:
+        """同步與非同步分析共用的閘道請求參數"""
+        prompt = self._build_analysis_prompt(user_answer, standard_answer, question)
+        # 以 JSON Schema 限制輸出格式，串流接收時即逐段解析並驗證
+        return {
+            "messages": [
+                {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "schema_name": "answer_analysis",
+            "schema": ANALYSIS_SCHEMA,
+            "validator": validate_analysis,
+            "temperature": 0.3,
+            "max_tokens": 1000,
+            "priority": PRIORITY_INTERACTIVE,
+            "purpose": "grading",
+            # 評分在用戶等待中進行：上游變慢時送出備援請求，壓低尾端延遲
+            "hedge": True,
+        }
+
+    def _complete_result(
+        self,
+        result: Dict[str, Any],
+        user_answer: str,
+        standard_answer: str,
+        question: str,
+    ) -> Dict[str, Any]:
+        analysis_result = self._normalize_result(result)
+
+        # 添加額外資訊
+        analysis_result.update(
+            {
+                "user_answer": user_answer,
+                "standard_answer": standard_answer,
+                "question": question,
+                "analysis_method": "AI",
+            }
+        )
+        return analysis_result
+
     def _build_analysis_prompt(
         self, user_answer: str, standard_answer: str, question: str
     ) -> str:
-        """構建 AI 分析提示"""
+        """構建 AI 分析提示（各欄位截斷到 token 預算內）"""
+        question = truncate_to_budget(question, self.QUESTION_TOKEN_BUDGET)
+        standard_answer = truncate_to_budget(
+            standard_answer, self.STANDARD_ANSWER_TOKEN_BUDGET
+        )
+        user_answer = truncate_to_budget(user_answer, self.USER_ANSWER_TOKEN_BUDGET)
 
         prompt = f"""
 請分析以下面試回答：
@@ -106,78 +186,14 @@ class AIAnswerAnalyzer:
 標準答案：{standard_answer}
 
 用戶回答：{user_answer}
-
-請從以下角度進行分析：
-1. 內容準確性：用戶回答是否涵蓋了標準答案的核心要點
-2. 表達方式：雖然用詞可能不同，但意思是否相同
-3. 邏輯結構：回答是否有良好的邏輯性
-4. 完整性：是否完整回答了問題
-
-注意：即使用詞不同，只要意思相同或相近，都應該給予較高的相似度評分。
-
-請以 JSON 格式返回分析結果。
 """
         return prompt
 
-    def _parse_ai_response(self, ai_response: str) -> Dict[str, Any]:
-        """解析 AI 回應"""
-        try:
-            import json
-            import re
-
-            # 清理回應內容
-            cleaned_response = ai_response.strip()
-
-            # 嘗試提取 JSON 部分
-            json_match = re.search(r"\{.*\}", cleaned_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                result = json.loads(json_str)
-            else:
-                # 嘗試直接解析
-                result = json.loads(cleaned_response)
-
-            # 確保必要欄位存在
-            required_fields = ["score", "grade", "similarity", "feedback"]
-            for field in required_fields:
-                if field not in result:
-                    result[field] = self._get_default_value(field)
-
-            # 確保分數在有效範圍內
-            result["score"] = max(0, min(100, int(result["score"])))
-            result["similarity"] = max(0.0, min(1.0, float(result["similarity"])))
-
-            return result
-
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
-            logger.error(f"解析 AI 回應失敗: {e}")
-            logger.error(f"AI 回應內容: {ai_response}")
-            return self._get_default_analysis()
-
-    def _get_default_value(self, field: str) -> Any:
-        """獲取預設值"""
-        defaults = {
-            "score": 0,
-            "grade": "需要改進",
-            "similarity": 0.0,
-            "feedback": "AI 分析失敗，請檢查回答內容",
-            "differences": ["無法分析差異"],
-            "strengths": [],
-            "suggestions": ["建議重新回答問題"],
-        }
-        return defaults.get(field, "")
-
-    def _get_default_analysis(self) -> Dict[str, Any]:
-        """獲取預設分析結果"""
-        return {
-            "score": 0,
-            "grade": "需要改進",
-            "similarity": 0.0,
-            "feedback": "AI 分析失敗，使用預設評分",
-            "differences": ["分析失敗"],
-            "strengths": [],
-            "suggestions": ["請重新嘗試回答"],
-        }
+    def _normalize_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """將已通過 Schema 驗證的結果限制在有效範圍內"""
+        result["score"] = max(0, min(100, int(result["score"])))
+        result["similarity"] = max(0.0, min(1.0, float(result["similarity"])))
+        return result
 
     def _fallback_analysis(
         self, user_answer: str, standard_answer: str
@@ -14,23 +14,84 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-try:
-    from openai import OpenAI
-except ImportError as e:
-    OpenAI = None  # 延後在執行時再報錯，避免導入期間中止
+from .llm_gateway import PRIORITY_BATCH, llm_gateway
+from .structured_output import StructuredOutputError, compile_schema
+from .token_budget import truncate_to_budget
+
+# 輸出格式與原則：每次請求都相同，放在系統提示中以命中供應商的提示快取
+SUMMARY_REQUIREMENTS = {
+    "format": {
+        "overview": "string",
+        "grade": "string",
+        "top_categories": ["string"],
+        "weak_categories": ["string"],
+        "self_intro": {
+            "opening": {"status": "ok|miss", "tip": "string"},
+            "background": {"status": "ok|miss", "tip": "string"},
+            "skills": {"status": "ok|miss", "tip": "string"},
+            "achievements": {"status": "ok|miss", "tip": "string"},
+            "role_match": {"status": "ok|miss", "tip": "string"},
+            "closing": {"status": "ok|miss", "tip": "string"},
+        },
+        "highlights": ["string"],
+        "gaps": ["string"],
+        "practice_checklist": ["string"],
+        "resources": ["string"],
+        "cta": "string",
+    },
+    "principles": [
+        "以台灣繁體中文回答",
+        "每條建議務必具體且可行",
+        "保持禮貌、鼓勵式語氣，但避免空話",
+        "若資訊不足，合理推斷但要保守",
+    ],
+}
+
+
+def _schema_from_example(example: Any) -> Dict[str, Any]:
+    """由格式範例產生嚴格模式的 JSON Schema（"a|b" 表示列舉值）"""
+    if isinstance(example, dict):
+        return {
+            "type": "object",
+            "properties": {k: _schema_from_example(v) for k, v in example.items()},
+            "required": list(example),
+            "additionalProperties": False,
+        }
+    if isinstance(example, list):
+        return {"type": "array", "items": _schema_from_example(example[0])}
+    if "|" in example:
+        return {"type": "string", "enum": example.split("|")}
+    return {"type": "string"}
+
+
+def _system_prompt(requirements: Dict[str, Any]) -> str:
+    return (
+        "你是一位面試教練。請根據輸入的面試會話歷史，"
+        "輸出精煉、可執行、用詞禮貌且具體的建議。"
+        "只回傳 JSON，不要任何額外文字。\n\n"
+        "輸出要求：" + json.dumps(requirements, ensure_ascii=False)
+    )
+
+
+SUMMARY_SCHEMA = _schema_from_example(SUMMARY_REQUIREMENTS["format"])
+validate_summary = compile_schema(SUMMARY_SCHEMA)
+SUMMARY_SYSTEM_PROMPT = _system_prompt(SUMMARY_REQUIREMENTS)
 
 
 class FlowSummarizer:
     """封裝與 OpenAI 的互動以生成會話總結。"""
 
+    # 會話歷史在提示中的 token 預算：依作答數平均分配給每則回答
+    HISTORY_TOKEN_BUDGET = 3000
+    ANSWER_TOKEN_RANGE = (60, 400)
+    QUESTION_TOKEN_BUDGET = 120
+
     def __init__(self) -> None:
         api_key = os.getenv("OPENAI_API_KEY", "").strip()
         if not api_key:
             raise ValueError("尚未設定 OPENAI_API_KEY，請在 .env 中配置後再試。")
-        if OpenAI is None:
-            raise ImportError("找不到 openai 套件，請先安裝: pip install openai")
 
-        self.client = OpenAI(api_key=api_key)
+        self.gateway = llm_gateway
 
     # 對外主要介面 -----------------------------------------------------------
     def generate_user_summary(self, session_summary: Dict[str, Any]) -> Dict[str, Any]:
@@ -41,31 +102,29 @@ class FlowSummarizer:
         - text: 直接可顯示的卡片文案
         - insights: 結構化建議（overview/strengths/weaknesses/...）
         """
-
         conversation_compact = self._compact_history(
             session_summary.get("session_history", [])
         )
         prompt = self._build_prompt(session_summary, conversation_compact)
 
-        completion = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0.2,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "你是一位面試教練。請根據輸入的面試會話歷史，"
-                        "輸出精煉、可執行、用詞禮貌且具體的建議。"
-                        "只回傳 JSON，不要任何額外文字。"
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=1200,
-        )
-
-        raw = completion.choices[0].message.content or "{}"
-        insights = self._safe_json(raw)
+        # 總結屬批次工作，排在即時評分之後；輸出格式由 JSON Schema 限制
+        try:
+            insights = self.gateway.chat_json(
+                temperature=0.2,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                schema_name="interview_summary",
+                schema=SUMMARY_SCHEMA,
+                validator=validate_summary,
+                max_tokens=1200,
+                priority=PRIORITY_BATCH,
+                purpose="summary",
+            )
+        except StructuredOutputError:
+            insights = self._empty_insights()
+        raw = json.dumps(insights, ensure_ascii=False)
         text = self._format_user_text(session_summary, insights)
 
         return {"text": text, "insights": insights, "raw": raw}
@@ -83,33 +142,6 @@ class FlowSummarizer:
                 "average_score": average_score,
             },
             "history": compact_history,
-            "requirements": {
-                "format": {
-                    "overview": "string",
-                    "grade": "string",
-                    "top_categories": ["string"],
-                    "weak_categories": ["string"],
-                    "self_intro": {
-                        "opening": {"status": "ok|miss", "tip": "string"},
-                        "background": {"status": "ok|miss", "tip": "string"},
-                        "skills": {"status": "ok|miss", "tip": "string"},
-                        "achievements": {"status": "ok|miss", "tip": "string"},
-                        "role_match": {"status": "ok|miss", "tip": "string"},
-                        "closing": {"status": "ok|miss", "tip": "string"},
-                    },
-                    "highlights": ["string"],
-                    "gaps": ["string"],
-                    "practice_checklist": ["string"],
-                    "resources": ["string"],
-                    "cta": "string",
-                },
-                "principles": [
-                    "以台灣繁體中文回答",
-                    "每條建議務必具體且可行",
-                    "保持禮貌、鼓勵式語氣，但避免空話",
-                    "若資訊不足，合理推斷但要保守",
-                ],
-            },
         }
 
         return (
@@ -118,13 +150,22 @@ class FlowSummarizer:
         )
 
     def _compact_history(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        answer_count = sum(1 for item in history if item.get("type") == "answer")
+        low, high = self.ANSWER_TOKEN_RANGE
+        answer_budget = max(
+            low, min(high, self.HISTORY_TOKEN_BUDGET // max(1, answer_count))
+        )
+
         compact: List[Dict[str, Any]] = []
         for item in history:
             if item.get("type") == "question":
                 compact.append(
                     {
                         "type": "q",
-                        "q": str(item.get("data", {}).get("question", "")),
+                        "q": truncate_to_budget(
+                            str(item.get("data", {}).get("question", "")),
+                            self.QUESTION_TOKEN_BUDGET,
+                        ),
                         "src": str(item.get("data", {}).get("source", "")),
                     }
                 )
@@ -133,7 +174,9 @@ class FlowSummarizer:
                 compact.append(
                     {
                         "type": "a",
-                        "user_answer": str(item.get("user_answer", "")),
+                        "user_answer": truncate_to_budget(
+                            str(item.get("user_answer", "")), answer_budget
+                        ),
                         "score": int(analysis.get("score", 0)),
                         "grade": str(analysis.get("grade", "")),
                         "similarity": float(analysis.get("similarity", 0.0)),
@@ -206,29 +249,20 @@ class FlowSummarizer:
         return "\n".join(lines)
 
     # 工具 -------------------------------------------------------------------
-    def _safe_json(self, content: str) -> Dict[str, Any]:
-        try:
-            # 有時模型會包多餘文字，嘗試抓取第一個 JSON 區塊
-            import re
-
-            match = re.search(r"\{[\s\S]*\}", content)
-            if match:
-                return json.loads(match.group(0))
-            return json.loads(content)
-        except Exception:
-            # 回退為最小可用結構
-            return {
-                "overview": "",
-                "grade": "",
-                "top_categories": [],
-                "weak_categories": [],
-                "self_intro": {},
-                "highlights": [],
-                "gaps": [],
-                "practice_checklist": [],
-                "resources": [],
-                "cta": "輸入『重新開始』立即再練一輪。",
-            }
+    def _empty_insights(self) -> Dict[str, Any]:
+        """模型輸出無法使用時的最小可用結構"""
+        return {
+            "overview": "",
+            "grade": "",
+            "top_categories": [],
+            "weak_categories": [],
+            "self_intro": {},
+            "highlights": [],
+            "gaps": [],
+            "practice_checklist": [],
+            "resources": [],
+            "cta": "輸入『重新開始』立即再練一輪。",
+        }
 
 
 # 模組級單例，方便其他模組直接使用
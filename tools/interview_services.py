@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+面試核心服務
+出題與評分的共用邏輯，MCP 伺服器與 Flask 橋接模組都直接呼叫這裡，
+不再經由彼此包裝過的工具函式。結果以精簡的物件回傳，類別與難度在建立時計算一次；
+轉為字典或回應文字只在各自的出口（MCP 工具、橋接模組）進行
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from .answer_analyzer import answer_analyzer
+from .keyword_matcher import KeywordMatcher
+from .metrics import metrics
+from .question_index import question_index
+from .question_manager import question_manager
+from .tool_registry import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 問題類別關鍵字（依序判斷，第一個命中的類別為準）
+QUESTION_CATEGORIES = {
+    "自我介紹": ["介紹", "自己", "背景", "經歷"],
+    "技術能力": ["技術", "技能", "程式", "開發", "程式設計"],
+    "專案經驗": ["專案", "經驗", "實作", "作品"],
+    "問題解決": ["問題", "解決", "困難", "挑戰"],
+    "團隊合作": ["團隊", "合作", "溝通", "協作"],
+    "學習能力": ["學習", "成長", "進步", "新技術"],
+}
+_category_matcher = KeywordMatcher(QUESTION_CATEGORIES)
+
+MISSING_STANDARD_ANSWER = "標準答案未提供"
+
+
+def categorize_question(question: str) -> str:
+    """對問題進行分類"""
+    return _category_matcher.first_group(question, "一般問題")
+
+
+def assess_difficulty(question: str) -> str:
+    """依題目長度評估問題難度"""
+    if len(question) < 50:
+        return "簡單"
+    elif len(question) < 100:
+        return "中等"
+    else:
+        return "困難"
+
+
+class QuestionResult:
+    """一道題目與其分類；selection 為挑選方式（"profile" 表示依履歷挑選）"""
+
+    __slots__ = (
+        "question",
+        "standard_answer",
+        "source",
+        "category",
+        "difficulty",
+        "selection",
+    )
+
+    def __init__(
+        self,
+        question: str,
+        standard_answer: str,
+        source: str = "",
+        category: str = "",
+        difficulty: str = "",
+        selection: str = "",
+    ):
+        self.question = question
+        self.standard_answer = standard_answer
+        self.source = source
+        self.category = category or categorize_question(question)
+        self.difficulty = difficulty or assess_difficulty(question)
+        self.selection = selection
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any], **overrides) -> "QuestionResult":
+        """由題庫文件建立"""
+        fields = {
+            "question": doc.get("question", ""),
+            "standard_answer": doc.get("standard_answer", ""),
+            "source": doc.get("source", ""),
+        }
+        fields.update(overrides)
+        return cls(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "question": self.question,
+            "standard_answer": self.standard_answer,
+            "category": self.category,
+            "difficulty": self.difficulty,
+            "source": self.source,
+        }
+        if self.selection:
+            data["selection"] = self.selection
+        return data
+
+
+class GradingResult:
+    """一次作答的評分結果"""
+
+    __slots__ = (
+        "question",
+        "user_answer",
+        "standard_answer",
+        "score",
+        "grade",
+        "similarity",
+        "feedback",
+        "differences",
+        "strengths",
+        "suggestions",
+        "method",
+    )
+
+    def __init__(
+        self,
+        question: str,
+        user_answer: str,
+        standard_answer: str,
+        score: int = 0,
+        grade: str = "未知",
+        similarity: float = 0.0,
+        feedback: str = "無反饋",
+        differences: Optional[List[str]] = None,
+        strengths: Optional[List[str]] = None,
+        suggestions: Optional[List[str]] = None,
+        method: str = "",
+    ):
+        self.question = question
+        self.user_answer = user_answer
+        self.standard_answer = standard_answer
+        self.score = score
+        self.grade = grade
+        self.similarity = similarity
+        self.feedback = feedback
+        self.differences = differences or []
+        self.strengths = strengths or []
+        self.suggestions = suggestions or []
+        self.method = method
+
+    @classmethod
+    def from_analysis(
+        cls,
+        analysis: Dict[str, Any],
+        question: str,
+        user_answer: str,
+        standard_answer: str,
+    ) -> "GradingResult":
+        """由答案分析器的結果建立"""
+        return cls(
+            question,
+            user_answer,
+            standard_answer,
+            score=analysis.get("score", 0),
+            grade=analysis.get("grade", "未知"),
+            similarity=analysis.get("similarity", 0.0),
+            feedback=analysis.get("feedback", "無反饋"),
+            differences=analysis.get("differences"),
+            strengths=analysis.get("strengths"),
+            suggestions=analysis.get("suggestions"),
+            method=analysis.get("analysis_method", ""),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class QuestionService:
+    """出題：隨機、依類別或難度取題，以及依題目查詢題庫"""
+
+    def random_question(self) -> QuestionResult:
+        return QuestionResult.from_document(question_manager.get_random_question())
+
+    def question_by_category(self, category: str) -> QuestionResult:
+        doc = question_manager.get_question_by_category(category)
+        return QuestionResult.from_document(doc, category=category)
+
+    def question_by_difficulty(self, difficulty: str) -> QuestionResult:
+        doc = question_manager.get_question_by_difficulty(difficulty)
+        return QuestionResult.from_document(doc, difficulty=difficulty)
+
+    def planned_question(self, planned: Dict[str, Any]) -> QuestionResult:
+        """會話開始時依履歷挑選的題目"""
+        return QuestionResult.from_document(
+            planned,
+            standard_answer=planned.get("standard_answer") or "（請根據您的經驗回答）",
+            selection="profile",
+        )
+
+    def lookup(self, question: str) -> Optional[QuestionResult]:
+        """依題目文字查詢題庫中的原題，查無時回傳 None"""
+        doc = question_index.lookup(question)
+        return None if doc is None else QuestionResult.from_document(doc)
+
+    def standard_answer_for(self, question: str) -> str:
+        """依題目查詢標準答案，查無時回傳提示文字"""
+        doc = question_index.lookup(question)
+        if doc is None or not doc["standard_answer"]:
+            return MISSING_STANDARD_ANSWER
+        return doc["standard_answer"]
+
+
+class GradingService:
+    """
+    評分：補齊標準答案後交給答案分析器。
+
+    相同題目與回答的模型評分結果短暫快取，MCP 客戶端與網頁端的重複評分只呼叫一次模型；
+    模型不可用時的傳統分析結果不快取
+    """
+
+    def __init__(self, questions: QuestionService, cache_ttl: float = 300):
+        self.questions = questions
+        self._cache = TTLCache(ttl=cache_ttl)
+
+    def grade(
+        self, user_answer: str, question: str, standard_answer: str = ""
+    ) -> GradingResult:
+        standard_answer = standard_answer or self.questions.standard_answer_for(
+            question
+        )
+        key = self._cache_key(user_answer, question, standard_answer)
+        cached = self._cache.get(key)
+        if cached is not None:
+            metrics.increment("grading.cache_hit")
+            return cached
+
+        with metrics.timer("grading.grade_ms"):
+            analysis = answer_analyzer.analyze_answer(
+                user_answer, standard_answer, question
+            )
+        return self._remember(key, analysis, question, user_answer, standard_answer)
+
+    async def agrade(
+        self, user_answer: str, question: str, standard_answer: str = ""
+    ) -> GradingResult:
+        """grade() 的非同步版本：等待模型時不佔用執行緒"""
+        standard_answer = standard_answer or self.questions.standard_answer_for(
+            question
+        )
+        key = self._cache_key(user_answer, question, standard_answer)
+        cached = self._cache.get(key)
+        if cached is not None:
+            metrics.increment("grading.cache_hit")
+            return cached
+
+        with metrics.timer("grading.grade_ms"):
+            analysis = await answer_analyzer.aanalyze_answer(
+                user_answer, standard_answer, question
+            )
+        return self._remember(key, analysis, question, user_answer, standard_answer)
+
+    @staticmethod
+    def _cache_key(user_answer: str, question: str, standard_answer: str):
+        return {
+            "user_answer": user_answer,
+            "question": question,
+            "standard_answer": standard_answer,
+        }
+
+    def _remember(self, key, analysis, question, user_answer, standard_answer):
+        result = GradingResult.from_analysis(
+            analysis, question, user_answer, standard_answer
+        )
+        if result.method == "AI":
+            self._cache.put(key, result)
+        return result
+
+
+# 全域服務實例
+question_service = QuestionService()
+grading_service = GradingService(question_service)
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+自我介紹分析模組
+依六個構面一次產生結構化分析（是否涵蓋、說明、建議、評分），
+同一份內容只送模型一次，分析階段與最終總結共用同一份結果；
+用戶仍在輸入時逐段更新關鍵字涵蓋情況，並可在背景預先呼叫模型分析
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .keyword_matcher import KeywordMatcher
+from .llm_gateway import PRIORITY_BATCH, PRIORITY_INTERACTIVE, llm_gateway
+from .metrics import metrics
+from .structured_output import compile_schema
+from .token_budget import count_tokens, truncate_to_budget
+
+# 六個構面：(鍵, 顯示名稱)；鍵與 FlowSummarizer 的 self_intro 欄位一致
+INTRO_DIMENSIONS: List[Tuple[str, str]] = [
+    ("opening", "1. 開場簡介"),
+    ("background", "2. 學經歷概述"),
+    ("skills", "3. 核心技能與強項"),
+    ("achievements", "4. 代表成果"),
+    ("role_match", "5. 與職缺的連結"),
+    ("closing", "6. 結語與期待"),
+]
+
+# 各構面的關鍵字（模型不可用時的回退分析）
+INTRO_KEYWORDS = {
+    "opening": [
+        "我是",
+        "我叫",
+        "身份",
+        "專業定位",
+        "經驗",
+        "年數",
+        "領域",
+        "工程師",
+        "開發者",
+        "程式設計師",
+        "資深",
+        "初級",
+        "中級",
+    ],
+    "background": [
+        "學歷",
+        "畢業",
+        "大學",
+        "碩士",
+        "博士",
+        "工作經歷",
+        "任職",
+        "擔任",
+        "相關經驗",
+        "職位",
+        "公司",
+        "服務",
+        "工作",
+        "經歷",
+        "背景",
+    ],
+    "skills": [
+        "技術",
+        "技能",
+        "軟技能",
+        "專長",
+        "優勢",
+        "擅長",
+        "熟悉",
+        "會",
+        "python",
+        "java",
+        "javascript",
+        "react",
+        "vue",
+        "angular",
+        "node",
+        "django",
+        "flask",
+        "spring",
+        "mysql",
+        "postgresql",
+        "mongodb",
+        "docker",
+        "kubernetes",
+        "aws",
+        "azure",
+        "linux",
+        "git",
+        "html",
+        "css",
+        "typescript",
+        "php",
+        "c++",
+        "golang",
+        "rust",
+        "程式語言",
+        "框架",
+        "資料庫",
+        "雲端",
+        "機器學習",
+        "ai",
+        "devops",
+    ],
+    "achievements": [
+        "專案",
+        "項目",
+        "開發",
+        "建立",
+        "完成",
+        "達成",
+        "提升",
+        "改善",
+        "具體成果",
+        "數據",
+        "影響力",
+        "價值",
+        "成就",
+        "貢獻",
+        "效率",
+        "降低",
+        "增加",
+        "優化",
+        "實作",
+        "建置",
+    ],
+    "role_match": [
+        "職位",
+        "工作",
+        "公司",
+        "團隊",
+        "匹配",
+        "適合",
+        "目標",
+        "動機",
+        "希望",
+        "想要",
+        "貢獻",
+        "加入",
+        "發展",
+        "成長",
+        "學習",
+    ],
+    "closing": [
+        "期待",
+        "希望",
+        "感謝",
+        "謝謝",
+        "合作",
+        "學習",
+        "成長",
+        "貢獻",
+        "機會",
+        "未來",
+        "發展",
+        "態度",
+        "意願",
+        "請多指教",
+    ],
+}
+
+# 技術詞彙：提及時代表有說明技能
+TECH_KEYWORDS = [
+    "python",
+    "java",
+    "javascript",
+    "react",
+    "vue",
+    "angular",
+    "node",
+    "django",
+    "flask",
+    "spring",
+    "mysql",
+    "postgresql",
+    "mongodb",
+    "docker",
+    "kubernetes",
+    "aws",
+    "azure",
+    "linux",
+    "git",
+    "html",
+    "css",
+    "typescript",
+    "php",
+    "c++",
+    "golang",
+    "rust",
+]
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+_DIMENSION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "status": {"type": "string", "enum": ["ok", "miss"]},
+        "content": {"type": "string"},
+        "tip": {"type": "string"},
+        "score": {"type": "integer"},
+    },
+    "required": ["status", "content", "tip", "score"],
+    "additionalProperties": False,
+}
+
+INTRO_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "dimensions": {
+            "type": "object",
+            "properties": {key: _DIMENSION_SCHEMA for key, _ in INTRO_DIMENSIONS},
+            "required": [key for key, _ in INTRO_DIMENSIONS],
+            "additionalProperties": False,
+        },
+        "overall_score": {"type": "number"},
+        "strengths": _STRING_LIST,
+        "suggestions": _STRING_LIST,
+    },
+    "required": ["dimensions", "overall_score", "strengths", "suggestions"],
+    "additionalProperties": False,
+}
+
+validate_intro_analysis = compile_schema(INTRO_ANALYSIS_SCHEMA)
+
+# 評估標準與輸出原則固定不變，放在系統提示中以命中供應商的提示快取
+INTRO_SYSTEM_PROMPT = """您是一個專業的面試官和職涯顧問，擅長分析自我介紹並提供具體的改進建議。
+請按照以下 6 個構面評估用戶的自我介紹：
+
+1. opening（開場簡介）：是否包含身份、專業定位、經驗年數等基本信息
+2. background（學經歷概述）：是否包含學歷背景、工作經歷、相關經驗等
+3. skills（核心技能與強項）：是否包含技術技能、程式語言、專業能力等
+4. achievements（代表成果）：是否包含具體項目、成就、數據或影響力等
+5. role_match（與職缺的連結）：是否表達對職位的理解、匹配度或動機等
+6. closing（結語與期待）：是否包含感謝、期待、合作意願等結語
+
+每個構面回傳：
+- status：已包含為 "ok"，缺少為 "miss"
+- content：簡短說明找到的內容或缺失原因
+- tip：一句具體的改進建議
+- score：1-10 的整數評分
+
+另外回傳 overall_score（1-10 的整體評分）、strengths（優點）與 suggestions（具體改進建議）。
+以台灣繁體中文回答，只回傳 JSON。"""
+
+
+def _digest(content: str) -> str:
+    # 前後空白不影響分析結果，呼叫端是否 strip 都視為同一內容
+    return hashlib.sha256(content.strip().encode("utf-8")).hexdigest()
+
+
+class _Speculation:
+    """一次預先分析：內容停止增加一段時間後才在背景呼叫模型"""
+
+    __slots__ = ("digest", "content", "timer", "future", "started")
+
+    def __init__(self, digest: str, content: str):
+        self.digest = digest
+        self.content = content
+        self.timer: Optional[threading.Timer] = None
+        self.future: Future = Future()
+        self.started = False
+
+
+class IntroAnalyzer:
+    """自我介紹分析器：每位用戶快取最近一份內容的分析結果"""
+
+    # 自我介紹送進分析提示的 token 上限（超過時保留頭尾、省略中段）
+    INTRO_TOKEN_BUDGET = 1500
+
+    def __init__(self, gateway=llm_gateway):
+        self.gateway = gateway
+        self._cache: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._coverage: Dict[str, Dict[str, List[str]]] = {}
+        self._speculations: Dict[str, _Speculation] = {}
+        self._lock = threading.Lock()
+        self._matcher = KeywordMatcher({**INTRO_KEYWORDS, "_tech": TECH_KEYWORDS})
+
+        # 邊輸入邊預先分析：內容達到最低 token 數、且停止增加指定秒數後才送出
+        self.speculation_enabled = os.getenv("INTRO_SPECULATION", "1") != "0"
+        self.speculation_min_tokens = int(
+            os.getenv("INTRO_SPECULATION_MIN_TOKENS", "80")
+        )
+        self.speculation_delay = float(os.getenv("INTRO_SPECULATION_DELAY", "3"))
+
+    def analyze(
+        self, user_id: str, content: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """
+        取得自我介紹的結構化分析。
+
+        內容與快取相同時直接回傳快取結果；相同內容的預先分析仍在進行時等待其結果
+        （預先分析在開始前被取消時改為直接分析）；否則呼叫模型分析並快取。
+        模型不可用時回傳關鍵字分析（不快取，之後仍會再嘗試模型）。
+        """
+        cached = self.cached(user_id, content)
+        if cached is not None:
+            metrics.increment("intro.analysis_cache_hit")
+            return cached
+
+        digest = _digest(content)
+        with self._lock:
+            speculation = self._speculations.get(str(user_id))
+        if speculation is not None and speculation.digest == digest:
+            metrics.increment("intro.speculation_hit")
+            # 尚未開始時不必等到延遲結束，立即以本次優先順序執行
+            if speculation.timer is not None:
+                speculation.timer.cancel()
+            self._run_speculation(str(user_id), speculation, priority)
+            try:
+                return speculation.future.result()
+            except CancelledError:
+                # 取得預先分析後、開始執行前被清除或取代，改為直接分析
+                metrics.increment("intro.speculation_cancelled")
+            except Exception as e:
+                print(f"⚠️ LLM 分析失敗，回退到關鍵字分析: {e}")
+                return self._keyword_analysis(content)
+
+        try:
+            analysis = self._llm_analysis(content, priority)
+        except Exception as e:
+            print(f"⚠️ LLM 分析失敗，回退到關鍵字分析: {e}")
+            return self._keyword_analysis(content)
+
+        with self._lock:
+            self._cache[str(user_id)] = (digest, analysis)
+        return analysis
+
+    def add_fragment(self, user_id: str, fragment: str) -> Dict[str, Dict[str, Any]]:
+        """
+        收到一段自我介紹時更新各構面的涵蓋情況並回傳（只掃描新片段）。
+
+        片段以空白串接，關鍵字不會跨越片段，因此逐段累加的結果與整段掃描相同。
+        """
+        matches = self._matcher.find(fragment)
+        with self._lock:
+            coverage = self._coverage.setdefault(str(user_id), {})
+            for group, keywords in matches.items():
+                found = coverage.setdefault(group, [])
+                found.extend(k for k in keywords if k not in found)
+            return self._dimensions_from_matches(coverage)
+
+    def speculate(self, user_id: str, content: str) -> None:
+        """
+        內容足夠時排程背景預先分析；內容再增加時取代尚未完成的預先分析。
+
+        已開始的模型呼叫無法中止，但其結果與最新內容不符時會被捨棄。
+        """
+        if (
+            not self.speculation_enabled
+            or count_tokens(content) < self.speculation_min_tokens
+        ):
+            return
+
+        user_id = str(user_id)
+        digest = _digest(content)
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and entry[0] == digest:
+                return
+            previous = self._speculations.get(user_id)
+            if previous is not None:
+                if previous.digest == digest:
+                    return
+                if previous.timer is not None:
+                    previous.timer.cancel()
+                if not previous.started:
+                    previous.future.cancel()
+                metrics.increment("intro.speculation_superseded")
+
+            speculation = _Speculation(digest, content)
+            speculation.timer = threading.Timer(
+                self.speculation_delay,
+                self._run_speculation,
+                (user_id, speculation, PRIORITY_BATCH),
+            )
+            speculation.timer.daemon = True
+            self._speculations[user_id] = speculation
+        speculation.timer.start()
+
+    def _run_speculation(
+        self, user_id: str, speculation: _Speculation, priority: int
+    ) -> None:
+        with self._lock:
+            if (
+                speculation.started
+                or self._speculations.get(user_id) is not speculation
+            ):
+                return
+            speculation.started = True
+
+        metrics.increment("intro.speculation_started")
+        try:
+            analysis = self._llm_analysis(speculation.content, priority)
+        except Exception as e:
+            with self._lock:
+                if self._speculations.get(user_id) is speculation:
+                    del self._speculations[user_id]
+            speculation.future.set_exception(e)
+            return
+
+        with self._lock:
+            if self._speculations.get(user_id) is speculation:
+                del self._speculations[user_id]
+                self._cache[user_id] = (speculation.digest, analysis)
+            else:
+                # 分析期間內容已變更或已清除，結果不再適用
+                metrics.increment("intro.speculation_discarded")
+        speculation.future.set_result(analysis)
+
+    def cached(
+        self, user_id: str, content: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """取得快取的分析；指定 content 時只在內容相同時回傳"""
+        with self._lock:
+            entry = self._cache.get(str(user_id))
+        if entry is None:
+            return None
+        digest, analysis = entry
+        if content is not None and digest != _digest(content):
+            return None
+        return analysis
+
+    def clear(self, user_id: str) -> None:
+        """清除用戶的分析快取、涵蓋情況與進行中的預先分析"""
+        with self._lock:
+            self._cache.pop(str(user_id), None)
+            self._coverage.pop(str(user_id), None)
+            speculation = self._speculations.pop(str(user_id), None)
+            if speculation is None:
+                return
+            if speculation.timer is not None:
+                speculation.timer.cancel()
+            # 尚未開始的預先分析不會再執行，取消 future 讓等待中的 analyze() 改為直接分析；
+            # 已開始的會照常完成，結果交給等待者但不寫入快取
+            if not speculation.started:
+                speculation.future.cancel()
+
+    def _llm_analysis(self, content: str, priority: int) -> Dict[str, Any]:
+        data = self.gateway.chat_json(
+            messages=[
+                {"role": "system", "content": INTRO_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": "**自我介紹內容**：\n"
+                    + truncate_to_budget(content, self.INTRO_TOKEN_BUDGET),
+                },
+            ],
+            schema_name="intro_analysis",
+            schema=INTRO_ANALYSIS_SCHEMA,
+            validator=validate_intro_analysis,
+            temperature=0.3,
+            max_tokens=1200,
+            priority=priority,
+            purpose="intro",
+        )
+
+        dimensions = {}
+        for key, _ in INTRO_DIMENSIONS:
+            item = data["dimensions"][key]
+            dimensions[key] = {
+                "status": item["status"],
+                "content": item["content"],
+                "tip": item["tip"],
+                "score": max(1, min(10, item["score"])),
+            }
+        return {
+            "method": "llm",
+            "dimensions": dimensions,
+            "overall_score": round(max(0.0, min(10.0, data["overall_score"])), 1),
+            "strengths": data["strengths"],
+            "suggestions": data["suggestions"],
+        }
+
+    def _keyword_analysis(self, content: str) -> Dict[str, Any]:
+        """回退的關鍵字分析：只判斷是否涵蓋，不給評分"""
+        # 單次掃描找出所有構面（及技術詞彙）的命中關鍵字
+        dimensions = self._dimensions_from_matches(self._matcher.find(content))
+        return {
+            "method": "keyword",
+            "dimensions": dimensions,
+            "overall_score": None,
+            "strengths": [],
+            "suggestions": [
+                item["tip"] for item in dimensions.values() if item["status"] == "miss"
+            ],
+        }
+
+    @staticmethod
+    def _dimensions_from_matches(
+        matches: Dict[str, List[str]],
+    ) -> Dict[str, Dict[str, Any]]:
+        dimensions = {}
+        for key, label in INTRO_DIMENSIONS:
+            found_keywords = list(matches.get(key, []))
+            # 特別處理技能相關的匹配：提到技術詞彙時，「會/熟悉/擅長」也視為已提及
+            if key == "skills" and "_tech" in matches:
+                found_keywords += [
+                    k for k in ("會", "熟悉", "擅長") if k not in found_keywords
+                ]
+
+            if found_keywords:
+                dimensions[key] = {
+                    "status": "ok",
+                    "content": f"已提及 - {', '.join(found_keywords[:3])}",
+                    "tip": "",
+                    "score": None,
+                }
+            else:
+                dimensions[key] = {
+                    "status": "miss",
+                    "content": "缺少相關內容",
+                    "tip": f"建議補充{label}的內容",
+                    "score": None,
+                }
+        return dimensions
+
+
+# 全域自我介紹分析器實例
+intro_analyzer = IntroAnalyzer()
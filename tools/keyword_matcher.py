@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+關鍵字比對模組
+以 Aho-Corasick 自動機一次掃描文字，找出所有關鍵字組的命中結果
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class KeywordMatcher:
+    """多組關鍵字比對器（建立一次，比對成本只與文字長度成正比）"""
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = list(groups)
+        # 狀態機：每個狀態的轉移表、失敗連結與輸出（(組名, 關鍵字) 清單）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                self._add(group, keyword.lower())
+        self._build_failure_links()
+
+    def _add(self, group: str, keyword: str) -> None:
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((group, keyword))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # 合併失敗狀態的輸出，掃描時不需再沿失敗鏈收集
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Dict[str, List[str]]:
+        """回傳每個命中組別的關鍵字（依首次出現順序、不重複）"""
+        matches: Dict[str, List[str]] = {}
+        state = 0
+        for char in (text or "").lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for group, keyword in self._output[state]:
+                found = matches.setdefault(group, [])
+                if keyword not in found:
+                    found.append(keyword)
+        return matches
+
+    def matched_groups(self, text: str) -> Set[str]:
+        """回傳命中的組別集合"""
+        return set(self.find(text))
+
+    def first_group(self, text: str, default: str = "") -> str:
+        """依組別定義順序回傳第一個命中的組別"""
+        matched = self.find(text)
+        return next((group for group in self.groups if group in matched), default)
@@ -0,0 +1,821 @@
+#!/usr/bin/env python3
+"""
+LLM 呼叫閘道模組
+所有 OpenAI 呼叫共用的速率限制與准入控制：
+每分鐘請求數 / token 數的令牌桶、依優先順序排隊、佇列滿時立即拒絕，
+遇到 429 時以指數退避加隨機抖動重試；
+每次呼叫有逾時上限，可選擇在慢於 p95 時送出備援請求（hedging），
+連續失敗時以斷路器讓所有呼叫端直接改用本地方法；
+同步（chat）與非同步（achat，供 ASGI 應用的事件迴圈使用）呼叫共用同一組限速、佇列與斷路器；
+呼叫端可用 stream_to() 在串流接收期間取得模型輸出的片段（例如推送給 WebSocket）
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .metrics import metrics
+from .structured_output import (
+    IncrementalJSONParser,
+    StructuredOutputError,
+    Validator,
+    response_format,
+)
+from .token_budget import count_tokens
+
+try:
+    from openai import AsyncOpenAI, OpenAI, RateLimitError
+except ImportError:
+    OpenAI = None  # 延後在呼叫時再報錯，避免導入期間中止
+    AsyncOpenAI = None
+    RateLimitError = None
+
+logger = logging.getLogger(__name__)
+
+# 優先順序（數字越小越先處理）：即時評分優先於批次總結
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# 目前呼叫端的串流片段接收者；以 contextvar 傳遞，不需層層傳參
+_stream_listener: contextvars.ContextVar[Optional[Callable[[str], None]]] = (
+    contextvars.ContextVar("llm_stream_listener", default=None)
+)
+
+
+@contextmanager
+def stream_to(listener: Callable[[str], None]) -> Iterator[None]:
+    """
+    在此區塊內發出的串流呼叫，每收到一段輸出就呼叫 listener(片段)。
+
+    listener 在接收串流的執行緒中執行，應盡快返回（例如只放入佇列）；
+    備援請求（hedging）的輸出不會送給 listener，避免兩份輸出交錯
+    """
+    token = _stream_listener.set(listener)
+    try:
+        yield
+    finally:
+        _stream_listener.reset(token)
+
+
+def _notify_listener(listener: Optional[Callable[[str], None]], text: str) -> None:
+    if listener is None or not text:
+        return
+    try:
+        listener(text)
+    except Exception as e:
+        # 接收端的錯誤不影響模型呼叫
+        logger.debug(f"串流片段接收者發生錯誤: {e}")
+
+
+class LLMOverloadedError(Exception):
+    """佇列已滿或等待逾時；呼叫端應改用本地方法"""
+
+
+class LLMUnavailableError(LLMOverloadedError):
+    """斷路器開啟中（上游連續失敗）；呼叫端應改用本地方法"""
+
+
+class _Superseded(Exception):
+    """備援請求已先成功，主要請求的串流提前結束（只在閘道內部使用）"""
+
+
+class TokenBucket:
+    """每分鐘補滿 capacity 的令牌桶（呼叫端需自行加鎖）"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """取得 amount 個令牌前需等待的秒數（0 代表可立即取得）"""
+        self._refill()
+        # 單次需求超過容量時，只要桶滿即放行，避免永遠等不到
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """歸還預估多扣的令牌（實際用量較少時）"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class CircuitBreaker:
+    """連續失敗達門檻即開啟，之後於背景定期探測，成功後自動關閉"""
+
+    def __init__(
+        self,
+        probe: Callable[[], Any],
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._probe = probe
+        self._failures = 0
+        self._open = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._open or self._failures < self.failure_threshold:
+                return
+            self._open = True
+        metrics.increment("llm.circuit_opened")
+        metrics.set_gauge("llm.circuit_open", 1)
+        logger.warning(
+            f"OpenAI 連續失敗 {self.failure_threshold} 次，暫停呼叫並改用本地方法"
+        )
+        threading.Thread(
+            target=self._probe_until_recovered, name="llm-circuit-probe", daemon=True
+        ).start()
+
+    def _probe_until_recovered(self) -> None:
+        """背景探測上游，恢復後關閉斷路器（一般請求不會被拿來試探）"""
+        while True:
+            time.sleep(self.recovery_timeout)
+            try:
+                self._probe()
+            except Exception as e:
+                logger.info(f"OpenAI 仍無法使用，稍後再試: {e}")
+                continue
+            with self._lock:
+                self._open = False
+                self._failures = 0
+            metrics.set_gauge("llm.circuit_open", 0)
+            logger.info("OpenAI 已恢復，重新啟用 AI 分析")
+            return
+
+
+class StreamedCompletion:
+    """串流回應收集完成後的結果：JSON 在接收過程中逐段解析"""
+
+    __slots__ = ("parser", "usage")
+
+    def __init__(self, parser: IncrementalJSONParser, usage: Any):
+        self.parser = parser
+        self.usage = usage
+
+    @classmethod
+    def collect(
+        cls, stream, listener=None, cancelled=None, deadline=None
+    ) -> "StreamedCompletion":
+        """
+        讀完串流並逐段解析；cancelled（threading.Event）被設定時關閉串流，
+        拋出 _Superseded。
+
+        串流請求的 timeout 只限制每次讀取，持續緩慢輸出的串流不會逾時；
+        超過 deadline（time.monotonic() 時間）時關閉串流並拋出 TimeoutError
+        """
+        parser = IncrementalJSONParser()
+        usage = None
+        for chunk in stream:
+            if cancelled is not None and cancelled.is_set():
+                _close_stream(stream)
+                raise _Superseded()
+            if deadline is not None and time.monotonic() > deadline:
+                _close_stream(stream)
+                metrics.increment("llm.stream_timed_out")
+                raise TimeoutError("模型串流回應超過逾時上限")
+            # 啟用 include_usage 時，最後一個 chunk 只帶用量、沒有 choices
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            for choice in chunk.choices or ():
+                text = choice.delta.content or ""
+                parser.feed(text)
+                _notify_listener(listener, text)
+        return cls(parser, usage)
+
+    @classmethod
+    async def acollect(cls, stream, listener=None) -> "StreamedCompletion":
+        """
+        collect() 的非同步版本。逾時與備援取代由呼叫端取消工作達成，
+        工作被取消或接收失敗時關閉串流
+        """
+        parser = IncrementalJSONParser()
+        usage = None
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                for choice in chunk.choices or ():
+                    text = choice.delta.content or ""
+                    parser.feed(text)
+                    _notify_listener(listener, text)
+        except BaseException:
+            await _aclose_stream(stream)
+            raise
+        return cls(parser, usage)
+
+
+def _close_stream(stream) -> None:
+    close = getattr(stream, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"關閉串流時發生錯誤: {e}")
+
+
+async def _aclose_stream(stream) -> None:
+    close = getattr(stream, "close", None)
+    if close is not None:
+        try:
+            await close()
+        except Exception as e:
+            logger.debug(f"關閉串流時發生錯誤: {e}")
+
+
+def _wake(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMGateway:
+    """程序內共用的 OpenAI 呼叫閘道"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        max_retries: int = 3,
+        timeout: Optional[float] = None,
+    ):
+        self.requests = TokenBucket(
+            requests_per_minute or int(os.getenv("OPENAI_RPM", "500"))
+        )
+        self.tokens = TokenBucket(
+            tokens_per_minute or int(os.getenv("OPENAI_TPM", "200000"))
+        )
+        self.max_queue = max_queue or int(os.getenv("OPENAI_MAX_QUEUE", "32"))
+        self.max_wait = max_wait or float(os.getenv("OPENAI_MAX_WAIT", "20"))
+        self.max_retries = max_retries
+        self.timeout = timeout or float(os.getenv("OPENAI_TIMEOUT", "20"))
+
+        self.breaker = CircuitBreaker(
+            self._probe,
+            failure_threshold=int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv("OPENAI_BREAKER_RECOVERY", "30")),
+        )
+        # 最近成功呼叫的耗時（秒），用來估計備援請求的送出時機
+        self._latencies = deque(maxlen=200)
+        # 只執行備援請求；主要請求一律在呼叫端的執行緒中進行
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("OPENAI_HEDGE_WORKERS", "8")),
+            thread_name_prefix="llm-hedge",
+        )
+
+        self._cond = threading.Condition()
+        # 等待中的請求：(優先順序, 序號)，序號保證同優先順序先到先處理
+        self._waiting: List[tuple] = []
+        self._sequence = itertools.count()
+        # 排隊中的非同步請求：(事件迴圈, future)，與條件變數同時喚醒
+        self._async_waiters: List[tuple] = []
+        self._client = None
+        self._async_client = None
+        self._async_loop = None
+
+    @property
+    def client(self):
+        """共用的 OpenAI 客戶端（第一次使用時建立）"""
+        if self._client is None:
+            if OpenAI is None:
+                raise ImportError("找不到 openai 套件，請先安裝: pip install openai")
+            api_key = os.getenv("OPENAI_API_KEY", "").strip()
+            if not api_key:
+                raise ValueError("尚未設定 OPENAI_API_KEY，請在 .env 中配置後再試。")
+            # 重試由閘道統一處理（429 退避、逾時上限），關閉 SDK 內建的重試
+            self._client = OpenAI(api_key=api_key, max_retries=0)
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        共用的 AsyncOpenAI 客戶端：在第一次使用的事件迴圈上建立，連線池綁定該迴圈。
+
+        非同步呼叫只來自 ASGI 應用長期執行的事件迴圈（每個行程一個），
+        整個行程因此只有一個非同步連線池；在其他迴圈呼叫時拋出 RuntimeError
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None:
+            if AsyncOpenAI is None:
+                raise ImportError("找不到 openai 套件，請先安裝: pip install openai")
+            self.client  # 沿用同步客戶端的設定檢查（金鑰）
+            self._async_client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY", "").strip(), max_retries=0
+            )
+            self._async_loop = loop
+        elif loop is not self._async_loop:
+            raise RuntimeError("AsyncOpenAI 客戶端已綁定另一個事件迴圈")
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """關閉非同步客戶端的連線池（ASGI 應用結束時呼叫）"""
+        client, self._async_client, self._async_loop = self._async_client, None, None
+        if client is not None:
+            await client.close()
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 1000,
+        temperature: float = 0.3,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+        hedge: bool = False,
+        purpose: str = "chat",
+        **kwargs: Any,
+    ):
+        """
+        經由速率限制呼叫 chat completions，回傳 OpenAI 的 completion 物件。
+
+        斷路器開啟時拋出 LLMUnavailableError；佇列已滿或排隊超過 max_wait 秒時
+        拋出 LLMOverloadedError；每次呼叫最多等待 timeout 秒。hedge 為真時，
+        若呼叫慢於近期 p95 耗時，會再送出一個備援請求並採用先完成的結果。
+        purpose 用來分類各用途的 token 用量指標（例如 grading、summary）。
+        遇到 429 時退避後重試，重試用盡則拋出原本的錯誤。
+        """
+        # 設定錯誤（未安裝套件、缺少金鑰）直接拋出，不計入斷路器
+        self.client
+        self._check_breaker()
+
+        request = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            **kwargs,
+        }
+        timeout = timeout or self.timeout
+        estimated = self._estimate_tokens(messages, max_tokens)
+        deadline = time.monotonic() + self.max_wait
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority, estimated, deadline)
+            start = time.perf_counter()
+            try:
+                if hedge:
+                    completion = self._create_hedged(
+                        request, timeout, priority, estimated
+                    )
+                else:
+                    completion = self._create(request, timeout, _stream_listener.get())
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                deadline = max(deadline, time.monotonic() + self.max_wait)
+                continue
+
+            self._record_success(start, completion, estimated, purpose)
+            return completion
+
+    def chat_json(
+        self,
+        messages: List[Dict[str, str]],
+        schema_name: str,
+        schema: Dict[str, Any],
+        validator: Validator,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        要求模型依 JSON Schema 輸出，以串流接收並邊收邊解析，回傳驗證過的物件。
+
+        輸出不完整、不是合法 JSON 或不符合 Schema 時拋出 StructuredOutputError；
+        其餘參數與例外同 chat()。
+        """
+        completion = self.chat(
+            messages,
+            response_format=response_format(schema_name, schema),
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs,
+        )
+        return self._validated(completion, validator)
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 1000,
+        temperature: float = 0.3,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+        hedge: bool = False,
+        purpose: str = "chat",
+        **kwargs: Any,
+    ):
+        """
+        chat() 的非同步版本：排隊、等待上游回應與退避重試都以 await 進行，
+        等待期間不佔用執行緒。參數、例外與指標同 chat()，只能在 ASGI 應用的
+        事件迴圈中呼叫（見 async_client）
+        """
+        self.async_client
+        self._check_breaker()
+
+        request = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            **kwargs,
+        }
+        timeout = timeout or self.timeout
+        estimated = self._estimate_tokens(messages, max_tokens)
+        deadline = time.monotonic() + self.max_wait
+
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire(priority, estimated, deadline)
+            start = time.perf_counter()
+            try:
+                if hedge:
+                    completion = await self._acreate_hedged(
+                        request, timeout, priority, estimated
+                    )
+                else:
+                    completion = await self._acreate(
+                        request, timeout, _stream_listener.get()
+                    )
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                deadline = max(deadline, time.monotonic() + self.max_wait)
+                continue
+
+            self._record_success(start, completion, estimated, purpose)
+            return completion
+
+    async def achat_json(
+        self,
+        messages: List[Dict[str, str]],
+        schema_name: str,
+        schema: Dict[str, Any],
+        validator: Validator,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """chat_json() 的非同步版本"""
+        completion = await self.achat(
+            messages,
+            response_format=response_format(schema_name, schema),
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs,
+        )
+        return self._validated(completion, validator)
+
+    def _check_breaker(self) -> None:
+        if self.breaker.is_open:
+            metrics.increment("llm.short_circuited")
+            raise LLMUnavailableError("OpenAI 暫時無法使用，改用本地方法")
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """遇到 429 且仍可重試時回傳退避秒數；其他錯誤計入斷路器並回傳 None"""
+        if _is_rate_limited(error) and attempt < self.max_retries:
+            metrics.increment("llm.rate_limited")
+            # 全抖動指數退避：0 ~ 2^attempt 秒
+            delay = random.uniform(0, min(30.0, 2.0**attempt))
+            logger.warning(f"OpenAI 速率限制，{delay:.1f} 秒後重試: {error}")
+            return delay
+        metrics.increment("llm.errors")
+        self.breaker.record_failure()
+        return None
+
+    def _record_success(
+        self, start: float, completion: Any, estimated: int, purpose: str
+    ) -> None:
+        elapsed = time.perf_counter() - start
+        self._latencies.append(elapsed)
+        self.breaker.record_success()
+        metrics.increment("llm.requests")
+        metrics.observe("llm.call_ms", elapsed * 1000)
+        self._settle(estimated, completion, purpose)
+
+    @staticmethod
+    def _validated(
+        completion: StreamedCompletion, validator: Validator
+    ) -> Dict[str, Any]:
+        """取出串流解析的 JSON 並驗證；不符合時拋出 StructuredOutputError"""
+        parser = completion.parser
+        try:
+            data = parser.result()
+            errors = validator(data)
+            if errors:
+                raise StructuredOutputError("；".join(errors[:5]))
+        except StructuredOutputError:
+            metrics.increment("llm.structured_output_errors")
+            raise
+        finally:
+            metrics.observe("llm.json_parse_ms", parser.parse_seconds * 1000)
+        return data
+
+    def hedge_delay(self) -> Optional[float]:
+        """近期成功呼叫耗時的 p95（秒）；樣本不足時回傳 None（不送備援請求）"""
+        samples = sorted(self._latencies)
+        if len(samples) < 20:
+            return None
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def _create(
+        self,
+        request: Dict[str, Any],
+        timeout: float,
+        listener: Optional[Callable[[str], None]] = None,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        deadline = time.monotonic() + timeout
+        response = self.client.chat.completions.create(**request, timeout=timeout)
+        if request.get("stream"):
+            return StreamedCompletion.collect(response, listener, cancelled, deadline)
+        return response
+
+    def _create_hedged(
+        self, request: Dict[str, Any], timeout: float, priority: int, estimated: int
+    ):
+        """
+        主要請求在呼叫端的執行緒中進行；慢於 p95 時才把備援請求交給執行緒池，
+        回傳先成功的結果。備援請求先成功時，主要請求的串流在下一個片段即結束
+        """
+        listener = _stream_listener.get()
+        delay = self.hedge_delay()
+        if delay is None or delay >= timeout:
+            return self._create(request, timeout, listener)
+
+        started = time.monotonic()
+        lock = threading.Lock()
+        settled = threading.Event()  # 主要請求已結束（成功或失敗），不再送出備援請求
+        primary_won = threading.Event()
+        hedge_won = threading.Event()
+        hedge = []
+
+        def launch_hedge():
+            # 備援請求同樣受速率限制；無法立即取得額度時只等主要請求
+            with lock:
+                if settled.is_set():
+                    return
+                try:
+                    self._acquire(priority, estimated, time.monotonic())
+                except LLMOverloadedError:
+                    return
+                metrics.increment("llm.hedged")
+                remaining = max(0.1, timeout - (time.monotonic() - started))
+                future = self._hedge_executor.submit(
+                    self._create, request, remaining, None, primary_won
+                )
+                future.add_done_callback(
+                    lambda f: f.exception() is None and hedge_won.set()
+                )
+                hedge.append(future)
+
+        timer = threading.Timer(delay, launch_hedge)
+        timer.daemon = True
+        timer.start()
+        try:
+            completion = self._create(request, timeout, listener, hedge_won)
+            primary_won.set()
+            return completion
+        except Exception:
+            # 主要請求失敗或已被備援請求取代：有備援請求時改用它的結果
+            with lock:
+                settled.set()
+            if not hedge:
+                raise
+            return hedge[0].result()
+        finally:
+            with lock:
+                settled.set()
+            timer.cancel()
+
+    async def _acreate(
+        self,
+        request: Dict[str, Any],
+        timeout: float,
+        listener: Optional[Callable[[str], None]] = None,
+    ):
+        """單次非同步呼叫；整個呼叫（含串流接收）超過 timeout 秒即取消"""
+
+        async def create():
+            response = await self.async_client.chat.completions.create(
+                **request, timeout=timeout
+            )
+            if request.get("stream"):
+                return await StreamedCompletion.acollect(response, listener)
+            return response
+
+        try:
+            return await asyncio.wait_for(create(), timeout)
+        except asyncio.TimeoutError:
+            if request.get("stream"):
+                metrics.increment("llm.stream_timed_out")
+            raise TimeoutError("模型回應超過逾時上限") from None
+
+    async def _acreate_hedged(
+        self, request: Dict[str, Any], timeout: float, priority: int, estimated: int
+    ):
+        """
+        _create_hedged() 的非同步版本：主要請求與備援請求都是事件迴圈上的工作，
+        採用先成功的結果並取消另一個（取消時關閉其串流）
+        """
+        listener = _stream_listener.get()
+        delay = self.hedge_delay()
+        if delay is None or delay >= timeout:
+            return await self._acreate(request, timeout, listener)
+
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(self._acreate(request, timeout, listener))}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                # 備援請求同樣受速率限制；無法立即取得額度時只等主要請求
+                try:
+                    await self._aacquire(priority, estimated, time.monotonic())
+                except LLMOverloadedError:
+                    pass
+                else:
+                    metrics.increment("llm.hedged")
+                    remaining = max(0.1, timeout - (time.monotonic() - started))
+                    pending.add(
+                        asyncio.ensure_future(self._acreate(request, remaining))
+                    )
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _probe(self) -> None:
+        """斷路器用的輕量探測（列出模型，不消耗 token）"""
+        self.client.models.list(timeout=5)
+
+    def _acquire(self, priority: int, estimated: int, deadline: float) -> None:
+        """排隊直到輪到此請求且令牌足夠；佇列已滿或逾時則拋出 LLMOverloadedError"""
+        start = time.perf_counter()
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                metrics.increment("llm.rejected")
+                raise LLMOverloadedError("LLM 請求佇列已滿")
+
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            metrics.set_gauge("llm.queue_depth", len(self._waiting))
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == ticket:
+                        wait = max(
+                            self.requests.wait_time(1),
+                            self.tokens.wait_time(estimated),
+                        )
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(estimated)
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        metrics.increment("llm.timed_out")
+                        raise LLMOverloadedError("LLM 請求排隊逾時")
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                metrics.set_gauge("llm.queue_depth", len(self._waiting))
+                self._notify_locked()
+
+        metrics.observe("llm.queue_wait_ms", (time.perf_counter() - start) * 1000)
+
+    async def _aacquire(self, priority: int, estimated: int, deadline: float) -> None:
+        """
+        _acquire() 的非同步版本：與同步請求共用同一個佇列與令牌桶，
+        只在檢查時短暫持有鎖，等待改為 await 一個由 _notify_locked() 喚醒的 future
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                metrics.increment("llm.rejected")
+                raise LLMOverloadedError("LLM 請求佇列已滿")
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            metrics.set_gauge("llm.queue_depth", len(self._waiting))
+
+        try:
+            while True:
+                with self._cond:
+                    wait = None
+                    if self._waiting[0] == ticket:
+                        wait = max(
+                            self.requests.wait_time(1),
+                            self.tokens.wait_time(estimated),
+                        )
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(estimated)
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        metrics.increment("llm.timed_out")
+                        raise LLMOverloadedError("LLM 請求排隊逾時")
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+                await asyncio.wait(
+                    (woken,),
+                    timeout=remaining if wait is None else min(wait, remaining),
+                )
+        finally:
+            with self._cond:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                metrics.set_gauge("llm.queue_depth", len(self._waiting))
+                self._notify_locked()
+
+        metrics.observe("llm.queue_wait_ms", (time.perf_counter() - start) * 1000)
+
+    def _notify_locked(self) -> None:
+        """喚醒所有排隊中的請求：同步請求以條件變數，非同步請求以 future（需持有 _cond）"""
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # 事件迴圈已關閉，等待者不會再被排程
+                pass
+
+    def _settle(self, estimated: int, completion: Any, purpose: str) -> None:
+        """記錄實際的 prompt / completion token 用量，並歸還預估多扣的 token"""
+        usage = getattr(completion, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if not total:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        metrics.increment("llm.tokens", total)
+        metrics.increment(f"llm.prompt_tokens.{purpose}", prompt_tokens)
+        metrics.increment(f"llm.completion_tokens.{purpose}", completion_tokens)
+        logger.info(
+            f"OpenAI {purpose}: prompt {prompt_tokens} / completion {completion_tokens} tokens"
+        )
+        if total < estimated:
+            with self._cond:
+                self.tokens.refund(estimated - total)
+                self._notify_locked()
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """預估本次請求的 token 用量（輸入 token 數 + 輸出上限）"""
+        return sum(count_tokens(m.get("content")) for m in messages) + max_tokens
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    if RateLimitError is not None and isinstance(error, RateLimitError):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+# 全域 LLM 閘道實例（所有 OpenAI 呼叫共用）
+llm_gateway = LLMGateway()
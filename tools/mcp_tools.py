@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+MCP 工具定義
+MCP 伺服器對外提供的工具函式，出題與評分由 interview_services 提供，這裡只將結果
+轉為 MCP 回應。工具登錄於 tool_registry（名稱為 mcp.<工具>），server.py 將同一批
+函式註冊到 FastMCP，Flask 的 Fast Agent API 也可經由登錄表呼叫並共用快取。
+
+本模組只定義與登錄函式，不連線資料庫、不設定日誌，可安全地從任何程序導入
+"""
+
+from .interview_services import grading_service, question_service
+from .question_index import question_index
+from .session_store import session_store
+from .tool_registry import Timing, TTLCache, tool_registry
+
+
+def _has_question(arguments):
+    """未指定題目時會隨機出題，不快取"""
+    return bool(arguments.get("question"))
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def get_random_question() -> dict:
+    """從 MongoDB 獲取隨機面試問題，用於面試準備或練習"""
+    try:
+        return {"status": "success", **question_service.random_question().to_dict()}
+    except Exception as e:
+        return {"status": "error", "message": f"獲取問題失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def get_question_by_category(category: str) -> dict:
+    """根據類別獲取面試問題"""
+    try:
+        result = question_service.question_by_category(category)
+        return {"status": "success", **result.to_dict()}
+    except Exception as e:
+        return {"status": "error", "message": f"獲取問題失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def get_question_by_difficulty(difficulty: str) -> dict:
+    """根據難度獲取面試問題"""
+    try:
+        result = question_service.question_by_difficulty(difficulty)
+        return {"status": "success", **result.to_dict()}
+    except Exception as e:
+        return {"status": "error", "message": f"獲取問題失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def conduct_interview() -> dict:
+    """進行完整的互動式面試流程"""
+    try:
+        # 1. 獲取隨機問題
+        result = question_service.random_question()
+
+        # 2. 顯示問題（在 MCP 工具中，我們返回問題供客戶端顯示）
+        interview_info = {
+            "status": "question_ready",
+            "question": result.question,
+            "source": result.source,
+            "category": result.category,
+            "difficulty": result.difficulty,
+            "message": "面試問題已準備好，請回答以下問題：",
+            "instruction": f"問題：{result.question}\n來源：{result.source}\n\n請輸入您的回答：",
+        }
+
+        return interview_info
+
+    except Exception as e:
+        return {"status": "error", "message": f"面試初始化失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def analyze_user_answer(
+    user_answer: str, question: str, standard_answer: str = ""
+) -> dict:
+    """分析用戶回答與標準答案的差異（未提供標準答案時依題目查詢題庫）"""
+    try:
+        result = grading_service.grade(user_answer, question, standard_answer)
+        return {"status": "success", **result.to_dict()}
+
+    except Exception as e:
+        return {"status": "error", "message": f"分析失敗: {str(e)}"}
+
+
+@tool_registry.register(
+    namespace="mcp", middleware=[Timing(), TTLCache(ttl=600, when=_has_question)]
+)
+def get_standard_answer(question: str, category: str = "") -> dict:
+    """獲取標準答案和解釋"""
+    try:
+        # 如果沒有提供問題，獲取隨機問題；否則依正規化後的題目文字查詢題庫中的原題
+        if not question:
+            result = question_service.random_question()
+        else:
+            result = question_service.lookup(question)
+            if result is None or not result.standard_answer:
+                return {
+                    "status": "not_found",
+                    "question": question,
+                    "message": "題庫中查無此題的標準答案",
+                }
+
+        return {
+            "status": "success",
+            "question": result.question,
+            "standard_answer": result.standard_answer or "標準答案未提供",
+            "source": result.source or "未知來源",
+            "explanation": "詳細解釋將在這裡提供",
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"獲取標準答案失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def provide_answer_with_context(question: str, user_answer: str = "") -> dict:
+    """提供帶上下文的答案"""
+    try:
+        # 依題目查詢題庫中的標準答案
+        standard_answer = question_service.standard_answer_for(question)
+
+        # 如果有用戶答案，進行分析
+        if user_answer:
+            result = grading_service.grade(user_answer, question, standard_answer)
+            context = f"您的答案評分：{result.score}/100"
+        else:
+            context = "請提供您的答案以獲得分析"
+
+        return {
+            "status": "success",
+            "question": question,
+            "context": context,
+            "answer": standard_answer,
+            "user_answer": user_answer,
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"提供答案失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing(), TTLCache(ttl=60)])
+def search_questions(query: str, k: int = 5) -> dict:
+    """以關鍵字全文搜尋題庫中的問題與答案（依相關度排序）"""
+    try:
+        results = question_index.search(query, k)
+        return {
+            "status": "success",
+            "query": query,
+            "count": len(results),
+            "results": results,
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"搜尋題目失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def get_question_history(
+    user_id: str = "default_user", cursor: str = "", limit: int = 20
+) -> dict:
+    """獲取問題歷史（由新到舊分頁，傳入上一頁的 next_cursor 取得下一頁）"""
+    try:
+        items, next_cursor = session_store.page(user_id, "question", cursor, limit)
+        return {
+            "status": "success",
+            "history": items,
+            "next_cursor": next_cursor,
+        }
+    except ValueError:
+        return {"status": "error", "message": f"無效的分頁游標: {cursor}"}
+    except Exception as e:
+        return {"status": "error", "message": f"獲取歷史失敗: {str(e)}"}
+
+
+@tool_registry.register(namespace="mcp", middleware=[Timing()])
+def get_analysis_history(
+    user_id: str = "default_user", cursor: str = "", limit: int = 20, last_n: int = 10
+) -> dict:
+    """獲取分析歷史（分頁），並附上最近 N 次分數與各類別平均分數"""
+    try:
+        items, next_cursor = session_store.page(user_id, "answer", cursor, limit)
+        return {
+            "status": "success",
+            "history": items,
+            "next_cursor": next_cursor,
+            "recent_scores": session_store.recent_scores(user_id, last_n),
+            "category_averages": session_store.category_averages(user_id),
+        }
+    except ValueError:
+        return {"status": "error", "message": f"無效的分頁游標: {cursor}"}
+    except Exception as e:
+        return {"status": "error", "message": f"獲取分析歷史失敗: {str(e)}"}
+
+
+# 依序註冊到 FastMCP 的工具
+MCP_TOOLS = (
+    get_random_question,
+    get_question_by_category,
+    get_question_by_difficulty,
+    conduct_interview,
+    analyze_user_answer,
+    get_standard_answer,
+    provide_answer_with_context,
+    search_questions,
+    get_question_history,
+    get_analysis_history,
+)
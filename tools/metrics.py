@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+執行指標模組
+以行程內的計數器、耗時統計與量測值記錄系統運作狀況，供健康檢查與除錯查詢
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+class Metrics:
+    """執行緒安全的指標登錄器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """累加計數器"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, elapsed_ms: float) -> None:
+        """記錄一次耗時（毫秒）"""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                self._timings[name] = {
+                    "count": 1,
+                    "total_ms": elapsed_ms,
+                    "max_ms": elapsed_ms,
+                }
+            else:
+                timing["count"] += 1
+                timing["total_ms"] += elapsed_ms
+                timing["max_ms"] = max(timing["max_ms"], elapsed_ms)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """設定量測值（例如佇列深度）"""
+        with self._lock:
+            self._gauges[name] = value
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """以 with 區塊計時並記錄"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """回傳目前所有指標的副本"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    name: {
+                        "count": timing["count"],
+                        "avg_ms": round(timing["total_ms"] / timing["count"], 3),
+                        "max_ms": round(timing["max_ms"], 3),
+                    }
+                    for name, timing in self._timings.items()
+                },
+                "gauges": dict(self._gauges),
+            }
+
+    def reset(self) -> None:
+        """清空所有指標"""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self._gauges.clear()
+
+
+# 全域指標實例
+metrics = Metrics()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+題庫全文檢索模組
+以本地倒排索引（中文二字詞斷詞 + BM25 排序）搜尋問題與答案
+"""
+
+import csv
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .question_manager import QuestionManager
+from .text_tokenizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 索引格式版本：調整斷詞或權重計算時需遞增，讓舊的快取檔自動失效
+INDEX_VERSION = 1
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent / "interview_csv"
+DEFAULT_INDEX_PATH = (
+    Path(__file__).resolve().parent.parent / ".cache" / "question_index.json"
+)
+
+
+class QuestionIndex:
+    """題庫倒排索引"""
+
+    # BM25 參數
+    K1 = 1.2
+    B = 0.75
+    # 問題文字比答案更能代表題目主題，計算詞頻時加重
+    QUESTION_WEIGHT = 2
+
+    def __init__(self, docs: List[Dict[str, Any]], postings: Dict[str, list]):
+        self.docs = docs
+        # term -> [[doc_id, bm25 權重], ...]，權重於建立索引時預先算好
+        self.postings = postings
+        # 正規化題目文字 -> doc_id，供標準答案 O(1) 查詢；重複題目保留第一筆有答案的
+        self.answer_lookup: Dict[str, int] = {}
+        for doc_id, doc in enumerate(docs):
+            key = normalize_question(doc["question"])
+            existing = self.answer_lookup.get(key)
+            if existing is None or (
+                not docs[existing]["standard_answer"] and doc["standard_answer"]
+            ):
+                self.answer_lookup[key] = doc_id
+
+    # 建立與持久化 ---------------------------------------------------------
+    @classmethod
+    def build(cls, docs: List[Dict[str, Any]]) -> "QuestionIndex":
+        """從題目清單建立索引"""
+        term_freqs = []
+        for doc in docs:
+            tf = Counter(tokenize(doc["standard_answer"]))
+            for token in tokenize(doc["question"]):
+                tf[token] += cls.QUESTION_WEIGHT
+            term_freqs.append(tf)
+
+        doc_lengths = [sum(tf.values()) for tf in term_freqs]
+        avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+        doc_freq: Counter = Counter()
+        for tf in term_freqs:
+            doc_freq.update(tf.keys())
+
+        total = len(docs)
+        postings: Dict[str, list] = defaultdict(list)
+        for doc_id, tf in enumerate(term_freqs):
+            norm = cls.K1 * (
+                1 - cls.B + cls.B * doc_lengths[doc_id] / (avg_length or 1)
+            )
+            for term, freq in tf.items():
+                idf = math.log(
+                    1 + (total - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5)
+                )
+                weight = idf * freq * (cls.K1 + 1) / (freq + norm)
+                postings[term].append([doc_id, round(weight, 4)])
+
+        return cls(docs, dict(postings))
+
+    @classmethod
+    def load_or_build(
+        cls,
+        data_dir: Path = DEFAULT_DATA_DIR,
+        index_path: Optional[Path] = None,
+    ) -> "QuestionIndex":
+        """載入磁碟上的索引；題庫檔案有變動或快取不存在時重新建立並寫回"""
+        index_path = Path(
+            index_path or os.getenv("QUESTION_INDEX_PATH", DEFAULT_INDEX_PATH)
+        )
+        signature = cls._data_signature(data_dir)
+
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if (
+                cached.get("version") == INDEX_VERSION
+                and cached.get("signature") == signature
+            ):
+                logger.info(f"已載入題庫索引: {index_path}")
+                return cls(cached["docs"], cached["postings"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"題庫索引快取無法讀取，將重新建立: {e}")
+
+        index = cls.build(cls._load_docs(data_dir))
+        try:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": INDEX_VERSION,
+                        "signature": signature,
+                        "docs": index.docs,
+                        "postings": index.postings,
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            logger.info(f"題庫索引已建立並儲存: {index_path} ({len(index.docs)} 題)")
+        except OSError as e:
+            logger.warning(f"題庫索引無法寫入磁碟: {e}")
+        return index
+
+    @staticmethod
+    def _data_signature(data_dir: Path) -> List[list]:
+        """以檔名、大小與修改時間判斷題庫是否變動"""
+        if not data_dir.is_dir():
+            return []
+        return [
+            [path.name, path.stat().st_size, path.stat().st_mtime_ns]
+            for path in sorted(data_dir.glob("*.csv"))
+        ]
+
+    @staticmethod
+    def _load_docs(data_dir: Path) -> List[Dict[str, Any]]:
+        """讀取題庫 CSV（與匯入 MongoDB 的資料相同）"""
+        docs: List[Dict[str, Any]] = []
+        if not data_dir.is_dir():
+            logger.warning(f"找不到題庫目錄: {data_dir}")
+            return docs
+
+        for path in sorted(data_dir.glob("*.csv")):
+            source = "".join(c for c in path.stem if c.isalnum() or c == "_")
+            try:
+                with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                    for row in csv.DictReader(f, skipinitialspace=True):
+                        question = _first_field(row, QuestionManager.QUESTION_FIELDS)
+                        if not question:
+                            continue
+                        docs.append(
+                            {
+                                "question": question,
+                                "standard_answer": _first_field(
+                                    row, QuestionManager.ANSWER_FIELDS
+                                ),
+                                "source": source,
+                            }
+                        )
+            except Exception as e:
+                logger.error(f"讀取題庫檔案失敗 {path}: {e}")
+        return docs
+
+    # 查詢 -----------------------------------------------------------------
+    def search(
+        self, query: str, k: int = 5, source: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """以 BM25 排序搜尋題目，回傳前 k 筆"""
+        return self.search_vector(dict.fromkeys(tokenize(query), 1.0), k, source)
+
+    def search_vector(
+        self, query_vector: Dict[str, float], k: int = 5, source: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """以加權詞向量查詢（每個詞的 BM25 分數乘上查詢權重），回傳前 k 筆"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term, query_weight in query_vector.items():
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] += weight * query_weight
+        return self._top_k(scores, k, source)
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """依題目文字查詢題庫中的原題（含標準答案），查無時回傳 None"""
+        doc_id = self.answer_lookup.get(normalize_question(question))
+        return None if doc_id is None else self.docs[doc_id]
+
+    def _top_k(
+        self, scores: Dict[int, float], k: int, source: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        if source:
+            scores = {
+                d: s for d, s in scores.items() if self.docs[d]["source"] == source
+            }
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {**self.docs[doc_id], "score": round(score, 3)} for doc_id, score in best
+        ]
+
+
+_NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def normalize_question(text: str) -> str:
+    """正規化題目文字：統一全半形與大小寫，移除空白與標點"""
+    return _NON_WORD_PATTERN.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+def _first_field(row: Dict[str, Any], fields: List[str]) -> str:
+    """取出第一個有值的欄位"""
+    for field in fields:
+        if row.get(field):
+            return str(row[field]).strip()
+    return ""
+
+
+# 全域題庫索引實例（導入時載入或建立）
+question_index = QuestionIndex.load_or_build()
@@ -16,6 +16,10 @@ logger = logging.getLogger(__name__)
 class QuestionManager:
     """問題管理器"""
 
+    # 各資料集使用的問題與答案欄位名稱
+    QUESTION_FIELDS = ["問題", "Question", "題目", "instruction", "question"]
+    ANSWER_FIELDS = ["答案", "Answer", "answer", "output", "standard_answer"]
+
     def __init__(self):
         self.default_question = {
             "question": "請介紹一下您自己",
@@ -80,9 +84,7 @@ class QuestionManager:
     def _extract_question(self, doc: Dict[str, Any]) -> str:
         """從文檔中提取問題"""
         # 嘗試不同的欄位名稱
-        question_fields = ["問題", "Question", "題目", "instruction", "question"]
-
-        for field in question_fields:
+        for field in self.QUESTION_FIELDS:
             if field in doc and doc[field]:
                 return str(doc[field])
 
@@ -98,9 +100,7 @@ class QuestionManager:
 
     def _extract_answer(self, doc: Dict[str, Any]) -> str:
         """從文檔中提取答案"""
-        answer_fields = ["答案", "Answer", "answer", "output", "standard_answer"]
-
-        for field in answer_fields:
+        for field in self.ANSWER_FIELDS:
             if field in doc and doc[field]:
                 return str(doc[field])
 
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+問題預取模組
+在用戶作答或評分期間，於背景預先取得每個會話的下一題
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionPrefetcher:
+    """每個會話一個待取題目的背景預取器"""
+
+    def __init__(self, fetch_fn: Callable[[str], Dict[str, Any]], max_workers: int = 4):
+        # fetch_fn 接收 session_id，回傳包含 question / standard_answer /
+        # category / difficulty 的題目資料；在背景執行緒中呼叫
+        self._fetch_fn = fetch_fn
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="question-prefetch"
+        )
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # 預取完成時的通知（session_id, 題目資料），例如推送「下一題已就緒」
+        self.on_ready: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    def prefetch(self, session_id: str) -> None:
+        """若該會話尚無待取題目，於背景開始取下一題"""
+        with self._lock:
+            future = self._pending.get(session_id)
+            if future is not None and not (future.done() and future.exception()):
+                return
+            future = self._executor.submit(self._load, session_id)
+            self._pending[session_id] = future
+        future.add_done_callback(lambda f: self._notify_ready(session_id, f))
+        logger.info(f"已為會話 {session_id} 排程預取下一題")
+
+    def take(
+        self,
+        session_id: str,
+        timeout: Optional[float] = None,
+        prefetch_next: bool = True,
+    ) -> Dict[str, Any]:
+        """取出會話的下一題；沒有預取結果時同步取得"""
+        with self._lock:
+            future = self._pending.pop(session_id, None)
+
+        question_data = None
+        if future is not None:
+            try:
+                question_data = future.result(timeout=timeout)
+                logger.info(f"會話 {session_id} 使用預取題目")
+            except Exception as e:
+                logger.warning(f"預取題目失敗，改為同步取得: {e}")
+
+        if question_data is None:
+            question_data = self._load(session_id)
+
+        # 題目送出後立即預取下一題，與用戶作答及評分時間重疊
+        if prefetch_next:
+            self.prefetch(session_id)
+
+        return question_data
+
+    def discard(self, session_id: str) -> None:
+        """丟棄會話的預取結果（例如重置面試時）"""
+        with self._lock:
+            future = self._pending.pop(session_id, None)
+        if future is not None:
+            future.cancel()
+
+    def _notify_ready(self, session_id: str, future: Future) -> None:
+        if self.on_ready is None or future.cancelled() or future.exception():
+            return
+        # 已被取走或丟棄的預取結果不再通知
+        with self._lock:
+            if self._pending.get(session_id) is not future:
+                return
+        try:
+            self.on_ready(session_id, future.result())
+        except Exception as e:
+            logger.warning(f"預取完成通知失敗: {e}")
+
+    def _load(self, session_id: str) -> Dict[str, Any]:
+        """取得題目（複製一份，呼叫端可自由修改）"""
+        return dict(self._fetch_fn(session_id))
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+面試會話事件儲存模組
+以 SQLite 持久化每位用戶的出題、作答與對話紀錄，提供分頁查詢與統計；
+重置面試時寫入會話起點，本次面試的對話與彙總只計算起點之後的事件
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = (
+    Path(__file__).resolve().parent.parent / ".cache" / "session_events.db"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    question TEXT,
+    category TEXT,
+    score INTEGER,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_session_events_user_time
+    ON session_events (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_session_events_user_type_time
+    ON session_events (user_id, event_type, created_at, id);
+-- 本次會話的查詢以會話起點的 id 界定範圍
+CREATE INDEX IF NOT EXISTS idx_session_events_user_type_id
+    ON session_events (user_id, event_type, id);
+"""
+
+
+class SessionEventStore:
+    """
+    會話事件儲存（SQLite，多執行緒各自持有連線）。
+
+    連線在第一次使用時才建立，並記錄建立時的行程 id：gunicorn preload 時
+    master 載入模組不會開啟連線，fork 後的 worker 也不會沿用 master 的連線
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or os.getenv("SESSION_EVENT_DB", DEFAULT_DB_PATH))
+        self._local = threading.local()
+        self._schema_pid = None
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            self._ensure_schema(pid)
+            conn = self._open()
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        # WAL 讓 MCP 伺服器與 Flask 程序可同時讀寫
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self, pid: int) -> None:
+        """每個行程第一次連線時建立資料表"""
+        if self._schema_pid == pid:
+            return
+        with self._schema_lock:
+            if self._schema_pid == pid:
+                return
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._open()
+            try:
+                conn.executescript(_SCHEMA)
+            finally:
+                conn.close()
+            self._schema_pid = pid
+
+    # 寫入 -----------------------------------------------------------------
+    def record_event(
+        self,
+        user_id: str,
+        event_type: str,
+        question: str = "",
+        category: str = "",
+        score: Optional[int] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """寫入一筆事件，回傳事件 id"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO session_events "
+                "(user_id, event_type, created_at, question, category, score, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(user_id),
+                    event_type,
+                    time.time(),
+                    question,
+                    category,
+                    score,
+                    json.dumps(payload or {}, ensure_ascii=False),
+                ),
+            )
+            return cursor.lastrowid
+
+    def record_question(self, user_id: str, question_data: Dict[str, Any]) -> int:
+        """記錄出題事件"""
+        return self.record_event(
+            user_id,
+            "question",
+            question=question_data.get("question", ""),
+            category=question_data.get("category", ""),
+            payload={
+                "source": question_data.get("source", ""),
+                "difficulty": question_data.get("difficulty", ""),
+            },
+        )
+
+    def record_answer(
+        self,
+        user_id: str,
+        question: str,
+        category: str,
+        user_answer: str,
+        analysis: Dict[str, Any],
+    ) -> int:
+        """記錄作答與評分事件"""
+        return self.record_event(
+            user_id,
+            "answer",
+            question=question,
+            category=category,
+            score=int(analysis.get("score", 0) or 0),
+            payload={
+                "user_answer": user_answer,
+                "grade": analysis.get("grade", ""),
+                "similarity": analysis.get("similarity", 0),
+                "feedback": analysis.get("feedback", ""),
+            },
+        )
+
+    def record_turn(
+        self,
+        user_id: str,
+        user_message: str,
+        ai_response: str,
+        stage: str = "",
+        pushed: bool = False,
+    ) -> int:
+        """
+        記錄一輪對話（用戶訊息與系統回應），stage 為當時的面試狀態；
+        pushed 為真時是伺服器主動推送的訊息（例如自動出題），沒有對應的用戶訊息
+        """
+        payload = {"ai": ai_response}
+        if pushed:
+            payload["pushed"] = True
+        else:
+            payload["user"] = user_message
+        return self.record_event(user_id, "turn", category=stage, payload=payload)
+
+    def mark_session_start(self, user_id: str) -> int:
+        """寫入會話起點；之後的 session_* 查詢只計算此後的事件"""
+        return self.record_event(user_id, "session_start")
+
+    # 查詢 -----------------------------------------------------------------
+    def page(
+        self,
+        user_id: str,
+        event_type: str,
+        cursor: str = "",
+        limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        依時間由新到舊分頁查詢事件。
+
+        cursor 為上一頁回傳的 next_cursor（空字串代表第一頁）；以
+        (created_at, id) 做 keyset 分頁，每頁成本與歷史筆數無關。
+        """
+        limit = max(1, min(int(limit), 100))
+        params: list = [str(user_id), event_type]
+        where = "user_id = ? AND event_type = ?"
+        if cursor:
+            created_at, last_id = _decode_cursor(cursor)
+            where += " AND (created_at, id) < (?, ?)"
+            params.extend([created_at, last_id])
+
+        rows = (
+            self._connect()
+            .execute(
+                f"SELECT * FROM session_events WHERE {where} "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1),
+            )
+            .fetchall()
+        )
+
+        items = [_row_to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = f"{last['created_at']!r}:{last['id']}"
+        return items, next_cursor
+
+    def recent_scores(self, user_id: str, n: int = 10) -> List[int]:
+        """最近 n 次作答的分數（由新到舊）"""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT score FROM session_events "
+                "WHERE user_id = ? AND event_type = 'answer' "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (str(user_id), max(1, int(n))),
+            )
+            .fetchall()
+        )
+        return [row["score"] for row in rows]
+
+    def category_averages(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """各題目類別的作答次數與平均分數"""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT category, COUNT(*) AS count, AVG(score) AS average "
+                "FROM session_events WHERE user_id = ? AND event_type = 'answer' "
+                "GROUP BY category",
+                (str(user_id),),
+            )
+            .fetchall()
+        )
+        return {
+            (row["category"] or "一般問題"): {
+                "count": row["count"],
+                "average": round(row["average"] or 0, 1),
+            }
+            for row in rows
+        }
+
+    def _session_start(self, user_id: str) -> int:
+        """
+        本次會話起點事件的 id（沒有起點時為 0）。
+
+        以自動遞增的 id 而非時間戳界定會話：與重置同一時間刻寫入的事件，
+        或系統時鐘往回調整後寫入的事件，都不會被算到錯誤的會話
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT MAX(id) AS start_id FROM session_events "
+                "WHERE user_id = ? AND event_type = 'session_start'",
+                (str(user_id),),
+            )
+            .fetchone()
+        )
+        return row["start_id"] or 0
+
+    def session_turns(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """本次面試最近 limit 輪對話（由舊到新）"""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT created_at, category, payload FROM session_events "
+                "WHERE user_id = ? AND event_type = 'turn' AND id > ? "
+                "ORDER BY id DESC LIMIT ?",
+                (str(user_id), self._session_start(user_id), max(1, int(limit))),
+            )
+            .fetchall()
+        )
+        turns = []
+        for row in reversed(rows):
+            payload = json.loads(row["payload"] or "{}")
+            turn = {
+                "ai": payload.get("ai", ""),
+                "stage": row["category"] or "",
+                "timestamp": row["created_at"],
+            }
+            # 伺服器推送的訊息沒有用戶訊息，不回傳 user，前端不會顯示空白的用戶對話
+            if payload.get("pushed"):
+                turn["pushed"] = True
+            else:
+                turn["user"] = payload.get("user", "")
+            turns.append(turn)
+        return turns
+
+    def session_aggregate(self, user_id: str) -> Dict[str, Any]:
+        """
+        本次面試的彙總：出題數、作答數與分數統計。
+
+        只讀取索引欄位與分數，不解析對話內容，成本與對話長度無關
+        """
+        conn = self._connect()
+        params = (str(user_id), self._session_start(user_id))
+        counts = {
+            row["event_type"]: row["count"]
+            for row in conn.execute(
+                "SELECT event_type, COUNT(*) AS count FROM session_events "
+                "WHERE user_id = ? AND id > ? "
+                "AND event_type IN ('question', 'answer') GROUP BY event_type",
+                params,
+            )
+        }
+        scores = [
+            row["score"]
+            for row in conn.execute(
+                "SELECT score FROM session_events "
+                "WHERE user_id = ? AND id > ? AND event_type = 'answer' "
+                "AND score IS NOT NULL ORDER BY id",
+                params,
+            )
+        ]
+        return {
+            "total_questions": counts.get("question", 0),
+            "answered": counts.get("answer", 0),
+            "scores": scores,
+            "average_score": sum(scores) / len(scores) if scores else 0,
+        }
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    """解析分頁游標；格式錯誤時拋出 ValueError"""
+    created_at, last_id = cursor.rsplit(":", 1)
+    return float(created_at), int(last_id)
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    item = dict(row)
+    item["payload"] = json.loads(item["payload"] or "{}")
+    return item
+
+
+# 全域會話事件儲存實例
+session_store = SessionEventStore()
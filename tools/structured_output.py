@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+結構化輸出模組
+以 JSON Schema 要求模型輸出固定格式，串流接收時逐段掃描 JSON，
+並以預先編譯的驗證器檢查結果
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+Validator = Callable[[Any], List[str]]
+
+
+class StructuredOutputError(ValueError):
+    """模型輸出不是完整的 JSON，或不符合 Schema"""
+
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """產生 OpenAI chat completions 的 json_schema response_format（嚴格模式）"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+# 驗證器 -------------------------------------------------------------------
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    將 JSON Schema 編譯為驗證函式，回傳錯誤訊息清單（空清單代表通過）。
+
+    支援 type、properties、required、additionalProperties、items、enum、
+    minimum、maximum，足以涵蓋結構化輸出使用的子集；
+    Schema 只在編譯時走訪一次，驗證時不再解析。
+    """
+    return _compile(schema, "$")
+
+
+def _compile(schema: Dict[str, Any], path: str) -> Validator:
+    checks: List[Validator] = []
+
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        type_checks = [_TYPE_CHECKS[t] for t in types]
+        label = "|".join(types)
+
+        def check_type(value, type_checks=type_checks, label=label):
+            if any(check(value) for check in type_checks):
+                return []
+            return [f"{path}: 應為 {label}"]
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, allowed=allowed):
+            return [] if value in allowed else [f"{path}: 不在允許值 {allowed} 中"]
+
+        checks.append(check_enum)
+
+    for keyword, compare, message in (
+        ("minimum", lambda v, limit: v >= limit, "小於"),
+        ("maximum", lambda v, limit: v <= limit, "大於"),
+    ):
+        if keyword in schema:
+            limit = schema[keyword]
+
+            def check_limit(value, limit=limit, compare=compare, message=message):
+                if _TYPE_CHECKS["number"](value) and not compare(value, limit):
+                    return [f"{path}: {message} {limit}"]
+                return []
+
+            checks.append(check_limit)
+
+    properties = {
+        name: _compile(sub, f"{path}.{name}")
+        for name, sub in schema.get("properties", {}).items()
+    }
+    required = list(schema.get("required", []))
+    closed = schema.get("additionalProperties") is False
+    if properties or required or closed:
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                return []
+            errors = [
+                f"{path}: 缺少欄位 {name}" for name in required if name not in value
+            ]
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    errors.extend(validator(item))
+                elif closed:
+                    errors.append(f"{path}: 不允許的欄位 {name}")
+            return errors
+
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_validator = _compile(schema["items"], f"{path}[]")
+
+        def check_items(value):
+            if not isinstance(value, list):
+                return []
+            errors: List[str] = []
+            for item in value:
+                errors.extend(item_validator(item))
+            return errors
+
+        checks.append(check_items)
+
+    def validate(value):
+        errors: List[str] = []
+        for check in checks:
+            errors.extend(check(value))
+            # 型別不符時不再檢查內容，避免一連串衍生錯誤
+            if errors:
+                break
+        return errors
+
+    return validate
+
+
+# 串流解析 -----------------------------------------------------------------
+class IncrementalJSONParser:
+    """
+    逐段接收串流文字並追蹤括號深度，最外層物件一結束即可取得結果。
+
+    每個字元只掃描一次；字串內的括號與跳脫字元都會正確略過。
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = -1
+        self._end = -1
+        self.parse_seconds = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return self._end >= 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> None:
+        """接收一段文字；最外層物件結束後的內容會被忽略"""
+        if self.complete or not chunk:
+            return
+        start_time = time.perf_counter()
+        offset = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+
+        for index, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._start >= 0:
+                    self._in_string = True
+            elif char in "{[":
+                if self._start < 0:
+                    if char != "{":
+                        continue
+                    self._start = offset + index
+                self._depth += 1
+            elif char in "}]" and self._start >= 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = offset + index + 1
+                    break
+        self.parse_seconds += time.perf_counter() - start_time
+
+    def result(self) -> Any:
+        """回傳解析後的物件；內容不完整或不是合法 JSON 時拋出 StructuredOutputError"""
+        if not self.complete:
+            raise StructuredOutputError("模型輸出的 JSON 不完整")
+        start_time = time.perf_counter()
+        try:
+            return json.loads(self.text[self._start : self._end])
+        except json.JSONDecodeError as e:
+            raise StructuredOutputError(f"模型輸出不是合法的 JSON: {e}") from e
+        finally:
+            self.parse_seconds += time.perf_counter() - start_time
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+文字斷詞模組
+提供中英混合文字的輕量斷詞與詞頻向量
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List
+
+# 英數字詞（保留 c++、c# 這類帶符號的技術名詞）與連續的中日韓字元
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+[+#]*|[㐀-鿿豈-﫿]+")
+_CJK_PATTERN = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+def tokenize(text: str) -> List[str]:
+    """將文字切成詞元：英數字以單字為單位，中文以二字詞（bigram）為單位"""
+    if not text:
+        return []
+
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        chunk = match.group()
+        if not _CJK_PATTERN.match(chunk):
+            tokens.append(chunk)
+        elif len(chunk) == 1:
+            tokens.append(chunk)
+        else:
+            tokens.extend(chunk[i : i + 2] for i in range(len(chunk) - 1))
+    return tokens
+
+
+def term_vector(text: str) -> Dict[str, int]:
+    """計算文字的詞頻向量"""
+    return dict(Counter(tokenize(text)))
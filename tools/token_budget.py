@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Token 預算模組
+在本地估算文字的 token 數，並將過長的內容截斷到指定預算內
+"""
+
+import re
+from typing import Optional
+
+try:
+    import tiktoken
+
+    # gpt-4o 系列使用的編碼
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None  # 未安裝 tiktoken 時改用估算
+
+# 中日韓文字約一字一 token，其餘文字約四個字元一 token
+_CJK_PATTERN = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+TRUNCATION_MARKER = "\n…（中略）…\n"
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """計算文字的 token 數（有 tiktoken 時精確計算，否則估算）"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_budget(text: Optional[str], max_tokens: int) -> str:
+    """
+    將文字截斷到 max_tokens 以內。
+
+    保留開頭約三分之二與結尾約三分之一，中間以標記取代；
+    回答的重點通常在開頭的結論與結尾的總結。
+    """
+    text = text or ""
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+
+    budget = max(0, max_tokens - count_tokens(TRUNCATION_MARKER))
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        head = _ENCODING.decode(tokens[: budget * 2 // 3])
+        tail = (
+            _ENCODING.decode(tokens[len(tokens) - budget // 3 :]) if budget >= 3 else ""
+        )
+    else:
+        # 以字元比例估算切點
+        ratio = budget / total
+        head = text[: int(len(text) * ratio * 2 / 3)]
+        tail_length = int(len(text) * ratio / 3)
+        tail = text[len(text) - tail_length :] if tail_length else ""
+    return f"{head.rstrip()}{TRUNCATION_MARKER}{tail.lstrip()}"
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+工具登錄表
+以名稱對應已登錄的工具函式（查詢為一次字典存取），取代逐一比對名稱的分派；
+登錄時依函式簽章預先編譯參數驗證，並為每個工具組好中介層（計時、快取、限流）。
+
+Flask 的 Fast Agent API 與 MCP 伺服器的工具共用同一份登錄表：登錄後的函式
+不論由哪一條路徑呼叫都經過相同的中介層，因此共用快取與限流狀態
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .metrics import metrics
+
+
+class ToolError(Exception):
+    """工具呼叫失敗（找不到工具、參數錯誤或超過限流）"""
+
+
+class ToolNotFoundError(ToolError):
+    """沒有此名稱的工具"""
+
+
+class ToolValidationError(ToolError):
+    """參數不符合工具的簽章"""
+
+
+class ToolRateLimitError(ToolError):
+    """呼叫頻率超過工具的限制"""
+
+
+# 可由 JSON 輸入直接檢查型別的參數註記
+_CHECKED_TYPES = (str, int, float, bool, list, dict)
+
+
+class ToolSchema:
+    """
+    由函式簽章預先編譯的參數規格：必填參數、預設值與各自的型別。
+
+    工具只接受具名參數（不支援 *args/**kwargs）
+    """
+
+    __slots__ = ("params", "required", "defaults")
+
+    def __init__(self, func: Callable):
+        self.params: Dict[str, Optional[Tuple[type, ...]]] = {}
+        self.required = []
+        self.defaults: Dict[str, Any] = {}
+        for name, param in inspect.signature(func).parameters.items():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                raise TypeError(f"工具 {func.__name__} 不可使用 *args/**kwargs")
+            self.params[name] = self._types_for(param.annotation)
+            if param.default is param.empty:
+                self.required.append(name)
+            else:
+                self.defaults[name] = param.default
+
+    @staticmethod
+    def _types_for(annotation) -> Optional[Tuple[type, ...]]:
+        if annotation not in _CHECKED_TYPES:
+            return None
+        if annotation is float:
+            return (int, float)
+        return (annotation,)
+
+    def validate(self, arguments: Dict[str, Any]) -> None:
+        """檢查參數；不符合時拋出 ToolValidationError"""
+        missing = [name for name in self.required if name not in arguments]
+        if missing:
+            raise ToolValidationError(f"缺少參數: {', '.join(missing)}")
+        for name, value in arguments.items():
+            if name not in self.params:
+                raise ToolValidationError(f"不支援的參數: {name}")
+            types = self.params[name]
+            # bool 是 int 的子類別，數值參數不接受 true/false
+            if types is not None and (
+                not isinstance(value, types)
+                or (isinstance(value, bool) and bool not in types)
+            ):
+                expected = "/".join(t.__name__ for t in types)
+                raise ToolValidationError(
+                    f"參數 {name} 應為 {expected}，收到 {type(value).__name__}"
+                )
+
+    def complete(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """補上預設值，讓不同呼叫方式的相同呼叫得到相同的快取與限流鍵"""
+        return {**self.defaults, **arguments}
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "parameters": {
+                name: types[-1].__name__ if types else "any"
+                for name, types in self.params.items()
+            },
+            "required": list(self.required),
+        }
+
+
+def _is_success(result: Any) -> bool:
+    """工具回傳值是否為成功結果（支援 success 與 status 兩種格式）"""
+    if isinstance(result, dict):
+        if "success" in result:
+            return bool(result["success"])
+        return result.get("status", "success") not in ("error", "not_found")
+    return True
+
+
+# 中介層 -------------------------------------------------------------------
+# 中介層為 middleware(tool, arguments, call_next) -> 結果；登錄時由外而內組成呼叫鏈
+
+_MISSING = object()
+
+
+class Timing:
+    """記錄每次呼叫的耗時與失敗次數"""
+
+    def __call__(self, tool: "Tool", arguments: Dict[str, Any], call_next):
+        with metrics.timer(f"tools.call_ms.{tool.name}"):
+            try:
+                return call_next(arguments)
+            except Exception:
+                metrics.increment(f"tools.errors.{tool.name}")
+                raise
+
+
+class TTLCache:
+    """
+    以參數內容快取成功的結果。
+
+    只用於結果只取決於參數、且沒有副作用的工具；when 可排除不應快取的呼叫
+    （例如未指定題目時會隨機出題）
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        maxsize: int = 256,
+        when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.when = when
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, tool: "Tool", arguments: Dict[str, Any], call_next):
+        if self.when is not None and not self.when(arguments):
+            return call_next(arguments)
+
+        result = self.get(arguments, _MISSING)
+        if result is not _MISSING:
+            metrics.increment(f"tools.cache_hit.{tool.name}")
+            return result
+
+        metrics.increment(f"tools.cache_miss.{tool.name}")
+        result = call_next(arguments)
+        self.put(arguments, result)
+        return result
+
+    def get(self, arguments: Dict[str, Any], default: Any = None) -> Any:
+        """取得未過期的快取結果（也可在中介層之外直接使用）"""
+        key = self._key(arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, arguments: Dict[str, Any], result: Any) -> None:
+        """快取成功的結果，超過容量時淘汰最久未使用的項目"""
+        if not _is_success(result):
+            return
+        key = self._key(arguments)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _key(arguments: Dict[str, Any]) -> str:
+        return json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RateLimit:
+    """
+    以權杖桶限制呼叫頻率：每個 key 參數值（預設為 user_id）每 per 秒最多
+    rate 次，允許短時間內用完整桶的額度。
+
+    閒置至少 per 秒的桶已回補滿額，與新建的桶相同；每 per 秒清除一次，
+    記憶體用量只與最近活動的 key 數有關
+    """
+
+    def __init__(self, rate: int, per: float = 60.0, key: str = "user_id"):
+        self.rate = rate
+        self.per = per
+        self.key = key
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, tool: "Tool", arguments: Dict[str, Any], call_next):
+        bucket_key = str(arguments.get(self.key, "default_user"))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept_at >= self.per:
+                self._sweep_locked(now)
+            tokens, updated = self._buckets.get(bucket_key, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - updated) * self.rate / self.per)
+            if tokens < 1:
+                self._buckets[bucket_key] = (tokens, now)
+                metrics.increment(f"tools.rate_limited.{tool.name}")
+                raise ToolRateLimitError(f"{tool.name} 呼叫過於頻繁，請稍後再試")
+            self._buckets[bucket_key] = (tokens - 1, now)
+        return call_next(arguments)
+
+    def _sweep_locked(self, now: float) -> None:
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if now - bucket[1] < self.per
+        }
+        self._swept_at = now
+
+    def __len__(self):
+        """目前保留的權杖桶數"""
+        return len(self._buckets)
+
+
+# 登錄表 -------------------------------------------------------------------
+
+
+class Tool:
+    """一個已登錄的工具：函式、參數規格與組好的中介層呼叫鏈"""
+
+    __slots__ = ("name", "func", "schema", "middleware", "_chain")
+
+    def __init__(self, name: str, func: Callable, middleware: Iterable = ()):
+        self.name = name
+        self.func = func
+        self.schema = ToolSchema(func)
+        self.middleware = tuple(middleware)
+
+        chain = lambda arguments: func(**arguments)  # noqa: E731
+        for layer in reversed(self.middleware):
+            chain = functools.partial(layer, self, call_next=chain)
+        self._chain = chain
+
+    def run(self, arguments: Dict[str, Any]) -> Any:
+        """經過中介層執行（參數已由呼叫端確認）"""
+        return self._chain(self.schema.complete(arguments))
+
+
+class ToolRegistry:
+    """工具名稱 -> Tool 的登錄表"""
+
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+
+    def register(
+        self,
+        func: Optional[Callable] = None,
+        *,
+        name: Optional[str] = None,
+        namespace: str = "",
+        middleware: Iterable = (),
+    ):
+        """
+        登錄工具（可作為裝飾器），回傳經過中介層的同簽章函式。
+
+        名稱預設為函式名稱，namespace 不為空時登錄為 "<namespace>.<名稱>"
+        """
+
+        def decorator(func: Callable) -> Callable:
+            tool_name = name or func.__name__
+            if namespace:
+                tool_name = f"{namespace}.{tool_name}"
+            # 重複登錄（例如模組重新載入）時以新的定義取代
+            tool = Tool(tool_name, func, middleware)
+            self._tools[tool_name] = tool
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def registered(*args, **kwargs):
+                return tool.run(signature.bind(*args, **kwargs).arguments)
+
+            registered.tool = tool
+            return registered
+
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    def call(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """依名稱呼叫工具：驗證外部傳入的參數後經過中介層執行"""
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolNotFoundError(f"工具 {name} 不存在")
+        arguments = dict(arguments or {})
+        tool.schema.validate(arguments)
+        return tool.run(arguments)
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def names(self):
+        return sorted(self._tools)
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """所有工具的參數規格（供 API 列出可用工具）"""
+        return {name: self._tools[name].schema.describe() for name in self.names()}
+
+
+# 全域登錄表實例
+tool_registry = ToolRegistry()
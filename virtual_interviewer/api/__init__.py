@@ -6,7 +6,9 @@ API 路由模組
 from .avatar_api import AvatarAPI
 from .fast_agent_api import FastAgentAPI
 from .interview_api import InterviewAPI
+from .interview_stream import register_interview_stream
 from .mcp_api import MCPServiceAPI
+from .metrics_api import MetricsAPI
 from .speech_api import SpeechAPI
 from .user_api import UserAPI
 
@@ -17,7 +19,9 @@ __all__ = [
     "AvatarAPI",
     "SpeechAPI",
     "MCPServiceAPI",
+    "MetricsAPI",
     "register_blueprints",
+    "register_interview_stream",
 ]
 
 
@@ -29,3 +33,7 @@ def register_blueprints(api):
     api.add_resource(AvatarAPI, "/api/avatar/control")
     api.add_resource(SpeechAPI, "/api/speech")
     api.add_resource(MCPServiceAPI, "/api/mcp")
+    api.add_resource(MetricsAPI, "/api/metrics")
+
+    # 即時通道：WebSocket 推送狀態、分析片段與下一題就緒通知
+    register_interview_stream(api.app)
@@ -5,6 +5,7 @@ Fast Agent API 端點
 from flask import request
 from flask_restful import Resource
 
+from services.idempotency import content_key, idempotency_cache
 from utils.response_helpers import create_error_response, create_success_response
 
 # 嘗試導入 Fast Agent 橋接模組
@@ -21,7 +22,7 @@ try:
     if parent_dir not in sys.path:
         sys.path.insert(0, parent_dir)
 
-    from fast_agent_bridge import call_fast_agent_function
+    from fast_agent_bridge import call_fast_agent_function, list_fast_agent_functions
 
     FAST_AGENT_AVAILABLE = True
 except Exception as e:
@@ -29,7 +30,34 @@ except Exception as e:
     FAST_AGENT_AVAILABLE = False
 
 
+# 結果只取決於輸入內容的函數：客戶端未帶請求識別碼時，以內容雜湊合併重試的請求。
+# 值為必須非空的參數：例如未指定題目的 get_standard_answer 回傳隨機題目，不能合併。
+# generate_final_summary 讀取伺服器端累積的作答紀錄，相同參數的結果會隨面試進行而改變，不在此列
+CONTENT_KEYED_FUNCTIONS = {
+    "analyze_answer": (),
+    "analyze_intro": (),
+    "get_standard_answer": ("question",),
+}
+
+# 以內容雜湊快取的回應只保留短時間，避免蓋掉用戶刻意重新送出的相同內容
+CONTENT_KEY_TTL = 30
+
+
+def _is_content_keyed(function_name, arguments):
+    """此次呼叫的結果是否只取決於參數內容"""
+    required = CONTENT_KEYED_FUNCTIONS.get(function_name)
+    if required is None:
+        return False
+    return all(arguments.get(name) for name in required)
+
+
 class FastAgentAPI(Resource):
+    def get(self):
+        """列出可呼叫的 Fast Agent 函數與參數規格"""
+        if not FAST_AGENT_AVAILABLE:
+            return create_error_response("Fast Agent 模組不可用", status_code=503)
+        return create_success_response(data=list_fast_agent_functions())
+
     def post(self):
         """Fast Agent 專用 API 端點"""
         try:
@@ -43,8 +71,22 @@ class FastAgentAPI(Resource):
             if not function_name:
                 return create_error_response("缺少 function 參數", status_code=400)
 
-            # 調用 Fast Agent 函數
-            result = call_fast_agent_function(function_name, **arguments)
+            # 調用 Fast Agent 函數（重試的相同請求只會實際執行一次）
+            user_id = arguments.get("user_id", "default_user")
+            request_id = data.get("request_id") or request.headers.get(
+                "Idempotency-Key"
+            )
+            ttl = None
+            if not request_id and _is_content_keyed(function_name, arguments):
+                request_id = content_key(function_name, arguments)
+                ttl = CONTENT_KEY_TTL
+            result = idempotency_cache.run(
+                user_id,
+                request_id,
+                lambda: call_fast_agent_function(function_name, **arguments),
+                cacheable=lambda result: bool(result.get("success")),
+                ttl=ttl,
+            )
 
             if result.get("success"):
                 return create_success_response(
@@ -53,7 +95,7 @@ class FastAgentAPI(Resource):
             else:
                 return create_error_response(
                     message=f"Fast Agent 調用失敗: {result.get('error', '未知錯誤')}",
-                    status_code=400,
+                    status_code=result.get("status_code", 400),
                 )
 
         except Exception as e:
@@ -7,89 +7,164 @@ from fast_agent_bridge import (
     analyze_intro,
     clear_all_user_data,
     clear_collected_intro,
+    get_chat_history,
     get_collected_intro,
     get_question,
     intro_collector,
+    prefetch_question,
+    record_chat_turn,
 )
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
 
 from models import InterviewSession, db
-from services.state_manager import InterviewState, InterviewStateManager
+from services.auto_advance import auto_advance
+from services.event_bus import event_bus
+from services.idempotency import idempotency_cache
+from services.question_planner import QuestionPlanner
+from services.session_locks import session_locks
+from services.state_manager import (
+    RESET_PHRASES,
+    InterviewState,
+    InterviewStateManager,
+    classify_intents,
+)
+from tools.metrics import metrics
 from utils.response_helpers import create_error_response, create_success_response
 
 
 class InterviewAPI(Resource):
+    # 各狀態的訊息處理方法登記在 services.state_manager.STATE_TRANSITIONS
+
+    NO_QUESTION_RESPONSE = "目前沒有待回答的題目。請先輸入『請給我問題』取得題目。"
+
     def __init__(self):
         self.state_manager = InterviewStateManager()
+        self.question_planner = QuestionPlanner()
 
     def post(self):
         """處理面試對話"""
+        data = request.get_json() or {}
+        user_message = data.get("message", "")
+        user_id = data.get("user_id", "default_user")
+        # 前端為每則訊息產生的識別碼；重送或重複點擊時相同
+        request_id = data.get("request_id") or request.headers.get("Idempotency-Key")
+        self._apply_client_options(user_id, data)
+
+        # 重複送出的請求共用同一次處理結果；成功的回應會快取一段時間
+        return idempotency_cache.run(
+            user_id,
+            request_id,
+            lambda: self._handle_message(user_message, user_id),
+            cacheable=lambda response: response[1] == 200,
+        )
+
+    def _apply_client_options(self, user_id, data):
+        """記錄請求附帶的客戶端設定"""
+        if "auto_advance" in data:
+            auto_advance.set_user_enabled(user_id, data["auto_advance"])
+
+    def _handle_message(self, user_message, user_id):
+        """依目前狀態處理一則訊息"""
+        # 同一用戶的請求依序處理，避免並行請求互相覆蓋自我介紹內容與當前題目
+        with session_locks.hold(user_id):
+            return self._process_message(user_message, user_id)
+
+    def _process_message(self, user_message, user_id):
+        """讀取狀態、轉換、處理並儲存對話記錄（呼叫端需持有該用戶的會話鎖）"""
         try:
-            data = request.get_json()
-            user_message = data.get("message", "")
-            user_id = data.get("user_id", "default_user")
-
-            # 檢查是否為重置請求
-            if user_message.lower() in [
-                "重新開始",
-                "重新來過",
-                "重新面試",
-                "重來",
-                "restart",
-                "reset",
-            ]:
-                return self._handle_reset_request(user_id)
-
-            # 獲取當前狀態
-            current_state = self.state_manager.get_user_state(user_id)
-
-            # 檢查狀態轉換
-            state_changed = self.state_manager.transition_state(user_id, user_message)
-            if state_changed:
-                # 狀態轉換後，重新獲取最新狀態
-                current_state = self.state_manager.get_user_state(user_id)
-                print(f"🔄 狀態已轉換，新狀態: {current_state.value}")
+            early_response, current_state, handler, intents = self._begin_message(
+                user_message, user_id
+            )
+            if early_response is not None:
+                return early_response
 
             # 根據最新狀態處理訊息
             ai_response = self._process_message_by_state(
-                user_message, current_state, user_id
+                user_message, current_state, handler, user_id, intents
             )
+            return self._complete_message(user_message, user_id, ai_response)
 
-            # 處理過程中可能更新了狀態（例如分析完成自動進入面試），因此再次獲取當前狀態
-            current_state = self.state_manager.get_user_state(user_id)
-
-            # 儲存對話記錄
-            session_data = {
-                "user_message": user_message,
-                "ai_response": ai_response,
-                "current_state": current_state.value,
-                "timestamp": "2024-01-01T00:00:00",  # 簡化時間戳
-            }
+        except Exception as e:
+            db.session.rollback()
+            return create_error_response(f"處理面試對話失敗: {str(e)}", status_code=400)
 
-            # 儲存會話（user_id 需為整數，非整數則存 None）
-            interview_session = InterviewSession()
-            try:
-                interview_session.user_id = (
-                    int(user_id) if str(user_id).isdigit() else None
-                )
-            except Exception:
-                interview_session.user_id = None
-            interview_session.session_data = str(session_data)
-            db.session.add(interview_session)
-            db.session.commit()
+    def _begin_message(self, user_message, user_id):
+        """
+        處理重置、分類意圖並進行狀態轉換。
+
+        回傳 (提前結束時的回應, 目前狀態, 處理方法名稱, 意圖)；重置請求直接回傳其回應。
+        """
+        # 用戶已有新動作：取消尚未推送的下一題
+        auto_advance.cancel(user_id)
+
+        # 檢查是否為重置請求
+        if user_message.lower() in RESET_PHRASES:
+            return self._handle_reset_request(user_id), None, None, None
+
+        # 每則訊息只分類一次意圖，狀態轉換與處理方法共用
+        intents = classify_intents(user_message)
+
+        # 一次查表取得轉換後的狀態與其處理方法
+        current_state, handler = self.state_manager.transition_state(
+            user_id, user_message, intents
+        )
+        return None, current_state, handler, intents
+
+    def _complete_message(self, user_message, user_id, ai_response, pushed=False):
+        """儲存對話記錄並組成回應；pushed 為真時是伺服器主動推送、沒有用戶訊息"""
+        # 處理過程中可能更新了狀態（例如分析完成自動進入面試），因此再次獲取當前狀態
+        current_state = self.state_manager.get_user_state(user_id)
+
+        # 儲存對話記錄
+        session_data = {
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "current_state": current_state.value,
+            "timestamp": "2024-01-01T00:00:00",  # 簡化時間戳
+        }
 
+        # 儲存會話（user_id 需為整數，非整數則存 None）
+        interview_session = InterviewSession()
+        try:
+            interview_session.user_id = int(user_id) if str(user_id).isdigit() else None
+        except Exception:
+            interview_session.user_id = None
+        interview_session.session_data = str(session_data)
+        db.session.add(interview_session)
+        db.session.commit()
+
+        # 對話紀錄由伺服器保存，客戶端不需在每次請求附上完整歷史
+        record_chat_turn(
+            user_id, user_message, ai_response, current_state.value, pushed=pushed
+        )
+        # 狀態有變化時推送給該用戶的即時連線
+        event_bus.publish_state(user_id, current_state.value)
+
+        data = {
+            "response": ai_response,
+            "session_id": interview_session.id,
+            "current_state": current_state.value,
+        }
+        # 已排程由伺服器推送下一題時告知客戶端，客戶端不需再自行索取
+        push_in = auto_advance.remaining(user_id)
+        if push_in is not None:
+            data["auto_advance_in"] = round(push_in, 1)
+        return create_success_response(data=data)
+
+    def get(self):
+        """取得本次面試的對話紀錄與目前狀態（前端重新載入時還原畫面）"""
+        try:
+            user_id = request.args.get("user_id", "default_user")
+            limit = request.args.get("limit", 50, type=int)
             return create_success_response(
                 data={
-                    "response": ai_response,
-                    "session_id": interview_session.id,
-                    "current_state": current_state.value,
+                    "history": get_chat_history(user_id, limit),
+                    "current_state": self.state_manager.get_user_state(user_id).value,
                 }
             )
-
         except Exception as e:
-            db.session.rollback()
-            return create_error_response(f"處理面試對話失敗: {str(e)}", status_code=400)
+            return create_error_response(f"取得對話紀錄失敗: {str(e)}", status_code=500)
 
     def delete(self):
         """處理面試重置請求"""
@@ -97,7 +172,8 @@ class InterviewAPI(Resource):
             data = request.get_json() or {}
             user_id = data.get("user_id", "default_user")
 
-            return self._handle_reset_request(user_id)
+            with session_locks.hold(user_id):
+                return self._handle_reset_request(user_id)
 
         except Exception as e:
             return create_error_response(f"重置面試失敗: {str(e)}", status_code=500)
@@ -105,7 +181,8 @@ class InterviewAPI(Resource):
     def _handle_reset_request(self, user_id):
         """處理重置請求"""
         try:
-            # 1. 清除後端狀態管理器的所有數據
+            # 1. 清除後端狀態管理器的所有數據與待推送的題目
+            auto_advance.cancel(user_id)
             self.state_manager.clear_user_data(user_id)
 
             # 2. 清除已收集的自我介紹內容和其他相關數據
@@ -126,6 +203,8 @@ class InterviewAPI(Resource):
             # 這裡可以添加清除其他模組狀態的邏輯
 
             print(f"🧹 用戶 {user_id} 的所有面試數據已完全清除")
+            event_bus.publish(user_id, "reset")
+            event_bus.publish_state(user_id, InterviewState.WAITING.value)
 
             return create_success_response(
                 data={
@@ -141,34 +220,18 @@ class InterviewAPI(Resource):
             print(f"❌ 重置面試數據失敗: {str(e)}")
             return create_error_response(f"重置面試數據失敗: {str(e)}", status_code=500)
 
-    def _process_message_by_state(self, user_message, current_state, user_id):
-        """根據狀態處理訊息"""
-        if current_state.value == "waiting":
-            return self._process_waiting_state(user_message)
-        elif current_state.value == "intro":
-            return self._process_intro_state(user_message, user_id)
-        elif current_state.value == "intro_analysis":
-            return self._process_intro_analysis_state(user_message, user_id)
-        elif current_state.value == "questioning":
-            return self._process_questioning_state(user_message, user_id)
-        elif current_state.value == "completed":
-            return self._process_completed_state(user_message, user_id)
-        else:
+    def _process_message_by_state(
+        self, user_message, current_state, handler, user_id, intents
+    ):
+        """以狀態轉換表查得的處理方法處理訊息"""
+        if handler is None:
             return "未知狀態，請重新開始面試。"
+        with metrics.timer(f"interview.handler_ms.{current_state.value}"):
+            return getattr(self, handler)(user_message, user_id, intents)
 
-    def _process_waiting_state(self, user_message):
+    def _process_waiting_state(self, user_message, user_id, intents):
         """處理等待開始階段的訊息"""
-        lower_message = user_message.lower()
-        start_keywords = [
-            "開始面試",
-            "開始",
-            "start_interview",
-            "開始練習",
-            "準備好了",
-            "可以開始了",
-        ]
-
-        if any(keyword in lower_message for keyword in start_keywords):
+        if "start" in intents:
             # 移除冗餘的清除調用，避免狀態不一致
             # 這些清除邏輯已經在 _handle_reset_request 中統一處理
             return """
@@ -203,28 +266,15 @@ class InterviewAPI(Resource):
 請點擊「開始面試」按鈕，或輸入「開始面試」來開始您的面試之旅！
             """
 
-    def _process_intro_state(self, user_message, user_id):
+    def _process_intro_state(self, user_message, user_id, intents):
         """處理自我介紹階段的訊息"""
-        lower_message = (user_message or "").lower()
-        start_keywords = [
-            "開始面試",
-            "開始",
-            "start_interview",
-            "開始練習",
-            "準備好了",
-            "可以開始了",
-        ]
-        done_phrases = {
-            "介紹完了",
-            "介紹完成",
-            "我說完了",
-            "說完了",
-            "完成介紹",
-            "結束介紹",
-        }
-
         # 如果剛從等待階段進入自我介紹（收到開始面試相關訊息），給出清晰的自我介紹引導
-        if any(keyword in lower_message for keyword in start_keywords):
+        if "start" in intents:
+            # 會話開始：依履歷挑選本次的面試題目
+            try:
+                self.question_planner.plan_session(user_id)
+            except Exception as e:
+                print(f"⚠️ 依履歷挑選題目失敗: {e}")
             return """
 🎯 面試開始！
 
@@ -239,7 +289,7 @@ class InterviewAPI(Resource):
 完成後請輸入：「介紹完了」 以進入分析階段。
             """
 
-        if user_message in done_phrases:
+        if "intro_done" in intents:
             return "已收到您『自我介紹完成』的指示，將進入分析階段。若未自動切換，請再次輸入：「介紹完了」。"
 
         if user_message == "介紹完了":
@@ -252,13 +302,19 @@ class InterviewAPI(Resource):
             """
         else:
             # 收集自我介紹內容，供後續分析使用
+            coverage = {}
             try:
-                intro_collector(user_message=user_message, user_id=user_id)
+                result = intro_collector(user_message=user_message, user_id=user_id)
+                coverage = result.get("coverage") or {}
             except Exception:
                 pass
-            return "✅ 已記錄您的自我介紹內容。請繼續介紹，或說「介紹完了」來開始分析。"
+            progress = ""
+            if coverage:
+                covered = sum(1 for item in coverage.values() if item["status"] == "ok")
+                progress = f"（目前已涵蓋 {covered}/{len(coverage)} 個構面）"
+            return f"✅ 已記錄您的自我介紹內容{progress}。請繼續介紹，或說「介紹完了」來開始分析。"
 
-    def _process_intro_analysis_state(self, user_message, user_id):
+    def _process_intro_analysis_state(self, user_message, user_id, intents):
         """處理自我介紹分析階段：實際呼叫分析並回傳結果，並自動切換到面試階段"""
         # 優先使用已收集的自我介紹內容；若無，退回使用本次訊息
         collected = ""
@@ -274,84 +330,126 @@ class InterviewAPI(Resource):
         try:
             result = analyze_intro(user_message=content_to_analyze, user_id=user_id)
             if isinstance(result, dict) and result.get("success"):
-                # 在分析完成後，自動切換到面試問答階段
+                # 在分析完成後，自動切換到面試問答階段，預取並排程推送第一題
                 self.state_manager.set_user_state(user_id, InterviewState.QUESTIONING)
+                prefetch_question(user_id)
+                self._schedule_next_question(user_id)
 
                 analysis_text = result.get("result", "📊 自我介紹分析完成。")
-                guidance = (
-                    "\n\n分析完成，將進入面試階段。系統會在 5 秒後提供第一個問題。"
-                )
+                delay = auto_advance.delay if auto_advance.enabled else 5
+                guidance = f"\n\n分析完成，將進入面試階段。系統會在 {delay:g} 秒後提供第一個問題。"
                 return f"{analysis_text}{guidance}"
             # 若回傳非常規格式，直接轉為字串，同時切換到面試階段
             self.state_manager.set_user_state(user_id, InterviewState.QUESTIONING)
+            prefetch_question(user_id)
+            self._schedule_next_question(user_id)
             return str(result)
         except Exception as e:
             return f"📊 自我介紹分析出現問題：{str(e)}"
 
-    def _process_questioning_state(self, user_message, user_id):
+    def _process_questioning_state(self, user_message, user_id, intents):
         """處理面試提問階段的訊息"""
-        lower_message = (user_message or "").lower()
-
         # 取得新題目
-        question_request_keywords = {
-            "請給我問題",
-            "開始問答",
-            "開始面試",
-            "下一題",
-            "下一個問題",
-            "給我問題",
-        }
-
-        if any(k in lower_message for k in question_request_keywords):
-            try:
-                result = get_question()
-                if isinstance(result, dict) and result.get("success"):
-                    qdata = result.get("question_data", {})
-                    question_text = qdata.get("question") or ""
-                    standard_answer = qdata.get("standard_answer") or ""
-
-                    # 記錄到狀態管理器
-                    self.state_manager.set_user_current_question(
-                        user_id,
-                        question_text,
-                        standard_answer,
-                        question_data=qdata,
-                    )
-
-                    response_text = result.get("result")
-                    if not response_text:
-                        category = qdata.get("category", "一般")
-                        difficulty = qdata.get("difficulty", "中等")
-                        response_text = f"🎯 面試問題\n\n類別：{category}\n難度：{difficulty}\n\n問題：{question_text}\n\n請作答，送出後我會立即分析並給出評分。"
-                    return response_text
-                else:
-                    return "抱歉，目前無法取得面試問題，請稍後再試或輸入『請給我問題』重試。"
-            except Exception as e:
-                return f"取得面試問題失敗：{str(e)}"
+        if "request_question" in intents:
+            return self._next_question_response(user_id)
 
         # 分析用戶回答
         current_q = self.state_manager.get_user_current_question(user_id)
         if not current_q:
-            return "目前沒有待回答的題目。請先輸入『請給我問題』取得題目。"
+            return self.NO_QUESTION_RESPONSE
+
+        # 評分期間於背景準備下一題，讓「下一題」可立即回應
+        prefetch_question(user_id)
 
         try:
             analysis = analyze_answer(
                 user_answer=user_message,
                 question=current_q.get("question", ""),
                 standard_answer=current_q.get("standard_answer", ""),
+                user_id=user_id,
             )
-            if isinstance(analysis, dict) and analysis.get("success"):
-                return analysis.get("result", "分析完成。")
-            return str(analysis)
+            return self._answer_response(user_id, analysis)
         except Exception as e:
             return f"回答分析失敗：{str(e)}"
 
-    def _process_completed_state(self, user_message, user_id):
-        """處理面試完成階段"""
-        lower_message = (user_message or "").lower()
-        restart_keywords = ["重新開始", "重新來過", "重新面試", "重來", "restart"]
+    def _answer_response(self, user_id, analysis, app=None):
+        """評分完成：排程推送下一題並回傳分析文字"""
+        if isinstance(analysis, dict) and analysis.get("success"):
+            self._schedule_next_question(user_id, after_answer=True, app=app)
+            return analysis.get("result", "分析完成。")
+        return str(analysis)
 
-        if any(k in lower_message for k in restart_keywords):
+    def _next_question_response(self, user_id):
+        """取得下一題（通常已預取），記錄為當前題目並回傳題目訊息"""
+        try:
+            result = get_question(user_id=user_id)
+            if isinstance(result, dict) and result.get("success"):
+                qdata = result.get("question_data", {})
+                question_text = qdata.get("question") or ""
+                standard_answer = qdata.get("standard_answer") or ""
+
+                # 記錄到狀態管理器
+                self.state_manager.set_user_current_question(
+                    user_id,
+                    question_text,
+                    standard_answer,
+                    question_data=qdata,
+                )
+
+                response_text = result.get("result")
+                if not response_text:
+                    category = qdata.get("category", "一般")
+                    difficulty = qdata.get("difficulty", "中等")
+                    response_text = f"🎯 面試問題\n\n類別：{category}\n難度：{difficulty}\n\n問題：{question_text}\n\n請作答，送出後我會立即分析並給出評分。"
+                return response_text
+            else:
+                return (
+                    "抱歉，目前無法取得面試問題，請稍後再試或輸入『請給我問題』重試。"
+                )
+        except Exception as e:
+            return f"取得面試問題失敗：{str(e)}"
+
+    def _schedule_next_question(self, user_id, after_answer=False, app=None):
+        """
+        排程由伺服器推送下一題。
+
+        只在該用戶有即時連線時排程（沒有連線的客戶端仍自行索取）；
+        作答後的下一題另需客戶端開啟「自動下一題」。
+        不在請求的應用情境中時（ASGI 應用的事件迴圈）需傳入 app
+        """
+        if not event_bus.has_subscribers(user_id):
+            return None
+        if after_answer and not auto_advance.user_enabled(user_id):
+            return None
+        if app is None:
+            app = current_app._get_current_object()
+        return auto_advance.schedule(
+            user_id, lambda uid, job: self._push_next_question(app, uid, job)
+        )
+
+    def _push_next_question(self, app, user_id, job):
+        """排程到期：在背景執行緒取得下一題並以 question 事件推送"""
+        with app.app_context(), session_locks.hold(user_id):
+            # 排程後用戶已送出訊息、重置或暫停
+            if not auto_advance.claim(user_id, job):
+                return
+            if self.state_manager.get_user_state(user_id) != InterviewState.QUESTIONING:
+                return
+            try:
+                with metrics.timer("interview.auto_advance_ms"):
+                    response_text = self._next_question_response(user_id)
+                    body, status_code = self._complete_message(
+                        "", user_id, response_text, pushed=True
+                    )
+            except Exception:
+                db.session.rollback()
+                raise
+        if status_code == 200:
+            event_bus.publish(user_id, "question", body["data"])
+
+    def _process_completed_state(self, user_message, user_id, intents):
+        """處理面試完成階段"""
+        if "restart" in intents or "restart_en" in intents:
             # 移除冗餘的清除調用，避免狀態不一致
             # 這些清除邏輯已經在 _handle_reset_request 中統一處理
             return "✅ 面試已重置，請點擊「開始面試」按鈕開始新的面試。"
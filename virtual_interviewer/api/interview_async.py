@@ -0,0 +1,351 @@
+"""
+非同步面試端點（ASGI）
+正式環境以 uvicorn worker 執行一個長駐的事件迴圈：評分時以共用的 AsyncOpenAI
+客戶端等待模型，等待期間不佔用任何執行緒；其餘路由由掛載的 Flask 應用處理。
+需要 starlette 與 a2wsgi（pip install starlette a2wsgi "uvicorn[standard]"）
+
+POST /api/interview/async：請求與回應格式同 POST /api/interview，
+與其共用狀態機、處理方法、會話鎖與冪等快取。
+WebSocket /ws/interview 與 SSE /api/interview/events：協定同 api.interview_stream，
+連線在事件迴圈中等待，長時間開啟的連線不佔用執行緒
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fast_agent_bridge import (
+    analyze_answer_async,
+    prefetch_question,
+    set_question_ready_listener,
+)
+
+from models import db
+from services.auto_advance import auto_advance
+from services.event_bus import event_bus
+from services.idempotency import idempotency_cache
+from services.session_locks import session_locks
+from tools.llm_gateway import llm_gateway, stream_to
+from tools.metrics import metrics
+from utils.response_helpers import create_error_response, dumps_json
+
+from .interview_api import InterviewAPI
+from .interview_stream import (
+    HEARTBEAT_INTERVAL,
+    IDLE_TIMEOUT,
+    SSE_HEADERS,
+    SSE_RETRY,
+    _opening_events,
+    _publish_question_ready,
+    _sse,
+    _sse_resume_point,
+)
+
+try:
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Mount, Route, WebSocketRoute
+    from starlette.websockets import WebSocketDisconnect
+
+    ASGI_AVAILABLE = True
+except ImportError:
+    ASGI_AVAILABLE = False
+
+# 同步處理（狀態機、資料庫、掛載的 Flask 路由）使用的執行緒數；
+# 等待模型的請求不佔用這些執行緒
+SYNC_THREADS = int(os.environ.get("ASGI_SYNC_THREADS", "32"))
+
+
+class AsyncInterviewHandler:
+    """
+    InterviewAPI 的非同步處理流程：會話鎖、模型評分在事件迴圈中等待，
+    狀態轉換與資料庫寫入在執行緒池中執行
+    """
+
+    # 有非同步版本的處理方法（名稱同 STATE_TRANSITIONS 中的處理方法）；
+    # 其餘處理方法在執行緒中執行同步版本
+    ASYNC_HANDLERS = frozenset({"_process_questioning_state"})
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.api = InterviewAPI()
+
+    async def handle(self, user_message, user_id):
+        """依目前狀態處理一則訊息，回傳 (回應內容, 狀態碼)"""
+        async with session_locks.ahold(user_id):
+            try:
+                early_response, current_state, handler, intents = await self._run_sync(
+                    self.api._begin_message, user_message, user_id
+                )
+                if early_response is not None:
+                    return early_response
+
+                if handler not in self.ASYNC_HANDLERS:
+                    ai_response = await self._run_sync(
+                        self.api._process_message_by_state,
+                        user_message,
+                        current_state,
+                        handler,
+                        user_id,
+                        intents,
+                    )
+                else:
+                    with metrics.timer(f"interview.handler_ms.{current_state.value}"):
+                        ai_response = await getattr(self, handler)(
+                            user_message, user_id, intents
+                        )
+                return await self._run_sync(
+                    self.api._complete_message, user_message, user_id, ai_response
+                )
+            except Exception as e:
+                return create_error_response(
+                    f"處理面試對話失敗: {str(e)}", status_code=400
+                )
+
+    async def _process_questioning_state(self, user_message, user_id, intents):
+        """面試提問階段：取題沿用同步流程，評分以非同步方式等待模型"""
+        current_q = self.api.state_manager.get_user_current_question(user_id)
+        if "request_question" in intents or not current_q:
+            return await self._run_sync(
+                self.api._process_questioning_state, user_message, user_id, intents
+            )
+
+        # 評分期間於背景準備下一題，讓「下一題」可立即回應
+        prefetch_question(user_id)
+
+        try:
+            analysis = await analyze_answer_async(
+                user_answer=user_message,
+                question=current_q.get("question", ""),
+                standard_answer=current_q.get("standard_answer", ""),
+                user_id=user_id,
+            )
+            return self.api._answer_response(user_id, analysis, app=self.flask_app)
+        except Exception as e:
+            return f"回答分析失敗：{str(e)}"
+
+    async def _run_sync(self, fn, *args):
+        """在執行緒池中以 Flask 應用情境執行同步處理；失敗時回復資料庫交易"""
+
+        def call():
+            with self.flask_app.app_context():
+                try:
+                    return fn(*args)
+                except Exception:
+                    db.session.rollback()
+                    raise
+
+        return await asyncio.to_thread(call)
+
+
+class AsyncInterviewSocketSession:
+    """
+    一條 WebSocket 連線：接收與送出各為一個工作，閒置時送出 ping。
+
+    訊息在獨立的工作中處理，連線中斷不會取消處理中的訊息；
+    回應照常以 response 事件發佈，客戶端重連後依序號補送
+    """
+
+    # 處理中的訊息工作（保留參照，避免被回收）
+    _message_tasks = set()
+
+    def __init__(self, websocket, user_id, handler):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.handler = handler
+
+    async def run(self, after_seq=None, epoch=None):
+        await self.websocket.accept()
+        subscription, missed, complete = event_bus.subscribe(
+            self.user_id, after_seq, epoch, loop=asyncio.get_running_loop()
+        )
+        tasks = ()
+        try:
+            for event in _opening_events(self.user_id, after_seq, missed, complete):
+                await self._send(event)
+            metrics.increment("ws.replayed_events", len(missed))
+
+            tasks = (
+                asyncio.create_task(self._receive_loop(subscription)),
+                asyncio.create_task(self._pump(subscription)),
+            )
+            # 任一方結束（客戶端斷線、閒置逾時或佇列溢位）即關閉連線
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            subscription.close()
+
+    async def _receive_loop(self, subscription):
+        while True:
+            try:
+                raw = await asyncio.wait_for(
+                    self.websocket.receive_text(), IDLE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                metrics.increment("ws.idle_timeouts")
+                await self.websocket.close()
+                return
+            except WebSocketDisconnect:
+                return
+            try:
+                payload = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+
+            kind = payload.get("type")
+            if kind == "ping":
+                subscription._offer({"type": "pong"})
+            elif kind == "cancel_auto_advance":
+                auto_advance.cancel(self.user_id)
+            elif kind == "message":
+                task = asyncio.create_task(self._handle_message(payload))
+                self._message_tasks.add(task)
+                task.add_done_callback(self._message_tasks.discard)
+
+    async def _handle_message(self, payload):
+        """處理一則訊息；回應以 response 事件發佈，同一用戶的其他連線也會收到"""
+        message = payload.get("message", "")
+        request_id = payload.get("request_id")
+        self.handler.api._apply_client_options(self.user_id, payload)
+
+        def on_delta(text):
+            event_bus.publish(
+                self.user_id,
+                "analysis_delta",
+                {"request_id": request_id, "text": text},
+                replay=False,
+            )
+
+        try:
+            with metrics.timer("ws.message_ms"), stream_to(on_delta):
+                body, status_code = await idempotency_cache.arun(
+                    self.user_id,
+                    request_id,
+                    lambda: self.handler.handle(message, self.user_id),
+                    cacheable=lambda response: response[1] == 200,
+                )
+        except Exception as e:
+            body, status_code = create_error_response(
+                f"處理面試對話失敗: {str(e)}", status_code=500
+            )
+        event_bus.publish(
+            self.user_id,
+            "response",
+            {"request_id": request_id, "status_code": status_code, "body": body},
+        )
+
+    async def _pump(self, subscription):
+        """把事件佇列寫入連線；閒置時送出 ping"""
+        try:
+            while True:
+                event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if subscription.overflowed:
+                    # 客戶端跟不上：關閉連線，讓客戶端以序號重連補送
+                    await self.websocket.close(code=1013, reason="resume required")
+                    return
+                await self._send(event or {"type": "ping"})
+        except WebSocketDisconnect:
+            pass
+
+    async def _send(self, message):
+        await self.websocket.send_text(dumps_json(message).decode("utf-8"))
+
+
+async def _read_json(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _json_response(body, status_code):
+    return Response(
+        dumps_json(body), status_code=status_code, media_type="application/json"
+    )
+
+
+def create_asgi_app(flask_app):
+    """建立 ASGI 應用：非同步面試端點與即時通道，其餘路徑交給 Flask 應用"""
+    handler = AsyncInterviewHandler(flask_app)
+
+    async def interview_async(request):
+        data = await _read_json(request)
+        user_message = data.get("message", "")
+        user_id = data.get("user_id", "default_user")
+        request_id = data.get("request_id") or request.headers.get("Idempotency-Key")
+        handler.api._apply_client_options(user_id, data)
+
+        with metrics.timer("interview.async_message_ms"):
+            body, status_code = await idempotency_cache.arun(
+                user_id,
+                request_id,
+                lambda: handler.handle(user_message, user_id),
+                cacheable=lambda response: response[1] == 200,
+            )
+        return _json_response(body, status_code)
+
+    async def interview_socket(websocket):
+        user_id = websocket.query_params.get("user_id", "default_user")
+        last_seq = websocket.query_params.get("last_seq", "")
+        after_seq = int(last_seq) if last_seq.isdigit() else None
+        epoch = websocket.query_params.get("epoch")
+        metrics.increment("ws.connections")
+        await AsyncInterviewSocketSession(websocket, user_id, handler).run(
+            after_seq, epoch
+        )
+
+    async def interview_events(request):
+        user_id = request.query_params.get("user_id", "default_user")
+        after_seq, epoch = _sse_resume_point(
+            request.headers.get("Last-Event-ID"), request.query_params
+        )
+        subscription, missed, complete = event_bus.subscribe(
+            user_id, after_seq, epoch, loop=asyncio.get_running_loop()
+        )
+        opening = _opening_events(user_id, after_seq, missed, complete)
+        metrics.increment("sse.connections")
+
+        async def stream():
+            # 客戶端斷線時 StreamingResponse 取消此產生器
+            try:
+                yield SSE_RETRY
+                for event in opening:
+                    yield _sse(event, event_bus.epoch)
+                while not subscription.overflowed:
+                    event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+                    yield _sse(event, event_bus.epoch) if event else ": ping\n\n"
+            finally:
+                subscription.close()
+
+        return StreamingResponse(
+            stream(), media_type="text/event-stream", headers=SSE_HEADERS
+        )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # 同步處理的執行緒數有上限，與等待中的連線數無關
+        executor = ThreadPoolExecutor(
+            max_workers=SYNC_THREADS, thread_name_prefix="interview-sync"
+        )
+        asyncio.get_running_loop().set_default_executor(executor)
+        try:
+            yield
+        finally:
+            await llm_gateway.aclose()
+            executor.shutdown(wait=False)
+
+    set_question_ready_listener(_publish_question_ready)
+    routes = [
+        Route("/api/interview/async", interview_async, methods=["POST"]),
+        Route("/api/interview/events", interview_events),
+        WebSocketRoute("/ws/interview", interview_socket),
+        Mount("/", app=WSGIMiddleware(flask_app, workers=SYNC_THREADS)),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
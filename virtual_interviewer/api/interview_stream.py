@@ -0,0 +1,273 @@
+"""
+面試即時通道
+WebSocket 端點 /ws/interview：在同一條連線上送出訊息，並接收伺服器主動推送的
+狀態變更、模型分析片段、下一題就緒通知與自動推送的題目，不需輪詢或為每則訊息
+建立新連線。需要 flask-sock（pip install flask-sock）；未安裝時停用，前端退回 HTTP。
+SSE 端點 /api/interview/events 提供同樣的伺服器推送（只能接收），不需額外套件。
+
+此處為 WSGI（gthread）版本，每條連線在整個連線期間佔用執行緒；
+ASGI 應用以 api.interview_async 中的事件迴圈版本取代這兩個端點
+
+客戶端 → 伺服器：
+    {"type": "message", "message": "...", "request_id": "...", "auto_advance": true}
+    {"type": "cancel_auto_advance"}
+    {"type": "ping"} / {"type": "pong"}
+伺服器 → 客戶端：
+    {"type": "hello", "epoch": "...", "current_state": "...", "resumed": true}
+    {"seq": 12, "type": <事件類型>, "data": {...}}
+        事件類型：state、response、analysis_delta、question_ready、question、reset
+    {"type": "ping"} / {"type": "pong"} / {"type": "resync"}
+重新連線時帶上 ?last_seq=<最後收到的序號>&epoch=<hello 的 epoch>，伺服器補送期間遺漏的事件；
+SSE 以事件 id（"<epoch>:<seq>"）與 Last-Event-ID 自動達成相同效果
+"""
+
+import json
+import os
+import threading
+
+from fast_agent_bridge import set_question_ready_listener
+from flask import Response, request
+
+from services.auto_advance import auto_advance
+from services.event_bus import event_bus
+from services.idempotency import idempotency_cache
+from tools.llm_gateway import stream_to
+from tools.metrics import metrics
+from utils.response_helpers import (
+    create_error_response,
+    create_success_response,
+    dumps_json,
+)
+
+from .interview_api import InterviewAPI
+
+try:
+    from flask_sock import ConnectionClosed, Sock
+
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+# 伺服器在閒置時每隔此秒數送出 ping；客戶端超過三個週期沒有任何訊息即視為斷線
+HEARTBEAT_INTERVAL = float(os.environ.get("WS_HEARTBEAT_INTERVAL", "20"))
+IDLE_TIMEOUT = HEARTBEAT_INTERVAL * 3
+
+
+def _publish_question_ready(user_id, question_data):
+    """下一題預取完成：只通知類別與難度，題目內容仍在用戶要求時才送出"""
+    event_bus.publish(
+        user_id,
+        "question_ready",
+        {
+            "category": question_data.get("category", ""),
+            "difficulty": question_data.get("difficulty", ""),
+        },
+    )
+
+
+def _opening_events(user_id, after_seq, missed, complete):
+    """連線建立後依序送出的訊息：hello、（無法完整補送時）resync 與補送的事件"""
+    current_state = InterviewAPI().state_manager.get_user_state(user_id).value
+    events = [
+        {
+            "type": "hello",
+            "epoch": event_bus.epoch,
+            "current_state": current_state,
+            "resumed": after_seq is not None and complete,
+        }
+    ]
+    if not complete:
+        events.append({"type": "resync"})
+    events.extend(missed)
+    return events
+
+
+class InterviewSocketSession:
+    """一條 WebSocket 連線：接收執行緒處理訊息，送出執行緒負責所有寫入"""
+
+    def __init__(self, ws, user_id):
+        self.ws = ws
+        self.user_id = user_id
+        self.api = InterviewAPI()
+        self.closed = threading.Event()
+
+    def run(self, after_seq=None, epoch=None):
+        subscription, missed, complete = event_bus.subscribe(
+            self.user_id, after_seq, epoch
+        )
+        try:
+            for event in _opening_events(self.user_id, after_seq, missed, complete):
+                self._send(event)
+            metrics.increment("ws.replayed_events", len(missed))
+
+            writer = threading.Thread(
+                target=self._pump, args=(subscription,), daemon=True
+            )
+            writer.start()
+            self._receive_loop(subscription)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.closed.set()
+            subscription.close()
+
+    def _receive_loop(self, subscription):
+        while not self.closed.is_set():
+            raw = self.ws.receive(timeout=IDLE_TIMEOUT)
+            if raw is None:
+                metrics.increment("ws.idle_timeouts")
+                return
+            try:
+                payload = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+
+            kind = payload.get("type")
+            if kind == "ping":
+                subscription._offer({"type": "pong"})
+            elif kind == "cancel_auto_advance":
+                auto_advance.cancel(self.user_id)
+            elif kind == "message":
+                self._handle_message(payload)
+
+    def _handle_message(self, payload):
+        """處理一則訊息；回應以 response 事件發佈，同一用戶的其他連線也會收到"""
+        message = payload.get("message", "")
+        request_id = payload.get("request_id")
+        self.api._apply_client_options(self.user_id, payload)
+
+        def on_delta(text):
+            event_bus.publish(
+                self.user_id,
+                "analysis_delta",
+                {"request_id": request_id, "text": text},
+                replay=False,
+            )
+
+        try:
+            with metrics.timer("ws.message_ms"), stream_to(on_delta):
+                body, status_code = idempotency_cache.run(
+                    self.user_id,
+                    request_id,
+                    lambda: self.api._handle_message(message, self.user_id),
+                    cacheable=lambda response: response[1] == 200,
+                )
+        except Exception as e:
+            body, status_code = create_error_response(
+                f"處理面試對話失敗: {str(e)}", status_code=500
+            )
+        event_bus.publish(
+            self.user_id,
+            "response",
+            {"request_id": request_id, "status_code": status_code, "body": body},
+        )
+
+    def _pump(self, subscription):
+        """把事件佇列寫入連線；閒置時送出 ping"""
+        try:
+            while not self.closed.is_set():
+                event = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if subscription.overflowed:
+                    # 客戶端跟不上：關閉連線，讓客戶端以序號重連補送
+                    self.ws.close(reason=1013, message="resume required")
+                    return
+                self._send(event or {"type": "ping"})
+        except ConnectionClosed:
+            pass
+        finally:
+            self.closed.set()
+
+    def _send(self, message):
+        self.ws.send(dumps_json(message).decode("utf-8"))
+
+
+def _sse(message, epoch=None):
+    """格式化一則 SSE 訊息；有序號的事件帶上 id 供瀏覽器重連時回報"""
+    lines = []
+    if epoch and message.get("seq"):
+        lines.append(f"id: {epoch}:{message['seq']}")
+    lines.append("data: " + dumps_json(message).decode("utf-8"))
+    return "\n".join(lines) + "\n\n"
+
+
+# 斷線後瀏覽器等待的毫秒數
+SSE_RETRY = "retry: 3000\n\n"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse_resume_point(last_event_id, args):
+    """SSE 重連的補送起點 (序號, epoch)：優先使用 Last-Event-ID，其次為查詢參數"""
+    after_seq, epoch = _parse_last_event_id(last_event_id)
+    if after_seq is None:
+        last_seq = args.get("last_seq", "")
+        after_seq = int(last_seq) if last_seq.isdigit() else None
+        epoch = args.get("epoch")
+    return after_seq, epoch
+
+
+def _parse_last_event_id(value):
+    """Last-Event-ID（"<epoch>:<seq>"）-> (序號, epoch)"""
+    epoch, _, seq = (value or "").rpartition(":")
+    if not epoch or not seq.isdigit():
+        return None, None
+    return int(seq), epoch
+
+
+def interview_events():
+    """SSE 事件流：與 WebSocket 相同的伺服器推送，閒置時送出註解行保持連線"""
+    user_id = request.args.get("user_id", "default_user")
+    after_seq, epoch = _sse_resume_point(
+        request.headers.get("Last-Event-ID"), request.args
+    )
+    subscription, missed, complete = event_bus.subscribe(user_id, after_seq, epoch)
+    opening = _opening_events(user_id, after_seq, missed, complete)
+    metrics.increment("sse.connections")
+
+    def stream():
+        try:
+            yield SSE_RETRY
+            for event in opening:
+                yield _sse(event, event_bus.epoch)
+            while not subscription.overflowed:
+                event = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                yield _sse(event, event_bus.epoch) if event else ": ping\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+def cancel_auto_advance():
+    """取消伺服器排程的自動推送下一題（只使用 SSE 的客戶端暫停時呼叫）"""
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id", "default_user")
+    return create_success_response(data={"cancelled": auto_advance.cancel(user_id)})
+
+
+def register_interview_stream(app):
+    """註冊面試即時通道；未安裝 flask-sock 時只提供 SSE"""
+    set_question_ready_listener(_publish_question_ready)
+    app.add_url_rule("/api/interview/events", view_func=interview_events)
+    app.add_url_rule(
+        "/api/interview/auto-advance",
+        view_func=cancel_auto_advance,
+        methods=["DELETE"],
+    )
+
+    if not WEBSOCKET_AVAILABLE:
+        print("⚠️ 未安裝 flask-sock，停用 /ws/interview（pip install flask-sock）")
+        return
+
+    sock = Sock(app)
+
+    @sock.route("/ws/interview")
+    def interview_socket(ws):
+        user_id = request.args.get("user_id", "default_user")
+        after_seq = request.args.get("last_seq", type=int)
+        epoch = request.args.get("epoch")
+        metrics.increment("ws.connections")
+        InterviewSocketSession(ws, user_id).run(after_seq, epoch)
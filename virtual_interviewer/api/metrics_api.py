@@ -0,0 +1,14 @@
+"""
+執行指標 API 端點
+"""
+
+from flask_restful import Resource
+
+from tools.metrics import metrics
+from utils.response_helpers import create_success_response
+
+
+class MetricsAPI(Resource):
+    def get(self):
+        """回傳目前的執行指標（狀態轉換次數、處理耗時等）"""
+        return create_success_response(data=metrics.snapshot())
@@ -17,7 +17,7 @@ if str(parent_dir) not in sys.path:
 if str(current_dir) not in sys.path:
     sys.path.insert(0, str(current_dir))
 
-from flask import Flask, render_template
+from flask import Flask
 from flask_cors import CORS
 from flask_restful import Api
 
@@ -29,6 +29,9 @@ Config = configs.settings.Config
 
 # 導入重構後的模組
 from models import db
+from services.static_assets import static_assets
+from utils.compression import init_compression
+from utils.response_helpers import CompactJSONProvider, output_json
 
 
 def register_web_routes(app):
@@ -37,22 +40,24 @@ def register_web_routes(app):
     @app.route("/")
     def index():
         """主頁面"""
-        return render_template("index.html")
+        return static_assets.render_page("index.html")
 
     @app.route("/resume")
     def resume():
         """履歷輸入頁面"""
-        return render_template("resume.html")
+        return static_assets.render_page("resume.html")
 
     @app.route("/test")
     def test():
         """面試系統測試頁面"""
-        return render_template("browser_test.html")
+        return static_assets.render_page("browser_test.html")
 
 
 def create_app():
     """創建 Flask 應用程式"""
     app = Flask(__name__)
+    # 緊湊 JSON（orjson）並支援 ?fields= 欄位選取
+    app.json = CompactJSONProvider(app)
 
     # 載入配置
     app.config.from_object(Config)
@@ -61,6 +66,7 @@ def create_app():
     db.init_app(app)
     CORS(app)
     api = Api(app)
+    api.representations["application/json"] = output_json
 
     # 註冊 API 路由
     register_blueprints(api)
@@ -68,6 +74,12 @@ def create_app():
     # 註冊網頁路由
     register_web_routes(app)
 
+    # 靜態資源：雜湊檔名、長效快取與預先壓縮
+    static_assets.init_app(app)
+
+    # 動態回應依 Accept-Encoding 壓縮
+    init_compression(app)
+
     return app
 
 
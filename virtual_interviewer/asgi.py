@@ -0,0 +1,17 @@
+"""
+ASGI 進入點
+供正式環境以 uvicorn worker 載入：gunicorn -c gunicorn.conf.py asgi:app
+非同步面試端點在事件迴圈中處理，其餘路由轉交 Flask 應用；
+資料庫初始化與暖機沿用 wsgi 模組
+"""
+
+from wsgi import app as flask_app
+
+from api.interview_async import ASGI_AVAILABLE, create_asgi_app
+
+if not ASGI_AVAILABLE:
+    raise ImportError(
+        '缺少 ASGI 套件，請執行: pip install starlette a2wsgi "uvicorn[standard]"'
+    )
+
+app = create_asgi_app(flask_app)
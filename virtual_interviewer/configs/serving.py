@@ -0,0 +1,150 @@
+"""
+正式環境服務設定
+安裝 uvicorn、starlette 與 a2wsgi 時以 uvicorn worker 執行 ASGI 應用（asgi:app）：
+每個 worker 一個長駐事件迴圈，等待 LLM 回應的非同步請求不佔用執行緒，
+其餘路由交給固定大小的執行緒池（ASGI_SYNC_THREADS）。
+未安裝時退回 gunicorn 的 gthread 工作模式執行 WSGI 應用（wsgi:app），
+每個進行中的請求佔用一條執行緒直到回應完成
+
+各模式下每條即時連線佔用的執行緒：
+- ASGI：WebSocket /ws/interview 與 SSE /api/interview/events 在事件迴圈中等待，
+  不佔用執行緒；只有處理訊息時的同步步驟短暫使用執行緒池
+- gthread：每條 WebSocket 在連線期間佔用 1 條請求執行緒，另外建立 1 條送出執行緒；
+  每條 SSE 佔用 1 條請求執行緒。預設 64 條執行緒下，約 64 個開著面試頁面的分頁
+  即用盡請求執行緒，其他請求只能排隊；此模式下需依同時連線數調高 GUNICORN_THREADS
+"""
+
+import importlib.util
+import os
+
+# 面試狀態、會話鎖與各種快取都存放在行程記憶體中，
+# 預設只開一個 worker、以執行緒數量承擔併發；
+# 要開多個 worker 時，前端負載平衡需以用戶 id 做黏著路由
+DEFAULT_WORKERS = 1
+DEFAULT_THREADS = 64
+# 汰換 worker 會清空上述行程內狀態（進行中的面試全部回到等待狀態），
+# 狀態仍在行程記憶體中時預設不定期汰換
+DEFAULT_MAX_REQUESTS = 0
+
+ASGI_WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+
+
+def asgi_available():
+    """是否已安裝以 uvicorn worker 執行 ASGI 應用所需的套件"""
+    return all(
+        importlib.util.find_spec(name) is not None
+        for name in ("uvicorn", "starlette", "a2wsgi")
+    )
+
+
+def default_app_uri():
+    """正式環境載入的應用：可用時為 ASGI 應用，否則為 WSGI 應用"""
+    return "asgi:app" if asgi_available() else "wsgi:app"
+
+
+def build_gunicorn_config(**overrides):
+    """
+    產生 gunicorn 設定（鍵名同 gunicorn 設定檔），可由環境變數或參數覆寫。
+
+    - preload_app：在 master 載入程式碼與唯讀的題庫索引、關鍵字自動機後再 fork，
+      各 worker 以寫入時複製共用這些記憶體頁面且不需各自暖機；面試狀態不共用，
+      每個 worker 各有一份。資料庫連線一律在 worker 第一次使用時才建立
+    - worker_class：預設為 uvicorn worker（ASGI），未安裝時為 gthread；
+      threads 只在 gthread 模式下生效
+    - keepalive：略長於常見負載平衡器的閒置逾時（60 秒），避免連線被提早關閉
+    - max_requests：預設為 0（不汰換），理由見 DEFAULT_MAX_REQUESTS；
+      設定時加上隨機抖動避免同時重啟
+    """
+    host = os.environ.get("FLASK_HOST", "0.0.0.0")
+    port = os.environ.get("FLASK_PORT", "5000")
+
+    config = {
+        "bind": os.environ.get("GUNICORN_BIND", f"{host}:{port}"),
+        "workers": int(os.environ.get("GUNICORN_WORKERS", DEFAULT_WORKERS)),
+        "worker_class": os.environ.get(
+            "GUNICORN_WORKER_CLASS",
+            ASGI_WORKER_CLASS if asgi_available() else "gthread",
+        ),
+        "threads": int(os.environ.get("GUNICORN_THREADS", DEFAULT_THREADS)),
+        "preload_app": True,
+        "keepalive": int(os.environ.get("GUNICORN_KEEPALIVE", "75")),
+        # 單一請求可能包含排隊與重試的 LLM 呼叫，逾時需大於閘道的最長等待
+        "timeout": int(os.environ.get("GUNICORN_TIMEOUT", "120")),
+        "graceful_timeout": int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30")),
+        "max_requests": int(
+            os.environ.get("GUNICORN_MAX_REQUESTS", DEFAULT_MAX_REQUESTS)
+        ),
+        "max_requests_jitter": int(
+            os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "500")
+        ),
+        "backlog": int(os.environ.get("GUNICORN_BACKLOG", "2048")),
+        "accesslog": os.environ.get("GUNICORN_ACCESS_LOG", "-"),
+        "errorlog": "-",
+        "loglevel": os.environ.get("LOG_LEVEL", "INFO").lower(),
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }
+    # 容器中 /tmp 可能在磁碟上，心跳檔改放記憶體檔案系統
+    if os.path.isdir("/dev/shm"):
+        config["worker_tmp_dir"] = "/dev/shm"
+    config.update(overrides)
+    return config
+
+
+# gunicorn 掛鉤 -------------------------------------------------------------
+def when_ready(server):
+    if server.cfg.worker_class_str == "gthread":
+        server.log.info(
+            "✅ 虛擬面試系統已就緒：%s 個 worker × %s 條執行緒",
+            server.cfg.workers,
+            server.cfg.threads,
+        )
+    else:
+        server.log.info(
+            "✅ 虛擬面試系統已就緒：%s 個 worker（%s）",
+            server.cfg.workers,
+            server.cfg.worker_class_str,
+        )
+
+
+def post_fork(server, worker):
+    server.log.info("🔧 worker %s 已啟動", worker.pid)
+
+
+def worker_exit(server, worker):
+    server.log.info("👋 worker %s 已結束", worker.pid)
+
+
+def serve(app_uri=None, **overrides):
+    """以程式方式啟動 gunicorn（供 run.py --prod 使用）；預設載入 default_app_uri()"""
+    try:
+        from gunicorn.app.base import BaseApplication
+        from gunicorn.util import import_app
+    except ImportError:
+        print("❌ 缺少 gunicorn 套件，請執行: pip install gunicorn")
+        print("ℹ️ gunicorn 不支援 Windows，請改用 WSL 或容器部署")
+        return False
+
+    options = build_gunicorn_config(**overrides)
+    if app_uri is None:
+        app_uri = default_app_uri()
+
+    class ProductionApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(app_uri)
+
+    ProductionApplication().run()
+    return True
+
+
+if __name__ == "__main__":
+    # 直接執行時列出目前的設定，方便確認環境變數是否生效
+    for key, value in build_gunicorn_config().items():
+        if not callable(value):
+            print(f"{key} = {value!r}")
@@ -0,0 +1,15 @@
+"""
+gunicorn 設定檔
+使用方式（於 virtual_interviewer 目錄）：gunicorn -c gunicorn.conf.py asgi:app
+未安裝 uvicorn / starlette / a2wsgi 時改用：gunicorn -c gunicorn.conf.py wsgi:app
+平滑重啟：kill -HUP <master pid>；平滑停止：kill -TERM <master pid>
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from configs.serving import build_gunicorn_config
+
+globals().update(build_gunicorn_config())
@@ -4,6 +4,8 @@
 Virtual Interview Consultant - Startup Script
 """
 
+import argparse
+import importlib.util
 import os
 import sys
 
@@ -34,12 +36,11 @@ def setup_python_path():
         except ImportError as e:
             print(f"⚠️ Fast Agent 橋接模組導入失敗: {e}")
 
-        try:
-            import server
-
+        # 只確認 MCP 伺服器模組存在，不執行其進入點（會連線 MongoDB、設定日誌）
+        if importlib.util.find_spec("server") is not None:
             print("✅ MCP 服務器模組可導入")
-        except ImportError as e:
-            print(f"⚠️ MCP 服務器模組導入失敗: {e}")
+        else:
+            print("⚠️ MCP 服務器模組導入失敗: 找不到 server.py")
 
         return True
     except Exception as e:
@@ -77,6 +78,14 @@ def check_requirements():
 
 def main():
     """主啟動函數"""
+    parser = argparse.ArgumentParser(description="虛擬面試顧問")
+    parser.add_argument(
+        "--prod",
+        action="store_true",
+        help="以 gunicorn 正式環境模式啟動（ASGI 事件迴圈、預先載入、平滑重啟）",
+    )
+    args = parser.parse_args()
+
     print("🚀 虛擬面試顧問啟動中...")
     print("=" * 50)
 
@@ -88,6 +97,15 @@ def main():
     if not check_requirements():
         sys.exit(1)
 
+    if args.prod:
+        from configs.serving import serve
+
+        # 應用、資料庫與暖機由 asgi / wsgi 模組在 master 中載入
+        print("🏭 以正式環境模式啟動 (gunicorn)")
+        if not serve():
+            sys.exit(1)
+        return
+
     # 導入應用（在設置路徑後）
     from app import app, db
 
@@ -103,6 +121,7 @@ def main():
     print("按 Ctrl+C 停止應用程式")
 
     try:
+        # 開發伺服器：僅供本機開發，正式環境請使用 --prod
         app.run(host="0.0.0.0", port=5000, debug=True)
     except KeyboardInterrupt:
         print("\n👋 應用程式已停止")
@@ -3,6 +3,25 @@
 包含所有業務邏輯處理
 """
 
+from .auto_advance import AutoAdvanceScheduler, auto_advance
+from .event_bus import SessionEventBus, event_bus
+from .idempotency import IdempotencyCache, idempotency_cache
+from .question_planner import QuestionPlanner
+from .session_locks import SessionLocks, session_locks
 from .state_manager import InterviewStateManager
+from .static_assets import StaticAssetPipeline, static_assets
 
-__all__ = ["InterviewStateManager"]
+__all__ = [
+    "InterviewStateManager",
+    "QuestionPlanner",
+    "SessionLocks",
+    "IdempotencyCache",
+    "session_locks",
+    "idempotency_cache",
+    "StaticAssetPipeline",
+    "static_assets",
+    "SessionEventBus",
+    "event_bus",
+    "AutoAdvanceScheduler",
+    "auto_advance",
+]
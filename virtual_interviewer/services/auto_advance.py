@@ -0,0 +1,135 @@
+"""
+自動出題排程
+分析完成後由伺服器在延遲後取得下一題並推送給用戶的即時連線，客戶端不必再送出
+「請給我問題」。每位用戶最多一個待執行的排程；用戶送出新訊息、重置或暫停時取消
+"""
+
+import os
+import threading
+import time
+
+from tools.metrics import metrics
+
+# 分析完成到推送下一題的秒數；小於 0 時停用伺服器推送，由客戶端自行索取
+DEFAULT_DELAY = float(os.environ.get("AUTO_ADVANCE_DELAY", "5"))
+# 超過此秒數未再送出設定的用戶，清除其「自動下一題」設定（回到預設開啟）；
+# 客戶端每則訊息都會附上設定，清除後下一則訊息即恢復
+DEFAULT_IDLE_TTL = float(os.environ.get("AUTO_ADVANCE_IDLE_TTL", "3600"))
+
+
+class _Job:
+    """一個待執行的推送排程"""
+
+    __slots__ = ("timer", "due")
+
+    def __init__(self, timer, due):
+        self.timer = timer
+        self.due = due
+
+
+class AutoAdvanceScheduler:
+    """以用戶 id 區分的延遲推送排程"""
+
+    def __init__(self, delay=DEFAULT_DELAY, idle_ttl=DEFAULT_IDLE_TTL):
+        self.delay = delay
+        self.idle_ttl = idle_ttl
+        self._jobs = {}
+        # 用戶 id -> (是否開啟, 設定時間)
+        self._enabled = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.delay >= 0
+
+    def set_user_enabled(self, user_id, enabled):
+        """記錄客戶端的「自動下一題」設定（只影響作答後的下一題）"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept_at >= self.idle_ttl:
+                self._sweep_locked(now)
+            self._enabled[str(user_id)] = (bool(enabled), now)
+
+    def user_enabled(self, user_id):
+        entry = self._enabled.get(str(user_id))
+        return True if entry is None else entry[0]
+
+    def schedule(self, user_id, callback, delay=None):
+        """
+        延遲後在背景執行緒呼叫 callback(user_id, job)，取代該用戶先前的排程。
+
+        callback 應在持有會話鎖後以 claim(user_id, job) 確認排程仍有效再執行
+        """
+        delay = self.delay if delay is None else delay
+        if delay < 0:
+            return None
+        user_id = str(user_id)
+        with self._lock:
+            self._cancel_locked(user_id)
+            job = _Job(None, time.monotonic() + delay)
+            job.timer = threading.Timer(
+                delay, self._fire, args=(user_id, job, callback)
+            )
+            job.timer.daemon = True
+            self._jobs[user_id] = job
+            job.timer.start()
+        metrics.increment("auto_advance.scheduled")
+        return job
+
+    def cancel(self, user_id):
+        """取消該用戶待執行的排程，回傳是否有排程被取消"""
+        with self._lock:
+            cancelled = self._cancel_locked(str(user_id))
+        if cancelled:
+            metrics.increment("auto_advance.cancelled")
+        return cancelled
+
+    def claim(self, user_id, job):
+        """排程仍有效時移除並回傳 True；已被取消或取代則回傳 False"""
+        user_id = str(user_id)
+        with self._lock:
+            if self._jobs.get(user_id) is not job:
+                return False
+            del self._jobs[user_id]
+            return True
+
+    def remaining(self, user_id):
+        """距離推送的秒數；沒有排程時回傳 None"""
+        job = self._jobs.get(str(user_id))
+        if job is None:
+            return None
+        return max(0.0, job.due - time.monotonic())
+
+    def __len__(self):
+        """目前保留「自動下一題」設定的用戶數"""
+        return len(self._enabled)
+
+    def _sweep_locked(self, now):
+        """清除至少 idle_ttl 秒未更新且沒有待執行排程的設定"""
+        self._enabled = {
+            user_id: entry
+            for user_id, entry in self._enabled.items()
+            if now - entry[1] < self.idle_ttl or user_id in self._jobs
+        }
+        self._swept_at = now
+
+    def _cancel_locked(self, user_id):
+        job = self._jobs.pop(user_id, None)
+        if job is None:
+            return False
+        job.timer.cancel()
+        return True
+
+    def _fire(self, user_id, job, callback):
+        if self._jobs.get(user_id) is not job:
+            return
+        try:
+            callback(user_id, job)
+        except Exception as e:
+            metrics.increment("auto_advance.errors")
+            print(f"⚠️ 自動推送下一題失敗: {e}")
+
+
+# 全域排程器實例
+auto_advance = AutoAdvanceScheduler()
@@ -0,0 +1,228 @@
+"""
+會話事件匯流排
+每位用戶一條依序編號的事件流（狀態變更、回應、分析片段、題目就緒等），
+推送給該用戶的即時連線；最近的事件保留在環狀緩衝區，斷線重連時依序號補送
+"""
+
+import asyncio
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from tools.metrics import metrics
+
+
+class Subscription:
+    """一條即時連線的事件佇列"""
+
+    def __init__(self, bus, user_id, max_pending):
+        self.bus = bus
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        """取得下一個事件；逾時回傳 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+    def _offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # 客戶端接收太慢：標記溢位，連線端應關閉並讓客戶端以序號重連補送
+            self.overflowed = True
+            metrics.increment("event_bus.overflow")
+
+
+class AsyncSubscription(Subscription):
+    """
+    事件迴圈中的連線（ASGI 應用）使用的事件佇列：以 await 等待事件，不佔用執行緒。
+    發佈可能來自任一執行緒，事件一律交由所屬的事件迴圈放入佇列
+    """
+
+    def __init__(self, bus, user_id, max_pending, loop):
+        self.bus = bus
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    async def get(self, timeout=None):
+        """取得下一個事件；逾時回傳 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _offer(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 事件迴圈已關閉：連線已不存在
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.increment("event_bus.overflow")
+
+
+# 沒有連線且超過此秒數沒有新事件的用戶，清除其補送緩衝與最後狀態
+DEFAULT_IDLE_TTL = float(os.environ.get("EVENT_BUS_IDLE_TTL", "3600"))
+
+
+class SessionEventBus:
+    """以用戶 id 區分的事件發佈 / 訂閱與補送緩衝"""
+
+    def __init__(self, buffer_size=200, max_pending=500, idle_ttl=DEFAULT_IDLE_TTL):
+        self.buffer_size = buffer_size
+        self.max_pending = max_pending
+        self.idle_ttl = idle_ttl
+        # 序號只在同一行程內有效；重啟後 epoch 改變，客戶端需重新同步
+        self.epoch = uuid.uuid4().hex[:12]
+        self._sequence = itertools.count(1)
+        self._last_seq = 0
+        self._buffers = {}
+        self._subscribers = {}
+        self._states = {}
+        # 用戶最後一次發佈事件或中斷連線的時間
+        self._touched = {}
+        self._swept_at = time.monotonic()
+        # 最近一次清除時的最後序號：更早的補送起點可能已被清除
+        self._swept_seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event_type, data=None, replay=True):
+        """
+        發佈事件並推送給該用戶的所有連線，回傳事件序號。
+
+        replay 為假的事件（例如模型輸出片段）只推送給目前的連線，不進入補送緩衝，
+        避免大量片段擠掉重連時需要補送的狀態與回應
+        """
+        user_id = str(user_id)
+        with self._lock:
+            self._touch_locked(user_id)
+            event = {
+                "seq": next(self._sequence),
+                "type": event_type,
+                "data": data or {},
+                "ts": time.time(),
+            }
+            self._last_seq = event["seq"]
+            if replay:
+                buffer = self._buffers.get(user_id)
+                if buffer is None:
+                    buffer = self._buffers[user_id] = deque(maxlen=self.buffer_size)
+                buffer.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription._offer(event)
+        metrics.increment(f"event_bus.published.{event_type}")
+        return event["seq"]
+
+    def publish_state(self, user_id, state):
+        """狀態與上次發佈的不同時才發佈 state 事件"""
+        user_id = str(user_id)
+        with self._lock:
+            if self._states.get(user_id) == state:
+                return None
+            self._states[user_id] = state
+        return self.publish(user_id, "state", {"current_state": state})
+
+    def subscribe(self, user_id, after_seq=None, epoch=None, loop=None):
+        """
+        訂閱用戶的事件流，回傳 (訂閱, 待補送事件, 是否可完整補送)。
+
+        after_seq 與 epoch 為客戶端最後收到的序號與當時的 epoch；
+        epoch 不同（伺服器已重啟）或緩衝區已不含其後第一個事件時
+        回傳 False，客戶端應改以 GET /api/interview 重新同步。
+        傳入 loop 時回傳在該事件迴圈中以 await 取得事件的 AsyncSubscription
+        """
+        user_id = str(user_id)
+        if loop is None:
+            subscription = Subscription(self, user_id, self.max_pending)
+        else:
+            subscription = AsyncSubscription(self, user_id, self.max_pending, loop)
+        with self._lock:
+            self._touch_locked(user_id)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            buffer = list(self._buffers.get(user_id, ()))
+            swept_seq = self._swept_seq
+        metrics.set_gauge("event_bus.connections", self.connection_count())
+
+        if after_seq is None:
+            return subscription, [], True
+        if epoch and epoch != self.epoch:
+            return subscription, [], False
+        if not buffer and after_seq < swept_seq:
+            # 緩衝區可能已因閒置被清除
+            return subscription, [], False
+        missed = [event for event in buffer if event["seq"] > after_seq]
+        # 序號為全域遞增，無法得知中間是否有其他用戶的事件；
+        # 以緩衝區是否被截斷判斷能否完整補送
+        complete = len(buffer) < self.buffer_size or (
+            bool(buffer) and buffer[0]["seq"] <= after_seq
+        )
+        return subscription, missed, complete
+
+    def has_subscribers(self, user_id):
+        """該用戶目前是否有即時連線"""
+        with self._lock:
+            return bool(self._subscribers.get(str(user_id)))
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def __len__(self):
+        """目前保留補送緩衝或狀態的用戶數"""
+        return len(self._touched)
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+            # 閒置時間從最後一條連線中斷起算
+            self._touched[subscription.user_id] = time.monotonic()
+        metrics.set_gauge("event_bus.connections", self.connection_count())
+
+    def _touch_locked(self, user_id):
+        now = time.monotonic()
+        self._touched[user_id] = now
+        if now - self._swept_at >= self.idle_ttl:
+            self._sweep_locked(now)
+
+    def _sweep_locked(self, now):
+        """清除沒有連線且閒置至少 idle_ttl 秒的用戶（最多每 idle_ttl 秒一次）"""
+        idle = [
+            user_id
+            for user_id, touched in self._touched.items()
+            if now - touched >= self.idle_ttl and user_id not in self._subscribers
+        ]
+        for user_id in idle:
+            del self._touched[user_id]
+            self._buffers.pop(user_id, None)
+            self._states.pop(user_id, None)
+        if idle:
+            self._swept_seq = self._last_seq
+            metrics.increment("event_bus.evicted", len(idle))
+        self._swept_at = now
+
+
+# 全域事件匯流排實例
+event_bus = SessionEventBus()
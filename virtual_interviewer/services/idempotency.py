@@ -0,0 +1,147 @@
+"""
+請求冪等快取
+重複送出的同一請求（相同用戶與請求識別碼）直接回傳先前的回應，不再重新處理；
+仍在處理中的重複請求會等待同一個結果（single-flight），不會再次呼叫 LLM
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from tools.metrics import metrics
+
+
+def content_key(*parts):
+    """以請求內容計算識別碼，供未帶請求識別碼的客戶端去除重複請求"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return "sha256:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    """以 (用戶 id, 請求識別碼) 為鍵、有存活時間與容量上限的回應快取"""
+
+    def __init__(self, ttl=600, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, request_id):
+        """取得快取的回應；不存在或已過期時回傳 None"""
+        if not request_id:
+            return None
+        key = (str(user_id), str(request_id))
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, user_id, request_id, response, ttl=None):
+        """儲存回應；超過容量時淘汰最舊的項目"""
+        if not request_id:
+            return
+        key = (str(user_id), str(request_id))
+        with self._lock:
+            self._put_locked(key, response, ttl)
+
+    def run(self, user_id, request_id, fn, cacheable=None, ttl=None):
+        """
+        以冪等方式執行 fn。
+
+        已有快取回應時直接回傳；相同請求仍在處理中時等待該結果；
+        否則執行 fn，並在 cacheable(結果) 為真時快取 ttl 秒（預設為 self.ttl）。
+        沒有請求識別碼時直接執行 fn。
+        """
+        if not request_id:
+            return fn()
+
+        key = (str(user_id), str(request_id))
+        cached, future, owner = self._claim(key)
+        if cached is not None:
+            return cached
+        if not owner:
+            return future.result()
+
+        try:
+            response = fn()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        self._settle(key, future, response, cacheable, ttl)
+        return response
+
+    async def arun(self, user_id, request_id, fn, cacheable=None, ttl=None):
+        """
+        run() 的非同步版本：fn 回傳 awaitable。
+
+        與 run() 共用快取與處理中的請求，等待重複請求時不佔用執行緒
+        """
+        if not request_id:
+            return await fn()
+
+        key = (str(user_id), str(request_id))
+        cached, future, owner = self._claim(key)
+        if cached is not None:
+            return cached
+        if not owner:
+            # shield：等待者被取消時不可取消其他請求共用的結果
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            response = await fn()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        self._settle(key, future, response, cacheable, ttl)
+        return response
+
+    def _claim(self, key):
+        """回傳 (快取回應, 共用結果, 是否由本請求執行)"""
+        with self._lock:
+            cached = self._get_locked(key)
+            if cached is not None:
+                metrics.increment("idempotency.replayed")
+                return cached, None, False
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            metrics.increment("idempotency.coalesced")
+        return None, future, owner
+
+    def _fail(self, key, future, error):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        future.set_exception(error)
+
+    def _settle(self, key, future, response, cacheable, ttl):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if cacheable is None or cacheable(response):
+                self._put_locked(key, response, ttl)
+        future.set_result(response)
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return response
+
+    def _put_locked(self, key, response, ttl):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# 全域冪等快取實例
+idempotency_cache = IdempotencyCache()
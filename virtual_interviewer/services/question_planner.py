@@ -0,0 +1,102 @@
+"""
+依履歷挑選面試題目的服務
+"""
+
+import json
+import math
+from collections import Counter
+
+from fast_agent_bridge import set_question_plan
+from tools.question_index import question_index
+from tools.text_tokenizer import tokenize
+
+from models import User
+
+
+class QuestionPlanner:
+    """根據用戶的期望職位、關鍵字與技能，從題庫中挑出最相關的題目"""
+
+    # 各履歷欄位在查詢向量中的權重
+    FIELD_WEIGHTS = {
+        "desired_position": 2.0,
+        "keywords": 2.0,
+        "skill_name": 2.0,
+        "job_skills": 1.5,
+        "skill_description": 1.0,
+        "position_title": 1.0,
+    }
+
+    # 類別層級共享：用戶 id -> 查詢向量（履歷建立後不會改變，計算一次即可）
+    profile_vectors = {}
+
+    def __init__(self, plan_size=10):
+        self.plan_size = plan_size
+
+    def plan_session(self, user_id):
+        """為面試會話挑選題目並交給題目預取流程；非履歷用戶回傳 0"""
+        if not str(user_id).isdigit():
+            return 0
+
+        vector = self.get_profile_vector(int(user_id))
+        if not vector:
+            return 0
+
+        candidates = question_index.search_vector(vector, self.plan_size * 5)
+        questions = self._diversify(candidates)
+        set_question_plan(user_id, questions)
+        print(f"🎯 用戶 {user_id} 已依履歷挑選 {len(questions)} 題")
+        return len(questions)
+
+    def get_profile_vector(self, user_id):
+        """取得（或建立並快取）用戶履歷的查詢向量"""
+        if user_id not in self.profile_vectors:
+            user = User.query.get(user_id)
+            if user is None:
+                return {}
+            self.profile_vectors[user_id] = self._build_profile_vector(user)
+        return self.profile_vectors[user_id]
+
+    def _build_profile_vector(self, user):
+        """將履歷欄位斷詞後加權合併為查詢向量"""
+        fields = [
+            ("desired_position", user.desired_position),
+            ("keywords", self._parse_keywords(user.keywords)),
+        ]
+        for experience in user.work_experiences:
+            fields.append(("job_skills", experience.job_skills))
+            fields.append(("position_title", experience.position_title))
+        for skill in user.skills:
+            fields.append(("skill_name", skill.skill_name))
+            fields.append(("skill_description", skill.skill_description))
+
+        vector = Counter()
+        for field, text in fields:
+            for term, count in Counter(tokenize(text or "")).items():
+                # 以對數壓縮重複詞，避免單一長欄位主導排序
+                vector[term] += self.FIELD_WEIGHTS[field] * (1 + math.log(count))
+        return dict(vector)
+
+    def _diversify(self, candidates):
+        """依相關度挑題，但限制單一題庫來源的題數，讓題目涵蓋履歷中的多項技能"""
+        per_source_limit = max(2, self.plan_size // 3)
+        picked, deferred, counts = [], [], Counter()
+        for question in candidates:
+            if counts[question["source"]] < per_source_limit:
+                counts[question["source"]] += 1
+                picked.append(question)
+            else:
+                deferred.append(question)
+        # 來源不足時以剩餘的高分題目補滿
+        return (picked + deferred)[: self.plan_size]
+
+    def _parse_keywords(self, keywords):
+        """keywords 欄位可能是 JSON 陣列或一般文字"""
+        if not keywords:
+            return ""
+        try:
+            parsed = json.loads(keywords)
+        except (TypeError, ValueError):
+            return keywords
+        if isinstance(parsed, list):
+            return " ".join(str(k) for k in parsed)
+        return str(parsed)
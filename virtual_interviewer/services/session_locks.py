@@ -0,0 +1,129 @@
+"""
+用戶會話鎖
+同一用戶的請求依序處理，不同用戶仍可完全平行；
+同步請求（執行緒）與 ASGI 應用的非同步請求（協程）共用同一把鎖
+"""
+
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Entry:
+    """
+    一位用戶的鎖：持有者、重入深度、依序等待的 (持有者, 喚醒函式)，
+    以及目前持有或等待它的請求數
+    """
+
+    __slots__ = ("owner", "depth", "waiters", "refs")
+
+    def __init__(self):
+        self.owner = None
+        self.depth = 0
+        self.waiters = deque()
+        self.refs = 0
+
+
+class SessionLocks:
+    """
+    每位用戶各自一把鎖：不同用戶的請求永不互相等待。
+
+    持有者為執行緒或 asyncio 工作，同一持有者可重入（例如重置時清除資料）；
+    釋放時直接交給最早等待的請求，先到先處理。協程持有鎖期間交給執行緒池
+    執行的同步處理不可再取得同一把鎖。鎖在沒有請求持有或等待時即移除，
+    記憶體用量只與同時進行中的用戶數有關
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, user_id):
+        """在 with 區塊內獨佔該用戶的會話狀態"""
+        key = str(user_id)
+        event = None
+        with self._guard:
+            entry = self._enter_locked(key, threading.get_ident())
+            if entry.owner != threading.get_ident():
+                event = threading.Event()
+                entry.waiters.append((threading.get_ident(), event.set))
+        if event is not None:
+            event.wait()
+        try:
+            yield
+        finally:
+            self._release(key, entry)
+
+    @asynccontextmanager
+    async def ahold(self, user_id):
+        """hold() 的非同步版本：等待期間讓出事件迴圈，不佔用執行緒"""
+        key = str(user_id)
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        waiter = None
+        with self._guard:
+            entry = self._enter_locked(key, task)
+            if entry.owner is not task:
+                future = loop.create_future()
+                waiter = (task, lambda: loop.call_soon_threadsafe(_wake, future))
+                entry.waiters.append(waiter)
+        if waiter is not None:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._guard:
+                    handed_over = entry.owner is task
+                    if not handed_over:
+                        entry.waiters.remove(waiter)
+                        self._leave_locked(key, entry)
+                if handed_over:
+                    # 鎖已交給此工作：轉交下一位等待者
+                    self._release(key, entry)
+                raise
+        try:
+            yield
+        finally:
+            self._release(key, entry)
+
+    def __len__(self):
+        """目前有請求持有或等待鎖的用戶數"""
+        return len(self._entries)
+
+    def _enter_locked(self, key, owner):
+        """登記請求；鎖無人持有或已由 owner 持有時直接取得"""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        entry.refs += 1
+        if entry.owner is None or entry.owner == owner:
+            entry.owner = owner
+            entry.depth += 1
+        return entry
+
+    def _release(self, key, entry):
+        with self._guard:
+            entry.depth -= 1
+            if entry.depth == 0:
+                if entry.waiters:
+                    entry.owner, wake = entry.waiters.popleft()
+                    entry.depth = 1
+                    wake()
+                else:
+                    entry.owner = None
+            self._leave_locked(key, entry)
+
+    def _leave_locked(self, key, entry):
+        entry.refs -= 1
+        if entry.refs == 0:
+            del self._entries[key]
+
+
+# 全域會話鎖實例（所有 API 資源共用）
+session_locks = SessionLocks()
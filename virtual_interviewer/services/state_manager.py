@@ -2,8 +2,12 @@
 面試狀態管理器
 """
 
+import time
 from enum import Enum
 
+from tools.keyword_matcher import KeywordMatcher
+from tools.metrics import metrics
+
 
 class InterviewState(Enum):
     """面試狀態枚舉"""
@@ -15,6 +19,119 @@ class InterviewState(Enum):
     COMPLETED = "completed"  # 面試完成階段
 
 
+# 各種意圖的關鍵字（訊息中包含任一關鍵字即視為該意圖）
+INTENT_KEYWORDS = {
+    "start": [
+        "開始面試",
+        "開始",
+        "start_interview",
+        "開始練習",
+        "準備好了",
+        "可以開始了",
+    ],
+    "start_questioning": ["開始面試", "開始問答", "進入面試", "開始提問", "給我問題"],
+    "request_question": [
+        "請給我問題",
+        "開始問答",
+        "開始面試",
+        "下一題",
+        "下一個問題",
+        "給我問題",
+    ],
+    "exit": ["退出", "結束", "完成", "不想繼續", "停止"],
+    "restart": ["重新開始", "重新來過", "重新面試", "重來"],
+    "restart_en": ["restart"],
+}
+
+# 完成自我介紹的指示（需完全相符）
+INTRO_DONE_PHRASES = {
+    "介紹完了",
+    "介紹完成",
+    "我說完了",
+    "說完了",
+    "完成介紹",
+    "結束介紹",
+}
+
+# 整句重置指令（需完全相符，不分大小寫），在任何狀態下都會清除所有面試資料
+RESET_PHRASES = {"重新開始", "重新來過", "重新面試", "重來", "restart", "reset"}
+
+# 建立一次，所有請求共用：單次掃描即可取得訊息命中的所有意圖
+intent_matcher = KeywordMatcher(INTENT_KEYWORDS)
+
+
+def classify_intents(user_message):
+    """將訊息分類為意圖集合（關鍵字意圖 + 需完全相符的指令）"""
+    intents = intent_matcher.matched_groups(user_message)
+    if user_message in INTRO_DONE_PHRASES:
+        intents.add("intro_done")
+    return frozenset(intents)
+
+
+# 狀態轉換表：(目前狀態, 意圖) -> (下一個狀態, 處理方法名稱)
+# 處理方法為 InterviewAPI 上的方法，處理轉換後狀態的訊息；
+# 意圖為 None 的項目是該狀態沒有命中任何轉換時的預設處理。新增狀態時只需在此登記
+STATE_TRANSITIONS = {
+    (InterviewState.WAITING, None): (
+        InterviewState.WAITING,
+        "_process_waiting_state",
+    ),
+    (InterviewState.WAITING, "start"): (
+        InterviewState.INTRO,
+        "_process_intro_state",
+    ),
+    (InterviewState.INTRO, None): (
+        InterviewState.INTRO,
+        "_process_intro_state",
+    ),
+    (InterviewState.INTRO, "intro_done"): (
+        InterviewState.INTRO_ANALYSIS,
+        "_process_intro_analysis_state",
+    ),
+    (InterviewState.INTRO_ANALYSIS, None): (
+        InterviewState.INTRO_ANALYSIS,
+        "_process_intro_analysis_state",
+    ),
+    (InterviewState.INTRO_ANALYSIS, "start_questioning"): (
+        InterviewState.QUESTIONING,
+        "_process_questioning_state",
+    ),
+    (InterviewState.QUESTIONING, None): (
+        InterviewState.QUESTIONING,
+        "_process_questioning_state",
+    ),
+    (InterviewState.QUESTIONING, "exit"): (
+        InterviewState.COMPLETED,
+        "_process_completed_state",
+    ),
+    (InterviewState.COMPLETED, None): (
+        InterviewState.COMPLETED,
+        "_process_completed_state",
+    ),
+}
+
+# 不分狀態都適用的轉換：意圖 -> 下一個狀態（該狀態自身的轉換優先）
+GLOBAL_TRANSITIONS = {"restart": InterviewState.WAITING}
+
+
+def resolve_transition(state, intents):
+    """
+    查詢訊息在目前狀態下的轉換，回傳 (下一個狀態, 處理方法名稱)；
+    沒有命中轉換時下一個狀態即目前狀態，未知狀態回傳 (None, None)。
+
+    每個命中的意圖只需一次查表；同一狀態的轉換意圖應互不重疊
+    """
+    for intent in intents:
+        transition = STATE_TRANSITIONS.get((state, intent))
+        if transition is not None:
+            return transition
+    for intent in intents:
+        target = GLOBAL_TRANSITIONS.get(intent)
+        if target is not None:
+            return STATE_TRANSITIONS[(target, None)]
+    return STATE_TRANSITIONS.get((state, None), (None, None))
+
+
 class InterviewStateManager:
     """面試狀態管理器"""
 
@@ -83,67 +200,26 @@ class InterviewStateManager:
 
         print(f"🧹 用戶 {user_id} 的所有狀態數據已完全清空並重置")
 
-    def transition_state(self, user_id, user_message):
-        """根據用戶訊息判斷是否需要狀態轉換"""
-        lower_message = user_message.lower()
+    def transition_state(self, user_id, user_message, intents=None):
+        """
+        根據用戶訊息進行狀態轉換（查詢狀態轉換表），
+        回傳 (轉換後的狀態, 處理方法名稱)；狀態未知時處理方法為 None
+        """
+        start = time.perf_counter()
+        if intents is None:
+            intents = classify_intents(user_message)
         current_state = self.get_user_state(user_id)
 
-        # 從 WAITING 轉換到 INTRO（按下開始面試按鈕）
-        if current_state == InterviewState.WAITING:
-            start_keywords = [
-                "開始面試",
-                "開始",
-                "start_interview",
-                "開始練習",
-                "準備好了",
-                "可以開始了",
-            ]
-            if any(keyword in lower_message for keyword in start_keywords):
-                self.set_user_state(user_id, InterviewState.INTRO)
-                return True
-
-        # 從 INTRO 轉換到 INTRO_ANALYSIS（完成自我介紹）
-        elif current_state == InterviewState.INTRO:
-            # 接受多個同義詞
-            done_phrases = {
-                "介紹完了",
-                "介紹完成",
-                "我說完了",
-                "說完了",
-                "完成介紹",
-                "結束介紹",
-            }
-            if user_message in done_phrases:
-                self.set_user_state(user_id, InterviewState.INTRO_ANALYSIS)
-                return True
-
-        # 從 INTRO_ANALYSIS 轉換到 QUESTIONING（用戶要求開始面試）
-        elif current_state == InterviewState.INTRO_ANALYSIS:
-            start_interview_keywords = [
-                "開始面試",
-                "開始問答",
-                "進入面試",
-                "開始提問",
-                "給我問題",
-            ]
-            if any(keyword in lower_message for keyword in start_interview_keywords):
-                self.set_user_state(user_id, InterviewState.QUESTIONING)
-                return True
-
-        # 從 QUESTIONING 轉換到 COMPLETED（用戶要求退出）
-        elif current_state == InterviewState.QUESTIONING:
-            exit_keywords = ["退出", "結束", "完成", "不想繼續", "停止"]
-            if any(keyword in lower_message for keyword in exit_keywords):
-                self.set_user_state(user_id, InterviewState.COMPLETED)
-                return True
-
-        # 重新開始的情況
-        restart_keywords = ["重新開始", "重新來過", "重新面試", "重來"]
-        if any(keyword in lower_message for keyword in restart_keywords):
-            self.set_user_state(user_id, InterviewState.WAITING)
-            return True
-
-        return False
+        next_state, handler = resolve_transition(current_state, intents)
+        if next_state is None:
+            next_state = current_state
+        elif next_state is not current_state:
+            self.set_user_state(user_id, next_state)
+            metrics.increment(
+                f"interview.transition.{current_state.value}.{next_state.value}"
+            )
+        metrics.observe("interview.transition_ms", (time.perf_counter() - start) * 1000)
+        return next_state, handler
 
     def get_system_prompt(self, state: InterviewState) -> str:
         """根據當前狀態獲取系統提示詞"""
@@ -0,0 +1,229 @@
+"""
+靜態資源管線
+啟動時為 static/ 下的檔案計算內容雜湊，以帶雜湊的檔名提供並設定長效快取；
+內容與預先壓縮（gzip/brotli）的版本保存在記憶體中，重複載入不需再讀檔或壓縮。
+頁面模板只渲染一次，以 ETag 驗證快取，重新整理時只回 304
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+from flask import render_template, request, send_from_directory
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+from tools.metrics import metrics
+
+# 內容雜湊改變時檔名也會改變，舊檔名可永久快取
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 頁面與未經管線處理的檔案：可快取但每次使用前需向伺服器驗證
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 小於此位元組數的內容壓縮效益有限，不產生壓縮版本
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+
+
+class _Asset:
+    """一份已處理的資源：原始內容、壓縮版本與 ETag"""
+
+    __slots__ = ("body", "encodings", "etag", "mimetype")
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.encodings = {}
+        if len(body) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+            if BROTLI_AVAILABLE:
+                self.encodings["br"] = brotli.compress(body, quality=11)
+            self.encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+
+    def response(self, app, cache_control):
+        """依 If-None-Match 與 Accept-Encoding 產生回應"""
+        if self.etag in request.if_none_match:
+            metrics.increment("static.not_modified")
+            response = app.response_class(status=304)
+        else:
+            body, encoding = self.body, None
+            accepted = request.accept_encodings
+            for name in ("br", "gzip"):
+                if name in self.encodings and accepted[name]:
+                    body, encoding = self.encodings[name], name
+                    break
+            response = app.response_class(body, mimetype=self.mimetype)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            metrics.increment("static.served")
+
+        response.set_etag(self.etag)
+        response.headers["Cache-Control"] = cache_control
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+class StaticAssetPipeline:
+    """
+    為 Flask 應用提供雜湊檔名的靜態資源與快取頁面。
+
+    url_for("static", filename="js/app.js") 會產生 /static/js/app.<雜湊>.js；
+    原始檔名仍可存取（需驗證快取），其他未處理的檔案交由 Flask 原本的方式提供。
+    來源檔案有變動時（最多每秒檢查一次修改時間）重新建置，開發時修改不需重啟；
+    Jinja 會自動重新載入模板時（除錯模式或 TEMPLATES_AUTO_RELOAD），模板變動也會
+    清除頁面快取，否則模板與 Jinja 本身一樣需重啟才會更新
+    """
+
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self):
+        self.app = None
+        self.static_folder = None
+        self._manifest = {}  # 原始路徑 -> 雜湊路徑
+        self._assets = {}  # 雜湊路徑 -> _Asset
+        self._mtimes = {}
+        self._template_mtimes = {}
+        self._pages = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.static_folder = app.static_folder
+        self.build()
+        app.url_defaults(self._hashed_url)
+        # 取代 Flask 預設的靜態檔案視圖，url_for("static", ...) 的端點名稱不變
+        app.view_functions["static"] = self.serve
+
+    def build(self):
+        """掃描 static/ 並建立雜湊檔名、預先壓縮的內容"""
+        started = time.perf_counter()
+        manifest, assets, mtimes = {}, {}, {}
+        for path, full_path in self._walk():
+            with open(full_path, "rb") as f:
+                body = f.read()
+            mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            asset = _Asset(body, mimetype)
+            stem, ext = os.path.splitext(path)
+            hashed = f"{stem}.{asset.etag[:12]}{ext}"
+            manifest[path] = hashed
+            assets[hashed] = asset
+            mtimes[path] = os.stat(full_path).st_mtime_ns
+
+        with self._lock:
+            self._manifest = manifest
+            self._assets = assets
+            self._mtimes = mtimes
+            # 頁面中引用的雜湊檔名可能已改變
+            self._pages = {}
+            self._checked_at = time.monotonic()
+        metrics.observe("static.build_ms", (time.perf_counter() - started) * 1000)
+        return manifest
+
+    def render_page(self, template_name, **context):
+        """渲染並快取頁面模板（模板只依賴靜態內容時使用）"""
+        self._refresh_if_stale()
+        key = (template_name, tuple(sorted(context.items())))
+        with self._lock:
+            page = self._pages.get(key)
+            pages = self._pages
+        if page is None:
+            html = render_template(template_name, **context).encode("utf-8")
+            page = _Asset(html, "text/html; charset=utf-8")
+            with self._lock:
+                # 渲染期間若已重新建置，舊內容不寫入新的快取
+                if pages is self._pages:
+                    self._pages[key] = page
+        return page.response(self.app, REVALIDATE_CACHE_CONTROL)
+
+    def serve(self, filename):
+        """靜態檔案視圖：雜湊檔名長效快取，原始檔名需驗證，其餘交給 Flask"""
+        self._refresh_if_stale()
+        asset = self._assets.get(filename)
+        if asset is not None:
+            return asset.response(self.app, IMMUTABLE_CACHE_CONTROL)
+
+        hashed = self._manifest.get(filename)
+        if hashed is not None:
+            return self._assets[hashed].response(self.app, REVALIDATE_CACHE_CONTROL)
+
+        try:
+            return send_from_directory(self.static_folder, filename)
+        except NotFound:
+            metrics.increment("static.not_found")
+            raise
+
+    def manifest(self):
+        """原始路徑與雜湊路徑的對照表"""
+        return dict(self._manifest)
+
+    # 內部 -----------------------------------------------------------------
+    def _hashed_url(self, endpoint, values):
+        if endpoint != "static":
+            return
+        hashed = self._manifest.get(values.get("filename"))
+        if hashed is not None:
+            values["filename"] = hashed
+
+    def _walk(self, folder=None):
+        folder = folder or self.static_folder
+        if not folder or not os.path.isdir(folder):
+            return
+        for root, _, files in os.walk(folder):
+            for name in files:
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, folder)
+                yield path.replace(os.sep, "/"), full_path
+
+    def _scan_mtimes(self, folder=None):
+        mtimes = {}
+        for path, full_path in self._walk(folder):
+            try:
+                mtimes[path] = os.stat(full_path).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _template_folder(self):
+        """Jinja 會自動重新載入模板時回傳模板目錄，否則回傳 None（不需檢查）"""
+        if self.app is None or not self.app.jinja_env.auto_reload:
+            return None
+        if not self.app.template_folder:
+            return None
+        return os.path.join(self.app.root_path, self.app.template_folder)
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        if self._scan_mtimes() != self._mtimes:
+            print("🔄 靜態資源已變更，重新建置")
+            self.build()
+
+        template_folder = self._template_folder()
+        if template_folder is not None:
+            templates = self._scan_mtimes(template_folder)
+            with self._lock:
+                if templates != self._template_mtimes:
+                    self._template_mtimes = templates
+                    self._pages = {}
+
+
+# 全域實例：於 create_app 中呼叫 init_app
+static_assets = StaticAssetPipeline()
@@ -267,6 +267,178 @@ const Storage = {
     }
 };
 
+// 面試即時通道（WebSocket）：同一條連線送出訊息並接收伺服器推送，斷線後依序號補送；
+// 伺服器未啟用 WebSocket 時改以 SSE 只接收推送
+const InterviewSocket = {
+    ws: null,
+    events: null,
+    userId: null,
+    epoch: null,
+    lastSeq: null,
+    handlers: {},
+    pending: {},
+    retryDelay: 1000,
+    failedAttempts: 0,
+    everOpened: false,
+
+    /**
+     * 建立連線；伺服器未啟用即時通道時數次失敗後停止重試，改用 HTTP
+     */
+    connect: function(userId) {
+        if (!('WebSocket' in window)) return;
+        if (this.userId !== userId) {
+            this.epoch = null;
+            this.lastSeq = null;
+        }
+        this.userId = userId;
+        if (this.ws) return;
+
+        const params = new URLSearchParams({ user_id: userId });
+        if (this.epoch && this.lastSeq !== null) {
+            params.set('epoch', this.epoch);
+            params.set('last_seq', this.lastSeq);
+        }
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const ws = new WebSocket(`${protocol}//${window.location.host}/ws/interview?${params}`);
+
+        ws.onopen = () => {
+            this.everOpened = true;
+            this.failedAttempts = 0;
+            this.retryDelay = 1000;
+        };
+        ws.onmessage = (event) => {
+            try {
+                this._dispatch(JSON.parse(event.data));
+            } catch (e) {
+                console.error('即時通道訊息處理失敗:', e);
+            }
+        };
+        ws.onclose = () => {
+            this.ws = null;
+            this.failedAttempts += 1;
+            if (!this.everOpened && this.failedAttempts >= 3) {
+                console.log('ℹ️ WebSocket 不可用，訊息改用 HTTP、推送改用 SSE');
+                this._rejectPending();
+                this._openEventStream();
+                return;
+            }
+            // 尚未收到回應的請求保留，重連後由補送的 response 事件完成
+            setTimeout(() => this.connect(this.userId), this.retryDelay);
+            this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+        };
+        this.ws = ws;
+    },
+
+    /**
+     * 連線是否可用
+     */
+    isOpen: function() {
+        return !!this.ws && this.ws.readyState === WebSocket.OPEN;
+    },
+
+    /**
+     * 註冊伺服器事件處理器（state、response、analysis_delta、question_ready、reset、resync）
+     */
+    on: function(type, handler) {
+        (this.handlers[type] = this.handlers[type] || []).push(handler);
+        return this;
+    },
+
+    /**
+     * 取消伺服器排程的自動推送下一題
+     */
+    cancelAutoAdvance: function() {
+        if (this.isOpen()) {
+            this.ws.send(JSON.stringify({ type: 'cancel_auto_advance' }));
+            return;
+        }
+        $.ajax({
+            url: API_BASE_URL + '/interview/auto-advance',
+            method: 'DELETE',
+            contentType: 'application/json',
+            data: JSON.stringify({ user_id: this.userId || 'default_user' })
+        });
+    },
+
+    /**
+     * 送出面試訊息，回傳可 abort 的 promise，以對應 request_id 的 response 事件完成
+     */
+    request: function(data) {
+        const deferred = $.Deferred();
+        const requestId = data.request_id;
+        this.pending[requestId] = deferred;
+        this.ws.send(JSON.stringify(Object.assign({ type: 'message' }, data)));
+
+        const promise = deferred.promise();
+        promise.abort = () => {
+            delete this.pending[requestId];
+            deferred.reject({ status: 0, statusText: 'abort' });
+        };
+        return promise;
+    },
+
+    _dispatch: function(message) {
+        if (message.seq) {
+            this.lastSeq = message.seq;
+        }
+        switch (message.type) {
+            case 'hello':
+                this.epoch = message.epoch;
+                break;
+            case 'ping':
+                this.ws.send(JSON.stringify({ type: 'pong' }));
+                return;
+            case 'resync':
+                // 伺服器已重啟或遺漏過多事件：在途請求無法補送回應，
+                // 畫面由 resync 事件處理器以 GET /api/interview 重新載入
+                this._rejectPending();
+                break;
+            case 'response': {
+                const deferred = this.pending[message.data.request_id];
+                if (deferred) {
+                    delete this.pending[message.data.request_id];
+                    const body = message.data.body;
+                    if (message.data.status_code === 200) {
+                        deferred.resolve(body);
+                    } else {
+                        deferred.reject({ status: message.data.status_code, responseJSON: body });
+                    }
+                }
+                break;
+            }
+        }
+        (this.handlers[message.type] || []).forEach((handler) => {
+            handler(message.data || message, message);
+        });
+    },
+
+    _openEventStream: function() {
+        if (!('EventSource' in window) || this.events) return;
+        const params = new URLSearchParams({ user_id: this.userId });
+        if (this.epoch && this.lastSeq !== null) {
+            params.set('epoch', this.epoch);
+            params.set('last_seq', this.lastSeq);
+        }
+        // 瀏覽器會自動重連並以 Last-Event-ID 回報最後收到的事件
+        this.events = new EventSource(`${API_BASE_URL}/interview/events?${params}`);
+        this.events.onmessage = (event) => {
+            try {
+                this._dispatch(JSON.parse(event.data));
+            } catch (e) {
+                console.error('即時通道訊息處理失敗:', e);
+            }
+        };
+    },
+
+    _rejectPending: function() {
+        const pending = this.pending;
+        this.pending = {};
+        Object.keys(pending).forEach((requestId) => {
+            pending[requestId].reject({ status: 0, statusText: 'disconnected' });
+        });
+    }
+};
+
 // 文檔就緒時執行
 $(document).ready(function() {
     // 初始化工具提示
@@ -297,4 +469,5 @@ $(document).ready(function() {
 // 全域變數
 window.Utils = Utils;
 window.API = API;
-window.Storage = Storage; 
\ No newline at end of file
+window.Storage = Storage;
+window.InterviewSocket = InterviewSocket;
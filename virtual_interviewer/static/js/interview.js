@@ -32,6 +32,7 @@ const InterviewManager = {
         // 重置所有標記
         this._hasSentFirstQuestion = false;
         this._isGettingNextQuestion = false;
+        this._serverAutoAdvance = false;
 
         // 初始化重置相關標記
         this._forceResetMode = false;
@@ -48,6 +49,7 @@ const InterviewManager = {
         this._interviewTimerInterval = null; // setInterval 句柄
 
         this.bindEvents();
+        this.connectRealtime();
         this.loadChatHistory();
         this.checkMicrophonePermission();
         this.updateStageDisplay(); // 初始化階段顯示
@@ -55,6 +57,47 @@ const InterviewManager = {
         console.log('✅ InterviewManager 初始化完成');
     },
 
+    /**
+     * 連線面試即時通道：伺服器推送的狀態變更直接更新階段顯示
+     */
+    connectRealtime: function () {
+        InterviewSocket.on('state', (data) => {
+            const serverState = data.current_state;
+            if (!isInterviewActive || !INTERVIEW_STAGES[serverState] ||
+                this._isRecentlyReset() || this._isInForceResetMode()) {
+                return;
+            }
+            if (serverState !== currentStage) {
+                currentStage = serverState;
+                this.updateStageDisplay();
+            }
+        });
+        // 伺服器已重啟或遺漏過多事件：以伺服器紀錄重新同步畫面
+        InterviewSocket.on('resync', () => {
+            this.loadChatHistory();
+        });
+        // 伺服器在分析完成後自動推送的下一題
+        InterviewSocket.on('question', (data) => {
+            this._serverAutoAdvance = false;
+            this._hasSentFirstQuestion = true;
+            if (!isInterviewActive || this._isRecentlyReset() || this._isInForceResetMode()) {
+                return;
+            }
+            const aiText = data.response || '';
+            this.hideTypingIndicator();
+            this.displayMessage(aiText, 'ai');
+            chatHistory.push({
+                user: '',
+                ai: aiText,
+                timestamp: new Date().toISOString(),
+                tool_used: 'server_push',
+                stage: currentStage
+            });
+            this.saveChatHistory();
+        });
+        InterviewSocket.connect(currentUserId || 'default_user');
+    },
+
     /**
      * 追蹤在途請求，便於之後中止
      */
@@ -221,26 +264,25 @@ const InterviewManager = {
      * 發送實際請求到後端
      */
     _sendActualRequest: function (message) {
-        // 如果是面試完成階段，傳遞面試數據
-        let requestData = {
+        // 對話紀錄與評分由伺服器保存並彙總，請求只帶本次訊息，大小不隨面試進行而增加
+        const requestData = {
             message: message,
-            user_id: currentUserId || 'default_user'
+            user_id: currentUserId || 'default_user',
+            // 每則訊息唯一的識別碼，重複送出時伺服器直接回傳先前的回應
+            request_id: `${Date.now()}-${Math.random().toString(36).slice(2)}`,
+            // 是否由伺服器在作答分析後自動推送下一題
+            auto_advance: autoNextQuestion
         };
 
-        // 如果是面試完成階段，傳遞面試數據
-        if (currentStage === 'completed' || message.includes('結束') || message.includes('完成')) {
-            requestData.interview_data = {
-                chat_history: chatHistory,
-                total_questions: chatHistory.filter(chat => chat.stage === 'questioning' && chat.user.includes('請給我問題')).length,
-                average_score: this._calculateAverageScore(),
-                stage: currentStage
-            };
-        }
-
         // 拍下當前版本，確保只處理相同版本的回應
         const requestVersion = this._version;
 
-        this._trackRequest(API.post('/interview', requestData)).done((response) => {
+        // 即時通道可用時經由 WebSocket 送出，否則使用 HTTP
+        const transport = InterviewSocket.isOpen()
+            ? InterviewSocket.request(requestData)
+            : API.post('/interview', requestData);
+
+        this._trackRequest(transport).done((response) => {
             // 若目前為暫停狀態，忽略回應以避免題目被更換
             if (!isInterviewActive) {
                 console.log('⏸️ 暫停中：忽略後端回應 (sendToBackend)');
@@ -255,6 +297,10 @@ const InterviewManager = {
             if (response && (response.success === true || response.status_code === 200)) {
                 const aiText = (response?.data?.response) || response?.response || '';
                 const serverState = response?.data?.current_state;
+                // 伺服器已排程推送下一題：不再自行索取
+                if (response?.data?.auto_advance_in != null) {
+                    this._serverAutoAdvance = true;
+                }
 
                 // 防止在等待開始階段被後端狀態覆蓋
                 // 同時防止在重新開始後的短時間內被後端狀態覆蓋
@@ -294,7 +340,8 @@ const InterviewManager = {
 
                 // 檢查是否為分析結果，如果是則等待5秒後自動獲取下一題
                 // 只有在面試問答階段且是分析結果時才自動獲取下一題
-                if (currentStage === 'questioning' && this._isAnalysisResult(aiText) && autoNextQuestion) {
+                if (currentStage === 'questioning' && this._isAnalysisResult(aiText) && autoNextQuestion &&
+                    !this._serverAutoAdvance) {
                     console.log('🎯 檢測到分析結果，5秒後自動獲取下一題');
 
                     // 防止重複觸發
@@ -637,6 +684,7 @@ const InterviewManager = {
         // 重置所有標記
         this._hasSentFirstQuestion = false;
         this._isGettingNextQuestion = false;
+        this._serverAutoAdvance = false;
 
         // 清除之前的自動計時器
         if (this._autoNextQuestionTimer) {
@@ -726,6 +774,12 @@ const InterviewManager = {
                 clearTimeout(this._firstQuestionTimer);
                 this._firstQuestionTimer = null;
             }
+            // 取消伺服器排程的自動推送
+            if (this._serverAutoAdvance) {
+                InterviewSocket.cancelAutoAdvance();
+                this._serverAutoAdvance = false;
+                this.hideTypingIndicator();
+            }
 
             // 停止計時器（僅時間暫停，不影響在途請求）
             this._stopInterviewTimer();
@@ -832,6 +886,7 @@ const InterviewManager = {
         // 重置所有標記和狀態
         this._hasSentFirstQuestion = false;
         this._isGettingNextQuestion = false;
+        this._serverAutoAdvance = false;
 
         // 重置按鈕狀態
         $('#startInterview').prop('disabled', false).html('<i class="fas fa-play me-1"></i>開始面試');
@@ -929,6 +984,7 @@ const InterviewManager = {
             isInterviewActive = false;
             this._hasSentFirstQuestion = false;
             this._isGettingNextQuestion = false;
+            this._serverAutoAdvance = false;
             this.updateStageDisplay();
 
             // 重置按鈕狀態
@@ -1024,6 +1080,13 @@ const InterviewManager = {
         }
 
         this._hasSentFirstQuestion = true;
+
+        // 伺服器會自動推送第一題，只需等待
+        if (this._serverAutoAdvance) {
+            this.showTypingIndicator();
+            return;
+        }
+
         this._isGettingNextQuestion = true;
 
         // 先顯示提示訊息
@@ -1237,101 +1300,91 @@ const InterviewManager = {
     },
 
     /**
-     * 載入聊天記錄
+     * 載入聊天記錄：以伺服器保存的本次面試紀錄為準，無法取得時退回本地儲存
+     * （頁面載入與即時通道要求重新同步時呼叫）
      */
     loadChatHistory: function () {
-        // 檢查是否有本地儲存的聊天記錄
-        let storedHistory = [];
-        let lastResetTime = 0;
+        // 剛剛重置：伺服器紀錄已清除，不需載入
+        if (this._isRecentlyReset() || this._isInForceResetMode()) {
+            console.log('🆕 剛剛重置過，不載入聊天記錄');
+            this._restoreChatHistory([]);
+            return $.Deferred().resolve().promise();
+        }
 
+        const requestVersion = this._version;
+        return this._trackRequest(API.get('/interview', {
+            user_id: currentUserId || 'default_user'
+        })).done((response) => {
+            // 載入期間已重置：忽略過期的紀錄
+            if (requestVersion !== this._version) return;
+            const data = response?.data || {};
+            this._restoreChatHistory(data.history || [], data.current_state);
+            this.saveChatHistory();
+            console.log(`📚 由伺服器載入了 ${chatHistory.length} 條聊天記錄`);
+        }).fail((xhr, status) => {
+            if (status === 'abort' || requestVersion !== this._version) return;
+            console.log('⚠️ 無法由伺服器載入聊天記錄，改用本地儲存');
+            this._loadLocalChatHistory();
+        });
+    },
+
+    /**
+     * 由本地儲存載入聊天記錄（伺服器無法連線時的備援）
+     */
+    _loadLocalChatHistory: function () {
+        let storedHistory = [];
         if (typeof localStorage !== 'undefined') {
             try {
                 const stored = localStorage.getItem('chatHistory');
                 storedHistory = stored ? JSON.parse(stored) : [];
-                lastResetTime = localStorage.getItem('lastResetTime') || 0;
             } catch (e) {
                 console.error('❌ 載入本地儲存失敗:', e);
                 storedHistory = [];
-                lastResetTime = 0;
-            }
-        }
-
-        const currentTime = new Date().getTime();
-
-        // 檢查是否在重置後的短時間內（10秒內）
-        const isRecentlyReset = (currentTime - lastResetTime) < 10000;
-
-        // 檢查是否處於強制重置模式
-        const isInForceResetMode = this._isInForceResetMode();
-
-        // 只有在有儲存記錄、不是重新開始狀態、且不是剛剛重置時才載入
-        if (storedHistory.length > 0 && currentStage !== 'waiting' && !isRecentlyReset && !isInForceResetMode) {
-            chatHistory = storedHistory;
-            chatHistory.forEach(chat => {
-                this.displayMessage(chat.user, 'user');
-                this.displayMessage(chat.ai, 'ai');
-            });
-            console.log(`📚 載入了 ${chatHistory.length} 條聊天記錄`);
-        } else {
-            // 如果是重新開始狀態、沒有儲存記錄、或剛剛重置，保持空陣列
-            chatHistory = [];
-            if (isRecentlyReset) {
-                console.log('🆕 剛剛重置過，不載入聊天記錄');
-            } else if (isInForceResetMode) {
-                console.log('🛡️ 處於強制重置模式，不載入聊天記錄');
-            } else {
-                console.log('🆕 沒有載入聊天記錄，保持乾淨狀態');
             }
         }
+        this._restoreChatHistory(storedHistory);
+        console.log(`📚 由本地儲存載入了 ${chatHistory.length} 條聊天記錄`);
     },
 
     /**
-     * 儲存聊天記錄
+     * 以紀錄重繪對話區；伺服器回報面試進行中時還原階段，可按「繼續面試」接續
      */
-    saveChatHistory: function () {
-        if (typeof localStorage !== 'undefined') {
-            localStorage.setItem('chatHistory', JSON.stringify(chatHistory));
+    _restoreChatHistory: function (history, serverState) {
+        chatHistory = history;
+        $('#chatMessages').empty();
+        chatHistory.forEach(chat => {
+            if (chat.user) {
+                this.displayMessage(chat.user, 'user');
+            }
+            this.displayMessage(chat.ai, 'ai');
+        });
+        if (chatHistory.length === 0) {
+            this.displayMessage('歡迎使用虛擬面試顧問！我會幫助您進行模擬面試。請點擊「開始面試」開始您的面試之旅。', 'ai');
         }
-    },
 
-    /**
-     * 計算平均分數
-     */
-    _calculateAverageScore: function () {
-        const scores = [];
-
-        for (const chat of chatHistory) {
-            if (chat.stage === 'questioning' && chat.ai) {
-                const score = this._extractScoreFromResponse(chat.ai);
-                if (score !== null) {
-                    scores.push(score);
-                }
+        if (serverState && INTERVIEW_STAGES[serverState] && serverState !== currentStage) {
+            currentStage = serverState;
+            this._hasSentFirstQuestion = chatHistory.some(chat => chat.stage === 'questioning');
+            if (serverState === 'waiting') {
+                // 伺服器已沒有這場面試（例如重啟）：回到開始前的狀態
+                isInterviewActive = false;
+                this._stopInterviewTimer();
+                $('#startInterview').prop('disabled', false).html('<i class="fas fa-play me-1"></i>開始面試');
+                $('#pauseInterview').prop('disabled', true);
+            } else if (!isInterviewActive && serverState !== 'completed') {
+                $('#startInterview').prop('disabled', false).html('<i class="fas fa-play me-1"></i>繼續面試');
             }
+            this.updateStageDisplay();
         }
-
-        if (scores.length === 0) return 0;
-        return scores.reduce((sum, score) => sum + score, 0) / scores.length;
     },
 
     /**
-     * 從回應中提取分數
+     * 儲存聊天記錄（本地備份，伺服器無法連線時使用）
      */
-    _extractScoreFromResponse: function (response) {
-        // 匹配 "評分：XX/100" 或 "Score: XX/100" 模式
-        const patterns = [
-            /評分[：:]\s*(\d+)\/100/,
-            /Score[：:]\s*(\d+)\/100/,
-            /(\d+)\/100\s*[（(]/
-        ];
-
-        for (const pattern of patterns) {
-            const match = response.match(pattern);
-            if (match) {
-                return parseInt(match[1]);
-            }
+    saveChatHistory: function () {
+        if (typeof localStorage !== 'undefined') {
+            localStorage.setItem('chatHistory', JSON.stringify(chatHistory));
         }
-
-        return null;
     },
 
     /**
@@ -1401,39 +1454,6 @@ $(document).ready(function () {
 
     InterviewManager.init();
 
-    // 檢查是否需要顯示歡迎訊息
-    // 只有在沒有聊天記錄且不是從儲存載入的情況下才顯示
-    let storedHistory = [];
-    let lastResetTime = 0;
-
-    if (typeof localStorage !== 'undefined') {
-        try {
-            const stored = localStorage.getItem('chatHistory');
-            storedHistory = stored ? JSON.parse(stored) : [];
-            lastResetTime = localStorage.getItem('lastResetTime') || 0;
-        } catch (e) {
-            console.error('❌ 載入本地儲存失敗:', e);
-            storedHistory = [];
-            lastResetTime = 0;
-        }
-    }
-
-    const currentTime = new Date().getTime();
-    const isRecentlyReset = (currentTime - lastResetTime) < 10000;
-
-    if ((storedHistory.length === 0 && chatHistory.length === 0) || isRecentlyReset) {
-        setTimeout(() => {
-            InterviewManager.displayMessage('歡迎使用虛擬面試顧問！我會幫助您進行模擬面試。請點擊「開始面試」開始您的面試之旅。', 'ai');
-        }, 500);
-        if (isRecentlyReset) {
-            console.log('🔄 剛剛重置過，顯示歡迎訊息');
-        } else {
-            console.log('👋 顯示初始歡迎訊息');
-        }
-    } else {
-        console.log('📚 已有聊天記錄，跳過初始歡迎訊息');
-    }
-
     // 添加打字動畫CSS
     const typingCSS = `
         <style>
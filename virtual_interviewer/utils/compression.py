@@ -0,0 +1,84 @@
+"""
+回應壓縮
+依 Accept-Encoding 協商，以 brotli（已安裝時）或 gzip 壓縮超過門檻的動態回應；
+已壓縮的回應（例如預先壓縮的靜態資源）與串流回應不會再處理
+"""
+
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+from tools.metrics import metrics
+
+# 小於此位元組數時，壓縮節省的流量不足以抵銷 CPU 與標頭成本
+MIN_SIZE = int(os.environ.get("RESPONSE_COMPRESS_MIN_SIZE", "1024"))
+# 動態內容每次都要壓縮，採用速度與壓縮率平衡的等級
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "application/javascript",
+)
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if BROTLI_AVAILABLE and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    """after_request 處理器：壓縮可壓縮且夠大的回應"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    # 不論是否壓縮，快取都需依 Accept-Encoding 區分
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+
+    with metrics.timer(f"http.compress_ms.{encoding}"):
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if len(compressed) >= len(body):
+        return response
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    metrics.increment("http.bytes_before_compression", len(body))
+    metrics.increment("http.bytes_after_compression", len(compressed))
+    return response
+
+
+def init_compression(app):
+    """註冊回應壓縮"""
+    app.after_request(compress_response)
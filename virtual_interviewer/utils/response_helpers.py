@@ -1,7 +1,103 @@
 """
 回應輔助工具函數
+JSON 以 orjson 序列化（未安裝時退回標準 json），中文直接輸出 UTF-8 不做 \\u 跳脫；
+客戶端可用 ?fields=response,current_state 只取需要的欄位
 """
 
+import json
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from tools.metrics import metrics
+
+# 回應信封欄位，選取欄位時一律保留
+ENVELOPE_FIELDS = ("success", "message", "status_code", "error", "error_code")
+
+
+def dumps_json(obj):
+    """序列化為緊湊的 UTF-8 JSON 位元組"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=str)
+        except TypeError:
+            # 超出 orjson 支援範圍（例如超過 64 位元的整數）時改用標準 json
+            pass
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+
+
+def select_fields(payload, fields):
+    """
+    依欄位清單裁剪回應：欄位指 data 內的鍵，可用點號指定巢狀鍵（如 analysis.score）。
+    信封欄位一律保留；沒有 data 物件的回應原樣回傳
+    """
+    if not fields or not isinstance(payload, dict):
+        return payload
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        return payload
+
+    selected = {}
+    for field in fields:
+        source, target = data, selected
+        parts = field.split(".")
+        for i, part in enumerate(parts):
+            if not isinstance(source, dict) or part not in source:
+                break
+            if i == len(parts) - 1:
+                target[part] = source[part]
+            else:
+                source = source[part]
+                target = target.setdefault(part, {})
+
+    trimmed = {key: payload[key] for key in ENVELOPE_FIELDS if key in payload}
+    trimmed["data"] = selected
+    return trimmed
+
+
+def requested_fields():
+    """解析查詢參數 fields（逗號分隔）"""
+    raw = request.args.get("fields", "")
+    return [field.strip() for field in raw.split(",") if field.strip()]
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """Flask JSON 提供者：緊湊序列化並套用 fields 欄位選取"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps_json(obj).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return json_response(obj)
+
+
+def json_response(obj, status=200, headers=None):
+    """產生 JSON 回應，並記錄序列化耗時與位元組數"""
+    with metrics.timer("http.json_encode_ms"):
+        body = dumps_json(select_fields(obj, requested_fields()))
+    metrics.increment("http.json_bytes", len(body))
+    response = current_app.response_class(
+        body, status=status, mimetype="application/json"
+    )
+    if headers:
+        response.headers.extend(headers)
+    return response
+
+
+def output_json(data, code, headers=None):
+    """flask_restful 的 application/json 表示法，與 CompactJSONProvider 共用序列化"""
+    return json_response(data, status=code, headers=headers)
+
 
 def create_success_response(data=None, message="操作成功", status_code=200):
     """創建成功回應"""
@@ -0,0 +1,27 @@
+"""
+WSGI 進入點
+供正式環境伺服器載入：gunicorn -c gunicorn.conf.py wsgi:app
+載入時完成資料庫初始化與暖機，搭配 preload_app 只在 master 執行一次
+"""
+
+from run import create_database, setup_python_path
+
+setup_python_path()
+
+from app import app, db
+
+create_database(app, db)
+
+
+def warm_up():
+    """預先載入題庫索引、關鍵字自動機與分析器，第一個請求不必等待"""
+    try:
+        import fast_agent_bridge  # noqa: F401
+        from tools.intro_analyzer import intro_analyzer  # noqa: F401
+
+        print("✅ 題庫索引與分析器已預先載入")
+    except ImportError as e:
+        print(f"⚠️ 預先載入失敗，將於第一次使用時載入: {e}")
+
+
+warm_up()